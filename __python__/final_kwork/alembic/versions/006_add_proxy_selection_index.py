@@ -0,0 +1,62 @@
+"""Add covering index for proxy selection
+
+Revision ID: 006_add_proxy_selection_index
+Revises: 005_add_device_fingerprint
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006_add_proxy_selection_index'
+down_revision: Union[str, None] = '005_add_device_fingerprint'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(conn, table_name):
+    """Проверить существование таблицы."""
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(conn, table_name, index_name):
+    """Проверить существование индекса."""
+    inspector = inspect(conn)
+    if table_name not in inspector.get_table_names():
+        return False
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    """
+    Покрывающий индекс для get_best_proxy_for_account.
+
+    Агрегат выбирает только id и колонки индекса: фильтр is_active,
+    GROUP BY id (id сразу за is_active — группировка идёт по порядку индекса),
+    сравнение страны, HAVING по max_accounts и сортировка по latency_ms
+    берутся из индекса без обращения к таблице. Подсчёт аккаунтов на прокси
+    использует существующий ix_accounts_proxy_id.
+    """
+    conn = op.get_bind()
+
+    if not table_exists(conn, 'proxies'):
+        return
+
+    if not index_exists(conn, 'proxies', 'ix_proxies_selection'):
+        op.create_index(
+            'ix_proxies_selection',
+            'proxies',
+            ['is_active', 'id', 'country', 'max_accounts', 'latency_ms'],
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if index_exists(conn, 'proxies', 'ix_proxies_selection'):
+        op.drop_index('ix_proxies_selection', 'proxies')
@@ -0,0 +1,62 @@
+"""Add partial index for free accounts queue
+
+Revision ID: 007_add_free_accounts_index
+Revises: 006_add_proxy_selection_index
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007_add_free_accounts_index'
+down_revision: Union[str, None] = '006_add_proxy_selection_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(conn, table_name):
+    """Проверить существование таблицы."""
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(conn, table_name, index_name):
+    """Проверить существование индекса."""
+    inspector = inspect(conn)
+    if table_name not in inspector.get_table_names():
+        return False
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    """
+    Частичный индекс по свободным аккаунтам.
+
+    Выборка кандидата в get_free_account_with_lock читает только строки
+    со status = 'free' и не сканирует выданные/отключённые аккаунты.
+    """
+    conn = op.get_bind()
+
+    if not table_exists(conn, 'accounts'):
+        return
+
+    if not index_exists(conn, 'accounts', 'ix_accounts_free'):
+        op.create_index(
+            'ix_accounts_free',
+            'accounts',
+            ['id'],
+            sqlite_where=sa.text("status = 'free'"),
+            postgresql_where=sa.text("status = 'free'"),
+        )
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if index_exists(conn, 'accounts', 'ix_accounts_free'):
+        op.drop_index('ix_accounts_free', 'accounts')
@@ -0,0 +1,68 @@
+"""Add composite indexes for keyset pagination of issues
+
+Revision ID: 008_add_issue_keyset_indexes
+Revises: 007_add_free_accounts_index
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008_add_issue_keyset_indexes'
+down_revision: Union[str, None] = '007_add_free_accounts_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, колонки) — id в конце совпадает с ORDER BY ..., id курсора
+INDEXES = [
+    # Активные выдачи: status = APPROVED ORDER BY approved_at DESC, id DESC
+    ('ix_issues_status_approved_at', ['status', 'approved_at', 'id']),
+    # История менеджера: user_id = ? ORDER BY requested_at DESC, id DESC
+    ('ix_issues_user_requested_at', ['user_id', 'requested_at', 'id']),
+    # Общая история: ORDER BY requested_at DESC, id DESC
+    ('ix_issues_requested_at', ['requested_at', 'id']),
+]
+
+
+def table_exists(conn, table_name):
+    """Проверить существование таблицы."""
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(conn, table_name, index_name):
+    """Проверить существование индекса."""
+    inspector = inspect(conn)
+    if table_name not in inspector.get_table_names():
+        return False
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def upgrade() -> None:
+    """
+    Составные индексы для keyset-пагинации заявок.
+
+    Страница (order_col, id) < курсор ORDER BY order_col DESC, id DESC LIMIT n
+    читается диапазоном индекса — стоимость не зависит от номера страницы.
+    """
+    conn = op.get_bind()
+
+    if not table_exists(conn, 'issues'):
+        return
+
+    for name, columns in INDEXES:
+        if not index_exists(conn, 'issues', name):
+            op.create_index(name, 'issues', columns)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    for name, _ in reversed(INDEXES):
+        if index_exists(conn, 'issues', name):
+            op.drop_index(name, 'issues')
@@ -0,0 +1,93 @@
+"""Add partial indexes matching hot issue/account queries
+
+Revision ID: 009_add_hot_query_indexes
+Revises: 008_add_issue_keyset_indexes
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+# revision identifiers, used by Alembic.
+revision: str = '009_add_hot_query_indexes'
+down_revision: Union[str, None] = '008_add_issue_keyset_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Активная выдача: одобрена и код отправлен менеджеру (IssueStatus хранится по имени)
+ACTIVE_ISSUE = "status = 'APPROVED' AND confirmation_code IS NOT NULL"
+# Кандидат на выдачу: свободен и есть файл сессии
+FREE_ACCOUNT = "status = 'free' AND session_path IS NOT NULL"
+
+
+def table_exists(conn, table_name):
+    """Проверить существование таблицы."""
+    inspector = inspect(conn)
+    return table_name in inspector.get_table_names()
+
+
+def index_exists(conn, table_name, index_name):
+    """Проверить существование индекса."""
+    inspector = inspect(conn)
+    if table_name not in inspector.get_table_names():
+        return False
+    return index_name in [i['name'] for i in inspector.get_indexes(table_name)]
+
+
+def create_partial_index(conn, name, table, columns, where):
+    if not index_exists(conn, table, name):
+        op.create_index(
+            name,
+            table,
+            columns,
+            sqlite_where=sa.text(where),
+            postgresql_where=sa.text(where),
+        )
+
+
+def upgrade() -> None:
+    """
+    Частичные индексы под фактическую форму горячих запросов.
+
+    - ix_issues_active_by_user (user_id, status, approved_at) WHERE активна:
+      check_manager_limit, count_active_by_user, get_user_active_issues,
+      get_managers_with_accounts (лента активных выдач идёт по
+      ix_issues_status_approved_at из 008). status в ключе даёт второе
+      равенство — иначе SQLite берёт равноценный ix_issues_user_requested_at
+    - ix_accounts_free_ready (status, id) WHERE свободен и есть session_path:
+      get_free_account_with_lock; заменяет ix_accounts_free, который
+      не отсекал аккаунты без сессии. status в ключе обязателен: без него
+      SQLite выбирает ix_accounts_status по равенству status = ?
+    """
+    conn = op.get_bind()
+
+    if table_exists(conn, 'issues'):
+        create_partial_index(
+            conn, 'ix_issues_active_by_user', 'issues', ['user_id', 'status', 'approved_at'], ACTIVE_ISSUE
+        )
+
+    if table_exists(conn, 'accounts'):
+        create_partial_index(
+            conn, 'ix_accounts_free_ready', 'accounts', ['status', 'id'], FREE_ACCOUNT
+        )
+        if index_exists(conn, 'accounts', 'ix_accounts_free'):
+            op.drop_index('ix_accounts_free', 'accounts')
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+
+    if table_exists(conn, 'accounts'):
+        create_partial_index(
+            conn, 'ix_accounts_free', 'accounts', ['id'], "status = 'free'"
+        )
+        if index_exists(conn, 'accounts', 'ix_accounts_free_ready'):
+            op.drop_index('ix_accounts_free_ready', 'accounts')
+
+    if index_exists(conn, 'issues', 'ix_issues_active_by_user'):
+        op.drop_index('ix_issues_active_by_user', 'issues')
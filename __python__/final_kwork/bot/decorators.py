@@ -5,6 +5,9 @@
 - admin_only: проверка прав админа
 - safe_edit: безопасное редактирование сообщений (игнорирует MessageNotModifiedError)
 - handle_errors: обработка ошибок с уведомлением пользователя
+
+admin_only, log_handler и handle_errors также пишут задержку handler
+в utils.instrumentation (вложенные декораторы — один замер).
 """
 import functools
 import logging
@@ -13,6 +16,7 @@ from typing import Callable, TypeVar, ParamSpec
 from telethon.errors import MessageNotModifiedError, MessageIdInvalidError
 
 from config import settings
+from utils.instrumentation import time_handler
 
 logger = logging.getLogger(__name__)
 
@@ -73,21 +77,22 @@ def admin_only(func: Callable[P, T]) -> Callable[P, T]:
                 await event.answer("⛔ Нет доступа", alert=True)
             return None
         
-        try:
-            return await func(event, *args, **kwargs)
-        except MessageNotModifiedError:
-            # Игнорируем - сообщение уже содержит этот текст
-            logger.debug(f"MessageNotModifiedError ignored in {func.__name__}")
-            if hasattr(event, 'answer'):
-                try:
-                    await event.answer()
-                except Exception:
-                    pass
-            return None
-        except MessageIdInvalidError:
-            # Сообщение удалено - игнорируем
-            logger.debug(f"MessageIdInvalidError ignored in {func.__name__}")
-            return None
+        async with time_handler(func.__name__):
+            try:
+                return await func(event, *args, **kwargs)
+            except MessageNotModifiedError:
+                # Игнорируем - сообщение уже содержит этот текст
+                logger.debug(f"MessageNotModifiedError ignored in {func.__name__}")
+                if hasattr(event, 'answer'):
+                    try:
+                        await event.answer()
+                    except Exception:
+                        pass
+                return None
+            except MessageIdInvalidError:
+                # Сообщение удалено - игнорируем
+                logger.debug(f"MessageIdInvalidError ignored in {func.__name__}")
+                return None
     
     return wrapper
 
@@ -107,13 +112,14 @@ def log_handler(action: str) -> Callable:
             user_id = event.sender_id
             logger.info(f"[{action}] user_id={user_id} started")
             
-            try:
-                result = await func(event, *args, **kwargs)
-                logger.info(f"[{action}] user_id={user_id} completed")
-                return result
-            except Exception as e:
-                logger.exception(f"[{action}] user_id={user_id} error: {e}")
-                raise
+            async with time_handler(func.__name__):
+                try:
+                    result = await func(event, *args, **kwargs)
+                    logger.info(f"[{action}] user_id={user_id} completed")
+                    return result
+                except Exception as e:
+                    logger.exception(f"[{action}] user_id={user_id} error: {e}")
+                    raise
         
         return wrapper
     return decorator
@@ -126,20 +132,21 @@ def handle_errors(user_message: str = "❌ Произошла ошибка. По
     def decorator(func: Callable[P, T]) -> Callable[P, T]:
         @functools.wraps(func)
         async def wrapper(event, *args, **kwargs):
-            try:
-                return await func(event, *args, **kwargs)
-            except Exception as e:
-                logger.exception(f"Handler error: {e}")
-                
+            async with time_handler(func.__name__):
                 try:
-                    if hasattr(event, 'answer'):
-                        await event.answer(user_message[:200], alert=True)
-                    else:
-                        await event.respond(user_message)
-                except Exception:
-                    pass
-                
-                return None
+                    return await func(event, *args, **kwargs)
+                except Exception as e:
+                    logger.exception(f"Handler error: {e}")
+                    
+                    try:
+                        if hasattr(event, 'answer'):
+                            await event.answer(user_message[:200], alert=True)
+                        else:
+                            await event.respond(user_message)
+                    except Exception:
+                        pass
+                    
+                    return None
         
         return wrapper
     return decorator
@@ -19,16 +19,18 @@ from bot.constants import (
     ISSUE_STATUS_EMOJI,
     ISSUE_STATUS_NAMES,
 )
-from bot.decorators import admin_only
+from bot.decorators import admin_only, safe_edit
 from bot.keyboards import (
     main_menu_admin,
     admin_import_menu,
     admin_import_result,
     admin_accounts_filter,
     admin_accounts_list,
+    admin_stats_buttons,
     admin_account_detail,
     admin_active_issues_list,
     admin_history_list,
+    parse_issues_page,
     admin_issue_processed,
     confirm_revoke,
     confirm_delete_account,
@@ -62,8 +64,16 @@ from services.telethon_workers import (
     stop_code_listener,
     reset_other_sessions,
 )
+from services.notification_service import get_notification_dispatcher
 from services.stats_service import get_system_stats, format_stats_message
-from services.health_service import run_health_check, format_health_report
+from services.user_cache import format_user_cache_stats
+from utils.instrumentation import format_summary_message as format_perf_summary
+from services.health_service import (
+    run_health_check,
+    format_health_report,
+    get_health_history,
+    format_health_history,
+)
 from services import proxy_service
 
 logger = logging.getLogger(__name__)
@@ -91,19 +101,17 @@ def register_admin_handlers(client: TelegramClient) -> None:
     async def cb_nav_accounts(event):
         """Экран фильтров аккаунтов."""
         async with get_session() as session:
-            accounts = await accounts_service.get_all_accounts(session)
+            by_status = await accounts_service.count_accounts_by_status(session)
 
         # Подсчёт по статусам
         counts = {"free": 0, "assigned": 0, "disabled": 0, "needs_conversion": 0}
-        for acc in accounts:
-            status = (
-                acc.status.value if hasattr(acc.status, "value") else str(acc.status)
-            )
+        for status, count in by_status.items():
             if status in counts:
-                counts[status] += 1
+                counts[status] += count
+        total = sum(by_status.values())
 
         text = (
-            f"🗂 **Аккаунты** (всего: {len(accounts)})\n\n"
+            f"🗂 **Аккаунты** (всего: {total})\n\n"
             f"🟢 Свободные:     {counts['free']}\n"
             f"🔵 Выданные:      {counts['assigned']}\n"
             f"🔴 Невалид:       {counts['disabled']}\n"
@@ -132,7 +140,18 @@ def register_admin_handlers(client: TelegramClient) -> None:
             stats = await get_system_stats(session)
 
         text = format_stats_message(stats)
-        await event.edit(text, buttons=back_button("nav:main"))
+        await event.edit(text, buttons=admin_stats_buttons())
+
+    @client.on(events.CallbackQuery(pattern=rb"^stats:refresh$"))
+    @admin_only
+    @safe_edit
+    async def cb_stats_refresh(event):
+        """Принудительная сверка статистики с БД."""
+        async with get_session() as session:
+            stats = await get_system_stats(session, force_refresh=True)
+
+        text = format_stats_message(stats)
+        await event.edit(text, buttons=admin_stats_buttons())
 
     @client.on(events.CallbackQuery(pattern=rb"^nav:settings$"))
     @admin_only
@@ -238,27 +257,48 @@ def register_admin_handlers(client: TelegramClient) -> None:
     # ФИЛЬТРЫ И СПИСКИ АККАУНТОВ
     # ================================================================
 
-    @client.on(events.CallbackQuery(pattern=rb"^filter:(\w+):(\d+)$"))
+    @client.on(events.CallbackQuery(pattern=rb"^filter:(\w+):(\d+)(?::([ab])(\d+))?$"))
     @admin_only
     async def cb_filter_accounts(event):
-        """Фильтр аккаунтов с пагинацией."""
+        """Фильтр аккаунтов с keyset-пагинацией (курсор в callback data)."""
         match = event.pattern_match
         filter_type = match.group(1).decode()
         page = int(match.group(2).decode())
+        direction = match.group(3).decode() if match.group(3) else None
+        cursor_id = int(match.group(4).decode()) if match.group(4) else None
+
+        status = None
+        if filter_type != "all":
+            try:
+                status = AccountStatus(filter_type)
+            except ValueError:
+                await event.answer("Неизвестный фильтр", alert=True)
+                return
 
+        per_page = 5
         async with get_session() as session:
-            all_accounts = await accounts_service.get_all_accounts(session)
+            by_status = await accounts_service.count_accounts_by_status(session)
+            total = (
+                sum(by_status.values())
+                if status is None
+                else by_status.get(status.value, 0)
+            )
 
-        # Фильтруем
-        if filter_type == "all":
-            accounts = all_accounts
-        else:
-            accounts = [
-                a
-                for a in all_accounts
-                if (a.status.value if hasattr(a.status, "value") else str(a.status))
-                == filter_type
-            ]
+            accounts, has_more = [], False
+            if total:
+                accounts, has_more = await accounts_service.get_accounts_page(
+                    session,
+                    status=status,
+                    after_id=cursor_id if direction == "a" else None,
+                    before_id=cursor_id if direction == "b" else None,
+                    limit=per_page,
+                )
+                if not accounts and cursor_id is not None:
+                    # Курсор устарел (аккаунты удалены/сменили статус) — с начала
+                    page, direction = 0, None
+                    accounts, has_more = await accounts_service.get_accounts_page(
+                        session, status=status, limit=per_page
+                    )
 
         if not accounts:
             status_names = {
@@ -272,8 +312,18 @@ def register_admin_handlers(client: TelegramClient) -> None:
             await event.edit(text, buttons=back_button("nav:accounts"))
             return
 
-        text = f"🗂 **Аккаунты** ({len(accounts)} шт.)\n\nВыберите аккаунт:"
-        await event.edit(text, buttons=admin_accounts_list(accounts, filter_type, page))
+        # При движении назад has_more означает наличие предыдущих страниц,
+        # а следующая страница существует всегда (мы пришли с неё)
+        has_next = True if direction == "b" else has_more
+        total_pages = max(1, (total + per_page - 1) // per_page)
+
+        text = f"🗂 **Аккаунты** ({total} шт.)\n\nВыберите аккаунт:"
+        await event.edit(
+            text,
+            buttons=admin_accounts_list(
+                accounts, filter_type, page, total_pages, has_next
+            ),
+        )
 
     # ================================================================
     # ДЕТАЛИ АККАУНТА
@@ -382,9 +432,9 @@ def register_admin_handlers(client: TelegramClient) -> None:
 
                 text = f"✅ Аккаунт #{account_id} валиден!"
             else:
-                account.status = AccountStatus.DISABLED
-                account.error_text = validation.error
-                await session.flush()
+                await accounts_service.disable_account(
+                    session, account, validation.error
+                )
 
                 text = f"❌ Аккаунт #{account_id}: {validation.error}"
 
@@ -451,49 +501,67 @@ def register_admin_handlers(client: TelegramClient) -> None:
     # АКТИВНЫЕ ВЫДАЧИ
     # ================================================================
 
-    async def show_active_issues(event, page: int = 0):
-        """Показать активные выдачи."""
+    async def show_active_issues(
+        event, page: int = 0, direction: Optional[str] = None, cursor=None
+    ):
+        """Показать активные выдачи (keyset-пагинация)."""
+        per_page = 5
         async with get_session() as session:
-            issues = await issues_service.get_active_issues(session)
+            total = await issues_service.count_active_issues(session)
+            rows, page, has_next = [], 0, False
+            if total:
+                rows, page, has_next = await issues_service.load_issues_page(
+                    session, issues_service.get_active_page, page, direction, cursor, per_page
+                )
 
-        if not issues:
+        if not rows:
             text = "📭 **Нет активных выдач**"
             await event.edit(text, buttons=back_button("nav:main"))
             return
 
-        text = f"✅ **Активные выдачи** ({len(issues)} шт.)"
-        await event.edit(text, buttons=admin_active_issues_list(issues, page))
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        text = f"✅ **Активные выдачи** ({total} шт.)"
+        await event.edit(
+            text, buttons=admin_active_issues_list(rows, page, total_pages, has_next)
+        )
 
-    @client.on(events.CallbackQuery(pattern=rb"^page:active:(\d+)$"))
+    @client.on(events.CallbackQuery(pattern=rb"^page:active:(\d+)(?::([ab])(\d+\.\d+))?$"))
     @admin_only
     async def cb_page_active(event):
         """Пагинация активных выдач."""
-        page = int(event.pattern_match.group(1).decode())
-        await show_active_issues(event, page)
+        await show_active_issues(event, *parse_issues_page(event.pattern_match))
 
     # ================================================================
     # ИСТОРИЯ ЗАЯВОК
     # ================================================================
 
-    async def show_history(event, page: int = 0):
-        """Показать историю заявок."""
+    async def show_history(
+        event, page: int = 0, direction: Optional[str] = None, cursor=None
+    ):
+        """Показать историю заявок (keyset-пагинация)."""
+        per_page = 8
         async with get_session() as session:
-            issues = await issues_service.get_all_issues(session, limit=100)
+            total = await issues_service.count_issues(session)
+            rows, page, has_next = [], 0, False
+            if total:
+                rows, page, has_next = await issues_service.load_issues_page(
+                    session, issues_service.get_history_page, page, direction, cursor, per_page
+                )
 
-        if not issues:
+        if not rows:
             text = "📭 **История пуста**"
             await event.edit(text, buttons=back_button("nav:main"))
             return
 
-        text = f"🕘 **История заявок** ({len(issues)} шт.)"
-        await event.edit(text, buttons=admin_history_list(issues, page))
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        text = f"🕘 **История заявок** ({total} шт.)"
+        await event.edit(text, buttons=admin_history_list(rows, page, total_pages, has_next))
 
-    @client.on(events.CallbackQuery(pattern=rb"^page:history:(\d+)$"))
+    @client.on(events.CallbackQuery(pattern=rb"^page:history:(\d+)(?::([ab])(\d+\.\d+))?$"))
     @admin_only
     async def cb_page_history(event):
         """Пагинация истории."""
-        page = int(event.pattern_match.group(1).decode())
-        await show_history(event, page)
+        await show_history(event, *parse_issues_page(event.pattern_match))
 
     # ================================================================
     # РАЗДЕЛ МЕНЕДЖЕРЫ
@@ -639,14 +707,11 @@ def register_admin_handlers(client: TelegramClient) -> None:
 
         # Уведомляем менеджера
         if manager_tg_id:
-            try:
-                await client.send_message(
-                    manager_tg_id,
-                    f"🔴 **Все аккаунты отозваны**\n\n"
-                    f"Администратор отозвал {revoked_count} аккаунтов.",
-                )
-            except Exception as e:
-                logger.warning(f"Failed to notify manager {manager_tg_id}: {e}")
+            get_notification_dispatcher().notify(
+                manager_tg_id,
+                f"🔴 **Все аккаунты отозваны**\n\n"
+                f"Администратор отозвал {revoked_count} аккаунтов.",
+            )
 
         text = f"✅ **Отозвано {revoked_count} аккаунтов**"
         await event.edit(text, buttons=back_button("nav:managers"))
@@ -815,25 +880,21 @@ def register_admin_handlers(client: TelegramClient) -> None:
         )
 
         # Уведомляем менеджера (без прокси - только для админов)
-        try:
-            premium_line = "⭐ Telegram Premium\n" if account_is_premium else ""
-            phone_line = (
-                f"📞 Номер: `{account_phone}`\n"
-                if account_phone
-                else "📞 Номер: определяется...\n"
-            )
-            await client.send_message(
-                manager_tg_id,
-                f"🎉 **Аккаунт выдан!**\n\n"
-                f"{phone_line}"
-                f"{premium_line}"
-                f"🔐 Облачный пароль: `100300`\n\n"
-                f"⏳ Ожидай код подтверждения...",
-                buttons=manager_account_issued(can_request_more),
-            )
-            logger.info(f"Notification sent to manager {manager_tg_id}")
-        except Exception as e:
-            logger.error(f"Failed to notify manager {manager_tg_id}: {e}")
+        premium_line = "⭐ Telegram Premium\n" if account_is_premium else ""
+        phone_line = (
+            f"📞 Номер: `{account_phone}`\n"
+            if account_phone
+            else "📞 Номер: определяется...\n"
+        )
+        get_notification_dispatcher().notify(
+            manager_tg_id,
+            f"🎉 **Аккаунт выдан!**\n\n"
+            f"{phone_line}"
+            f"{premium_line}"
+            f"🔐 Облачный пароль: `100300`\n\n"
+            f"⏳ Ожидай код подтверждения...",
+            buttons=manager_account_issued(can_request_more),
+        )
 
         # Запускаем слушатель кода
         try:
@@ -893,7 +954,7 @@ def register_admin_handlers(client: TelegramClient) -> None:
                 f"❌ **Заявка #{issue_id} отклонена**", buttons=admin_issue_processed()
             )
 
-            await client.send_message(
+            get_notification_dispatcher().notify(
                 issue.user.tg_id,
                 f"❌ **Заявка #{issue_id} отклонена**\n\n"
                 f"Обратитесь к администратору для уточнения причины.",
@@ -1040,15 +1101,12 @@ def register_admin_handlers(client: TelegramClient) -> None:
 
             # Уведомляем менеджера (если есть контакт)
             if manager_tg_id:
-                try:
-                    await client.send_message(
-                        manager_tg_id,
-                        f"🔴 **Аккаунт отозван**\n\n"
-                        f"Выдача #{issue_id} была отозвана администратором."
-                        + (f"\n📱 Аккаунт: `{account_phone}`" if account_phone else ""),
-                    )
-                except Exception as e:
-                    logger.warning(f"Failed to notify manager {manager_tg_id}: {e}")
+                get_notification_dispatcher().notify(
+                    manager_tg_id,
+                    f"🔴 **Аккаунт отозван**\n\n"
+                    f"Выдача #{issue_id} была отозвана администратором."
+                    + (f"\n📱 Аккаунт: `{account_phone}`" if account_phone else ""),
+                )
 
             logger.info(f"Issue #{issue_id} revoked by admin {event.sender_id}")
 
@@ -1210,21 +1268,22 @@ def register_admin_handlers(client: TelegramClient) -> None:
         admin_id = event.sender_id
 
         async def on_code_admin(acc_id: int, mgr_id: int, code: str):
-            await client.send_message(
+            get_notification_dispatcher().notify(
                 admin_id,
                 f"🔑 **Код получен!**\n\n"
                 f"```\n{code}\n```\n\n"
                 f"📱 Аккаунт: `{account_phone}`",
+                coalesce_key=f"code:{acc_id}",
             )
 
         async def on_timeout_admin(acc_id: int, mgr_id: int):
-            await client.send_message(
+            get_notification_dispatcher().notify(
                 admin_id,
                 f"⏰ **Таймаут**\n\n" f"Код для аккаунта `{account_phone}` не получен.",
             )
 
         async def on_error_admin(acc_id: int, mgr_id: int, error: str):
-            await client.send_message(admin_id, f"❌ **Ошибка:** {error}")
+            get_notification_dispatcher().notify(admin_id, f"❌ **Ошибка:** {error}")
 
         try:
             await start_code_listener(
@@ -1246,7 +1305,7 @@ def register_admin_handlers(client: TelegramClient) -> None:
                 system_lang_code=account_system_lang_code,
             )
 
-            await client.send_message(
+            get_notification_dispatcher().notify(
                 admin_id,
                 f"⏳ **Ожидаю код...**\n\n"
                 f"📱 Аккаунт: `{account_phone}`\n"
@@ -1266,62 +1325,86 @@ def register_admin_handlers(client: TelegramClient) -> None:
     async def cmd_accounts(event):
         """Список аккаунтов (команда)."""
         async with get_session() as session:
-            accounts = await accounts_service.get_all_accounts(session)
+            by_status = await accounts_service.count_accounts_by_status(session)
 
-        if not accounts:
+        total = sum(by_status.values())
+        if not total:
             await event.respond("📭 Аккаунтов нет", buttons=main_menu_admin())
             return
 
-        text = f"🗂 **Аккаунты** ({len(accounts)} шт.)\n\nВыберите фильтр:"
+        text = f"🗂 **Аккаунты** ({total} шт.)\n\nВыберите фильтр:"
         await event.respond(text, buttons=admin_accounts_filter())
 
     @client.on(events.NewMessage(pattern=r"^/active$"))
     @admin_only
     async def cmd_active(event):
         """Активные выдачи (команда)."""
+        per_page = 5
         async with get_session() as session:
-            issues = await issues_service.get_active_issues(session)
+            total = await issues_service.count_active_issues(session)
+            rows, has_next = await issues_service.get_active_page(session, limit=per_page)
 
-        if not issues:
+        if not rows:
             await event.respond("📭 Нет активных выдач", buttons=main_menu_admin())
             return
 
-        text = f"✅ **Активные выдачи** ({len(issues)} шт.)"
-        await event.respond(text, buttons=admin_active_issues_list(issues))
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        text = f"✅ **Активные выдачи** ({total} шт.)"
+        await event.respond(
+            text, buttons=admin_active_issues_list(rows, 0, total_pages, has_next)
+        )
 
     @client.on(events.NewMessage(pattern=r"^/issues$"))
     @admin_only
     async def cmd_issues(event):
         """История заявок (команда)."""
+        per_page = 8
         async with get_session() as session:
-            issues = await issues_service.get_all_issues(session, limit=100)
+            total = await issues_service.count_issues(session)
+            rows, has_next = await issues_service.get_history_page(session, limit=per_page)
 
-        if not issues:
+        if not rows:
             await event.respond("📭 История пуста", buttons=main_menu_admin())
             return
 
-        text = f"🕘 **История заявок** ({len(issues)} шт.)"
-        await event.respond(text, buttons=admin_history_list(issues))
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        text = f"🕘 **История заявок** ({total} шт.)"
+        await event.respond(text, buttons=admin_history_list(rows, 0, total_pages, has_next))
 
-    @client.on(events.NewMessage(pattern=r"^/stats$"))
+    @client.on(events.NewMessage(pattern=r"^/stats(?:\s+(refresh))?$"))
     @admin_only
     async def cmd_stats(event):
-        """Статистика (команда)."""
+        """Статистика (команда). /stats refresh — сверить с БД."""
+        force_refresh = bool(event.pattern_match.group(1))
         async with get_session() as session:
-            stats = await get_system_stats(session)
+            stats = await get_system_stats(session, force_refresh=force_refresh)
 
         text = format_stats_message(stats)
         await event.respond(text, buttons=main_menu_admin())
 
-    @client.on(events.NewMessage(pattern=r"^/health$"))
+    @client.on(events.NewMessage(pattern=r"^/health(?:\s+(history))?$"))
     @admin_only
     async def cmd_health(event):
-        """Health check (команда)."""
+        """Health check (команда). /health history — история проверок."""
+        if event.pattern_match.group(1):
+            text = format_health_history(get_health_history())
+            await event.respond(text, buttons=main_menu_admin())
+            return
+
         await event.respond("⏳ Проверяю систему...")
         health = await run_health_check()
         report = format_health_report(health)
         await event.respond(report, buttons=main_menu_admin())
 
+    @client.on(events.NewMessage(pattern=r"^/perf$"))
+    @admin_only
+    async def cmd_perf(event):
+        """Сводка производительности: loop lag, задачи, задержки handlers, кэш."""
+        await event.respond(
+            f"{format_perf_summary()}\n\n{format_user_cache_stats()}",
+            buttons=main_menu_admin(),
+        )
+
     @client.on(events.NewMessage(pattern=r"^/add_session$"))
     @admin_only
     async def cmd_add_session(event):
@@ -1886,25 +1969,24 @@ def _create_code_callbacks(client: TelegramClient, issue_id: int) -> dict:
             if iss:
                 await issues_service.set_confirmation_code(s, iss, code)
 
-        await client.send_message(
+        dispatcher = get_notification_dispatcher()
+        dispatcher.notify(
             mgr_id,
             f"🔑 **Код подтверждения**\n\n"
             f"```\n{code}\n```\n\n"
             f"🔐 **Облачный пароль:** `100300`\n\n"
             f"Код действует ~5 минут.",
             buttons=manager_code_received(),
+            coalesce_key=f"code:{acc_id}",
+        )
+        dispatcher.notify_admins(
+            f"✅ Код для заявки #{issue_id} отправлен",
+            coalesce_key=f"code_sent:{issue_id}",
         )
-
-        for admin_id in settings.admin_ids_list:
-            try:
-                await client.send_message(
-                    admin_id, f"✅ Код для заявки #{issue_id} отправлен"
-                )
-            except Exception:
-                pass
 
     async def on_timeout(acc_id: int, mgr_id: int):
-        await client.send_message(
+        dispatcher = get_notification_dispatcher()
+        dispatcher.notify(
             mgr_id,
             f"⏰ **Код не получен**\n\n"
             f"Прошло {settings.code_wait_timeout // 60} минуты, код не пришёл в Telegram.\n\n"
@@ -1915,17 +1997,10 @@ def _create_code_callbacks(client: TelegramClient, issue_id: int) -> dict:
             buttons=manager_code_timeout(),
         )
 
-        for admin_id in settings.admin_ids_list:
-            try:
-                await client.send_message(
-                    admin_id,
-                    f"⚠️ Таймаут кода для заявки #{issue_id}",
-                )
-            except Exception:
-                pass
+        dispatcher.notify_admins(f"⚠️ Таймаут кода для заявки #{issue_id}")
 
     async def on_error(acc_id: int, mgr_id: int, error_msg: str):
-        await client.send_message(
+        get_notification_dispatcher().notify(
             mgr_id,
             f"❌ **Ошибка:** {error_msg}\n\n" f"Обратись к администратору.",
             buttons=[[Button.inline("⬅️ В меню", data=CB.MGR_MENU)]],
@@ -1942,18 +2017,15 @@ def _create_code_callbacks(client: TelegramClient, issue_id: int) -> dict:
         if phone:
             premium_line = "⭐ Telegram Premium\n" if is_premium else ""
             username_line = f"👤 Username: @{username}\n" if username else ""
-            try:
-                await client.send_message(
-                    mgr_id,
-                    f"📱 **Данные аккаунта подтверждены**\n\n"
-                    f"📞 Номер: `+{phone}`\n"
-                    f"{username_line}"
-                    f"{premium_line}"
-                    f"🔐 Облачный пароль: `100300`",
-                )
-                logger.info(f"Sent phone update to manager {mgr_id}: +{phone}")
-            except Exception as e:
-                logger.warning(f"Failed to send phone update to manager {mgr_id}: {e}")
+            get_notification_dispatcher().notify(
+                mgr_id,
+                f"📱 **Данные аккаунта подтверждены**\n\n"
+                f"📞 Номер: `+{phone}`\n"
+                f"{username_line}"
+                f"{premium_line}"
+                f"🔐 Облачный пароль: `100300`",
+                coalesce_key=f"phone:{acc_id}",
+            )
 
     return {
         "on_code": on_code_received,
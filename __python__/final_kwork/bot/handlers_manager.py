@@ -4,6 +4,7 @@
 Поддерживает как команды (fallback), так и inline-кнопки.
 Совместимость с Telethon 2.0.
 """
+import functools
 import logging
 
 from services.telethon_adapter import TelegramClient, events, Button
@@ -16,7 +17,8 @@ from bot.decorators import safe_edit
 from db.session import get_session
 from db.models import Issue, IssueStatus, Account
 from services.telethon_workers import start_code_listener, stop_code_listener
-from services import issues_service, security_service, ai_stub
+from services import issues_service, admission_service
+from services.notification_service import get_notification_dispatcher
 from bot.keyboards import (
     CB,
     main_menu_manager,
@@ -27,6 +29,7 @@ from bot.keyboards import (
     manager_my_accounts_list,
     manager_my_accounts_empty,
     manager_history_list,
+    parse_issues_page,
     manager_history_empty,
     manager_help,
     manager_code_timeout,
@@ -131,7 +134,7 @@ def register_manager_handlers(client: TelegramClient) -> None:
         )
 
         async with get_session() as session:
-            user = await issues_service.get_or_create_user(session, tg_id, username, full_name)
+            user = await issues_service.get_user_identity(session, tg_id, username, full_name)
 
             # Берём последнюю одобренную заявку менеджера (аккаунт уже закреплён)
             stmt = (
@@ -177,13 +180,11 @@ def register_manager_handlers(client: TelegramClient) -> None:
 
             # Колбэки (как в админке, но без привязки к админ-сообщению)
             async def _on_connected(account_id: int, manager_tg_id: int, phone: str, tg_username: str, is_premium: bool):
-                try:
-                    await client.send_message(
-                        manager_tg_id,
-                        f"📞 Обновлён номер аккаунта: `{phone}`",
-                    )
-                except Exception:
-                    pass
+                get_notification_dispatcher().notify(
+                    manager_tg_id,
+                    f"📞 Обновлён номер аккаунта: `{phone}`",
+                    coalesce_key=f"phone:{account_id}",
+                )
 
             async def _on_code(account_id: int, manager_tg_id: int, code: str):
                 # Сохраняем код в issue (чтобы выдача считалась «активной»)
@@ -192,32 +193,24 @@ def register_manager_handlers(client: TelegramClient) -> None:
                     if iss and iss.status == IssueStatus.APPROVED:
                         await issues_service.set_confirmation_code(s2, iss, code)
 
-                try:
-                    await client.send_message(
-                        manager_tg_id,
-                        f"🔐 Код подтверждения: `{code}`\n\n"
-                        "Если вход не удался — нажмите *Код ещё раз*.",
-                        buttons=manager_code_received(),
-                    )
-                except Exception:
-                    pass
+                get_notification_dispatcher().notify(
+                    manager_tg_id,
+                    f"🔐 Код подтверждения: `{code}`\n\n"
+                    "Если вход не удался — нажмите *Код ещё раз*.",
+                    buttons=manager_code_received(),
+                    coalesce_key=f"code:{account_id}",
+                )
 
             async def _on_timeout(account_id: int, manager_tg_id: int):
-                try:
-                    await client.send_message(
-                        manager_tg_id,
-                        "⌛️ Время ожидания кода истекло.\n"
-                        "Если вы снова пытаетесь войти — нажмите *Ещё раз*.",
-                        buttons=manager_code_timeout(),
-                    )
-                except Exception:
-                    pass
+                get_notification_dispatcher().notify(
+                    manager_tg_id,
+                    "⌛️ Время ожидания кода истекло.\n"
+                    "Если вы снова пытаетесь войти — нажмите *Ещё раз*.",
+                    buttons=manager_code_timeout(),
+                )
 
             async def _on_error(account_id: int, manager_tg_id: int, error_text: str):
-                try:
-                    await client.send_message(manager_tg_id, f"⚠️ {error_text}")
-                except Exception:
-                    pass
+                get_notification_dispatcher().notify(manager_tg_id, f"⚠️ {error_text}")
 
         # Перезапускаем слушатель вне DB-сессии
         try:
@@ -268,29 +261,20 @@ def register_manager_handlers(client: TelegramClient) -> None:
         full_name = f"{sender.first_name or ''} {sender.last_name or ''}".strip()
         
         async with get_session() as session:
-            # Получаем/создаём пользователя
-            user = await issues_service.get_or_create_user(
+            # Пользователь, лимиты, агрегаты истории, риск и заявка — одна транзакция
+            admission = await admission_service.admit_request(
                 session, tg_id, username, full_name
             )
-            
-            # Проверка лимитов
-            is_valid, error_msg = await security_service.validate_request(session, user.id)
-            if not is_valid:
-                text = f"⚠️ **Лимит достигнут**\n\n{error_msg}"
+            if not admission.admitted:
+                text = f"⚠️ **Лимит достигнут**\n\n{admission.error}"
                 if is_callback:
                     await event.edit(text, buttons=manager_limit_reached())
                 else:
                     await event.respond(text, buttons=manager_limit_reached())
                 return
             
-            # AI-анализ
-            history = await issues_service.get_user_history(session, user.id)
-            risk_score = await ai_stub.analyze_request(tg_id, username, history)
-            
-            # Создаём заявку
-            issue = await issues_service.create_issue(
-                session, user, ip_address=None, risk_score=risk_score
-            )
+            issue = admission.issue
+            history = admission.history
             
             # Ответ менеджеру
             response_text = (
@@ -305,9 +289,8 @@ def register_manager_handlers(client: TelegramClient) -> None:
                 await event.respond(response_text, buttons=manager_request_sent())
             
             # Уведомляем админов
-            if history:
-                approved_count = sum(1 for h in history if h.get("status") == "approved")
-                history_text = f"📊 Заявок ранее: {len(history)}\n✅ Выдано аккаунтов: {approved_count}"
+            if history.total:
+                history_text = f"📊 Заявок ранее: {history.total}\n✅ Выдано аккаунтов: {history.approved}"
             else:
                 history_text = "🆕 Первая заявка"
             
@@ -321,15 +304,9 @@ def register_manager_handlers(client: TelegramClient) -> None:
                 f"{history_text}"
             )
             
-            for admin_id in settings.admin_ids_list:
-                try:
-                    await client.send_message(
-                        admin_id,
-                        admin_text,
-                        buttons=admin_issue_card(issue.id)
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to notify admin {admin_id}: {e}")
+            get_notification_dispatcher().notify_admins(
+                admin_text, buttons=admin_issue_card(issue.id)
+            )
     
     # ================================================================
     # МОИ АККАУНТЫ
@@ -348,13 +325,11 @@ def register_manager_handlers(client: TelegramClient) -> None:
     
     async def process_my_accounts(event, is_callback: bool):
         """Общая логика просмотра аккаунтов."""
-        sender = await event.get_sender()
-        tg_id = sender.id
+        tg_id = event.sender_id
         
         async with get_session() as session:
-            user = await issues_service.get_or_create_user(session, tg_id)
-            active = await issues_service.get_active_issues(session)
-            my_active = [i for i in active if i.user_id == user.id]
+            user = await issues_service.get_user_identity(session, tg_id)
+            my_active = await issues_service.get_user_active_issues(session, user.id)
             
             # Проверяем лимит
             can_request_more = len(my_active) < settings.max_accounts_per_manager
@@ -386,50 +361,54 @@ def register_manager_handlers(client: TelegramClient) -> None:
     # ИСТОРИЯ ВЫДАЧ
     # ================================================================
     
-    @client.on(events.CallbackQuery(pattern=rb"^mgr:history:(\d+)$"))
+    @client.on(events.CallbackQuery(pattern=rb"^mgr:history:(\d+)(?::([ab])(\d+\.\d+))?$"))
     @safe_edit
     async def cb_history(event):
         """История выдач менеджера."""
-        page = int(event.pattern_match.group(1).decode())
-        await process_history(event, page)
+        await process_history(event, *parse_issues_page(event.pattern_match))
     
-    async def process_history(event, page: int = 0):
-        """Показать историю выдач менеджера."""
-        sender = await event.get_sender()
-        tg_id = sender.id
+    async def process_history(event, page: int = 0, direction=None, cursor=None):
+        """Показать историю выдач менеджера (keyset-пагинация)."""
+        tg_id = event.sender_id
+        per_page = 5
         
         async with get_session() as session:
-            user = await issues_service.get_or_create_user(session, tg_id)
-            all_issues = await issues_service.get_all_issues(session, limit=100)
-            my_issues = [i for i in all_issues if i.user_id == user.id]
-            
-            if not my_issues:
-                text = (
-                    "📭 **История пуста**\n\n"
-                    "Ты ещё не запрашивал аккаунты."
+            user = await issues_service.get_user_identity(session, tg_id)
+            total = await issues_service.count_issues(session, user_id=user.id)
+            rows, has_next = [], False
+            if total:
+                rows, page, has_next = await issues_service.load_issues_page(
+                    session,
+                    functools.partial(issues_service.get_user_history_page, user_id=user.id),
+                    page,
+                    direction,
+                    cursor,
+                    per_page,
                 )
-                await event.edit(text, buttons=manager_history_empty())
-                return
             
-            # Пагинация
-            per_page = 5
-            start = page * per_page
-            end = start + per_page
-            page_issues = my_issues[start:end]
-            total_pages = max(1, (len(my_issues) + per_page - 1) // per_page)
-            
-            lines = [f"📜 **История выдач** (стр. {page + 1}/{total_pages})\n"]
-            
-            for issue in page_issues:
-                status_val = issue.status.value if hasattr(issue.status, 'value') else str(issue.status)
-                emoji = ISSUE_STATUS_EMOJI.get(status_val, "⚪")
-                date = issue.requested_at.strftime("%d.%m") if issue.requested_at else "?"
-                phone = issue.account.phone if issue.account else "—"
-                status_text = ISSUE_STATUS_NAMES.get(status_val, status_val).lower()
-                lines.append(f"`{date}` • {phone} — {emoji} {status_text}")
-            
-            text = "\n".join(lines)
-            await event.edit(text, buttons=manager_history_list(my_issues, page, per_page))
+        if not rows:
+            text = (
+                "📭 **История пуста**\n\n"
+                "Ты ещё не запрашивал аккаунты."
+            )
+            await event.edit(text, buttons=manager_history_empty())
+            return
+        
+        total_pages = max(1, (total + per_page - 1) // per_page)
+        lines = [f"📜 **История выдач** (стр. {page + 1}/{max(total_pages, page + 1)})\n"]
+        
+        for row in rows:
+            status_val = row.status.value if hasattr(row.status, 'value') else str(row.status)
+            emoji = ISSUE_STATUS_EMOJI.get(status_val, "⚪")
+            date = row.at.strftime("%d.%m") if row.at else "?"
+            phone = row.phone or "—"
+            status_text = ISSUE_STATUS_NAMES.get(status_val, status_val).lower()
+            lines.append(f"`{date}` • {phone} — {emoji} {status_text}")
+        
+        text = "\n".join(lines)
+        await event.edit(
+            text, buttons=manager_history_list(rows, page, total_pages, has_next)
+        )
     
     # ================================================================
     # СТАТУС ЗАЯВКИ
@@ -439,11 +418,10 @@ def register_manager_handlers(client: TelegramClient) -> None:
     @safe_edit
     async def cb_status(event):
         """Статус последней заявки."""
-        sender = await event.get_sender()
-        tg_id = sender.id
+        tg_id = event.sender_id
         
         async with get_session() as session:
-            user = await issues_service.get_or_create_user(session, tg_id)
+            user = await issues_service.get_user_identity(session, tg_id)
             pending = await issues_service.get_pending_by_user(session, user.id)
             
             if not pending:
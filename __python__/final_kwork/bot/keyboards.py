@@ -7,10 +7,11 @@
 - issue:<action>:<id>      - действия с заявками
 - acc:<action>:<id>        - действия с аккаунтами
 - filter:<type>:<page>     - фильтры с пагинацией
-- page:<prefix>:<num>      - пагинация
+- page:<prefix>:<num>[:a|b<cursor>] - пагинация (курсор — keyset)
 - mgr:<action>             - действия менеджера
 """
 from services.telethon_adapter import Button
+from utils.cursors import IssueCursor
 from typing import List
 
 
@@ -52,7 +53,7 @@ class CB:
     MGR_GET = "mgr:get"
     MGR_STATUS = "mgr:status"
     MGR_MY = "mgr:my"
-    MGR_HISTORY = "mgr:history"  # mgr:history:{page}
+    MGR_HISTORY = "mgr:history"  # mgr:history:{page}[:a|b<cursor>]
     MGR_HELP = "mgr:help"
     MGR_WAIT_CODE_AGAIN = "mgr:wait_code_again"
     MGR_CONTACT_ADMIN = "mgr:contact_admin"
@@ -147,22 +148,23 @@ def admin_accounts_list(
     accounts: list,
     filter_type: str,
     page: int = 0,
-    per_page: int = 5
+    total_pages: int = 1,
+    has_next: bool = False,
 ) -> List[List[Button]]:
-    """Список аккаунтов с пагинацией."""
+    """
+    Страница списка аккаунтов (keyset-пагинация).
+
+    accounts — уже выбранная страница. Кнопки навигации несут курсор:
+    filter:<type>:<page>:a<id> — вперёд после id, :b<id> — назад до id.
+    """
     buttons = []
     
-    start = page * per_page
-    end = start + per_page
-    page_accounts = accounts[start:end]
-    total_pages = max(1, (len(accounts) + per_page - 1) // per_page)
-    
     status_emoji = {
         "free": "🟢", "assigned": "🔵", 
         "disabled": "🔴", "needs_conversion": "🟡",
     }
     
-    for acc in page_accounts:
+    for acc in accounts:
         status_val = acc.status.value if hasattr(acc.status, 'value') else str(acc.status)
         emoji = status_emoji.get(status_val, "⚪")
         premium = "⭐" if acc.is_premium else ""
@@ -170,13 +172,19 @@ def admin_accounts_list(
         label = f"{emoji} {identifier} {premium}".strip()
         buttons.append([Button.inline(label, data=f"acc:detail:{acc.id}")])
     
-    if total_pages > 1:
+    if page > 0 or has_next:
         nav_row = []
         if page > 0:
-            nav_row.append(Button.inline("◀️", data=f"filter:{filter_type}:{page - 1}"))
-        nav_row.append(Button.inline(f"{page + 1}/{total_pages}", data=CB.NOOP))
-        if page < total_pages - 1:
-            nav_row.append(Button.inline("▶️", data=f"filter:{filter_type}:{page + 1}"))
+            prev_data = (
+                f"filter:{filter_type}:0" if page == 1
+                else f"filter:{filter_type}:{page - 1}:b{accounts[0].id}"
+            )
+            nav_row.append(Button.inline("◀️", data=prev_data))
+        nav_row.append(Button.inline(f"{page + 1}/{max(total_pages, page + 1)}", data=CB.NOOP))
+        if has_next:
+            nav_row.append(Button.inline(
+                "▶️", data=f"filter:{filter_type}:{page + 1}:a{accounts[-1].id}"
+            ))
         buttons.append(nav_row)
     
     buttons.append([Button.inline("⬅️ К фильтрам", data="nav:accounts")])
@@ -199,74 +207,89 @@ def admin_account_detail(account, can_convert: bool = False) -> List[List[Button
     return buttons
 
 
+def _issues_nav_row(prefix: str, rows: list, page: int, total_pages: int, has_next: bool) -> list:
+    """
+    Кнопки keyset-пагинации ленты заявок.
+
+    <prefix>:<page>:a<cursor> — вперёд после последней строки,
+    :b<cursor> — назад до первой (курсор — IssueCursor.encode()).
+    """
+    nav_row = []
+    if page > 0:
+        prev_data = (
+            f"{prefix}:0" if page == 1
+            else f"{prefix}:{page - 1}:b{IssueCursor.from_row(rows[0]).encode()}"
+        )
+        nav_row.append(Button.inline("◀️", data=prev_data))
+    nav_row.append(Button.inline(f"{page + 1}/{max(total_pages, page + 1)}", data=CB.NOOP))
+    if has_next:
+        nav_row.append(Button.inline(
+            "▶️", data=f"{prefix}:{page + 1}:a{IssueCursor.from_row(rows[-1]).encode()}"
+        ))
+    return nav_row
+
+
+def parse_issues_page(match) -> tuple:
+    """
+    (page, direction, cursor) из callback data кнопок _issues_nav_row.
+
+    match — результат регулярки с группами (page), (a|b), (cursor);
+    битый курсор — первая страница.
+    """
+    page = int(match.group(1).decode())
+    if not match.group(2):
+        return page, None, None
+    cursor = IssueCursor.decode(match.group(3).decode())
+    if cursor is None:
+        return 0, None, None
+    return page, match.group(2).decode(), cursor
+
+
 def admin_active_issues_list(
-    issues: list,
+    rows: list,
     page: int = 0,
-    per_page: int = 5
+    total_pages: int = 1,
+    has_next: bool = False,
 ) -> List[List[Button]]:
-    """Список активных выдач."""
+    """Страница активных выдач (строки issues_service.get_active_page)."""
     buttons = []
     
-    start = page * per_page
-    end = start + per_page
-    page_issues = issues[start:end]
-    total_pages = max(1, (len(issues) + per_page - 1) // per_page)
-    
-    for issue in page_issues:
-        user = issue.user
-        acc = issue.account
-        username = f"@{user.username}" if user and user.username else f"ID:{user.tg_id if user else '?'}"
-        phone = acc.phone if acc else "?"
+    for row in rows:
+        username = f"@{row.username}" if row.username else f"ID:{row.tg_id}"
+        phone = row.phone or "?"
         
         buttons.append([
-            Button.inline(f"#{issue.id} {username} {phone}", data=f"issue:detail:{issue.id}"),
-            Button.inline("🔒", data=f"issue:revoke:{issue.id}"),
+            Button.inline(f"#{row.id} {username} {phone}", data=f"issue:detail:{row.id}"),
+            Button.inline("🔒", data=f"issue:revoke:{row.id}"),
         ])
     
-    if total_pages > 1:
-        nav_row = []
-        if page > 0:
-            nav_row.append(Button.inline("◀️", data=f"page:active:{page - 1}"))
-        nav_row.append(Button.inline(f"{page + 1}/{total_pages}", data=CB.NOOP))
-        if page < total_pages - 1:
-            nav_row.append(Button.inline("▶️", data=f"page:active:{page + 1}"))
-        buttons.append(nav_row)
+    if page > 0 or has_next:
+        buttons.append(_issues_nav_row("page:active", rows, page, total_pages, has_next))
     
     buttons.append([Button.inline("⬅️ Назад", data="nav:main")])
     return buttons
 
 
 def admin_history_list(
-    issues: list,
+    rows: list,
     page: int = 0,
-    per_page: int = 8
+    total_pages: int = 1,
+    has_next: bool = False,
 ) -> List[List[Button]]:
-    """История заявок."""
+    """Страница истории заявок (строки issues_service.get_history_page)."""
     buttons = []
     
-    start = page * per_page
-    end = start + per_page
-    page_issues = issues[start:end]
-    total_pages = max(1, (len(issues) + per_page - 1) // per_page)
-    
     status_emoji = {"pending": "⏳", "approved": "✅", "rejected": "❌", "revoked": "🔴"}
     
-    for issue in page_issues:
-        status_val = issue.status.value if hasattr(issue.status, 'value') else str(issue.status)
+    for row in rows:
+        status_val = row.status.value if hasattr(row.status, 'value') else str(row.status)
         emoji = status_emoji.get(status_val, "⚪")
-        user = issue.user
-        username = f"@{user.username}" if user and user.username else f"ID:{user.tg_id if user else '?'}"
-        label = f"{emoji} #{issue.id} • {username}"
-        buttons.append([Button.inline(label, data=f"issue:detail:{issue.id}")])
+        username = f"@{row.username}" if row.username else f"ID:{row.tg_id}"
+        label = f"{emoji} #{row.id} • {username}"
+        buttons.append([Button.inline(label, data=f"issue:detail:{row.id}")])
     
-    if total_pages > 1:
-        nav_row = []
-        if page > 0:
-            nav_row.append(Button.inline("◀️", data=f"page:history:{page - 1}"))
-        nav_row.append(Button.inline(f"{page + 1}/{total_pages}", data=CB.NOOP))
-        if page < total_pages - 1:
-            nav_row.append(Button.inline("▶️", data=f"page:history:{page + 1}"))
-        buttons.append(nav_row)
+    if page > 0 or has_next:
+        buttons.append(_issues_nav_row("page:history", rows, page, total_pages, has_next))
     
     buttons.append([Button.inline("⬅️ Назад", data="nav:main")])
     return buttons
@@ -398,23 +421,16 @@ def manager_my_accounts_empty() -> List[List[Button]]:
 
 
 def manager_history_list(
-    issues: list,
+    rows: list,
     page: int = 0,
-    per_page: int = 5
+    total_pages: int = 1,
+    has_next: bool = False,
 ) -> List[List[Button]]:
-    """История выдач менеджера с пагинацией."""
+    """История выдач менеджера (keyset-пагинация по строкам get_user_history_page)."""
     buttons = []
-    total_pages = max(1, (len(issues) + per_page - 1) // per_page)
     
-    # Пагинация
-    if total_pages > 1:
-        nav_row = []
-        if page > 0:
-            nav_row.append(Button.inline("◀️", data=f"{CB.MGR_HISTORY}:{page - 1}"))
-        nav_row.append(Button.inline(f"{page + 1}/{total_pages}", data=CB.NOOP))
-        if page < total_pages - 1:
-            nav_row.append(Button.inline("▶️", data=f"{CB.MGR_HISTORY}:{page + 1}"))
-        buttons.append(nav_row)
+    if page > 0 or has_next:
+        buttons.append(_issues_nav_row(CB.MGR_HISTORY, rows, page, total_pages, has_next))
     
     buttons.append([Button.inline("⬅️ В меню", data=CB.MGR_MENU)])
     return buttons
@@ -600,6 +616,14 @@ def confirm_revoke_all(user_id: int, count: int) -> List[List[Button]]:
 # УТИЛИТЫ
 # ============================================================
 
+def admin_stats_buttons() -> List[List[Button]]:
+    """Кнопки экрана статистики."""
+    return [
+        [Button.inline("🔄 Обновить", data="stats:refresh")],
+        [Button.inline("⬅️ Назад", data="nav:main")],
+    ]
+
+
 def back_button(destination: str = "nav:main") -> List[List[Button]]:
     """Универсальная кнопка Назад."""
     return [[Button.inline("⬅️ Назад", data=destination)]]
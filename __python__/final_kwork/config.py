@@ -12,7 +12,7 @@ from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 
-from pydantic import Field, field_validator
+from pydantic import Field, ValidationInfo, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -39,6 +39,43 @@ class Settings(BaseSettings):
     database_url: str = Field(
         default="sqlite+aiosqlite:///./data.db", description="SQLAlchemy database URL"
     )
+    db_pool_size: int = Field(
+        default=5, ge=1, le=100, description="Connection pool size"
+    )
+    db_max_overflow: int = Field(
+        default=10, ge=0, le=100, description="Extra connections above pool size"
+    )
+    db_pool_timeout: int = Field(
+        default=30, ge=1, le=300, description="Wait for a free pool connection (seconds)"
+    )
+    db_pool_recycle: int = Field(
+        default=1800,
+        ge=-1,
+        description="Recycle server DB connections after N seconds (-1 = never)",
+    )
+    db_pool_pre_ping: bool = Field(
+        default=True, description="Ping server DB connections before use"
+    )
+    db_slow_query_ms: int = Field(
+        default=500, ge=1, description="Log SQL queries slower than this (ms)"
+    )
+
+    # === SQLite PRAGMA ===
+    sqlite_journal_mode: str = Field(
+        default="WAL", description="SQLite journal_mode (WAL lets readers skip writer locks)"
+    )
+    sqlite_synchronous: str = Field(
+        default="NORMAL", description="SQLite synchronous mode"
+    )
+    sqlite_busy_timeout_ms: int = Field(
+        default=5000, ge=0, le=60000, description="SQLite busy_timeout (ms)"
+    )
+    sqlite_mmap_size: int = Field(
+        default=268435456, ge=0, description="SQLite mmap_size (bytes, 0 = off)"
+    )
+    sqlite_cache_size_kib: int = Field(
+        default=20000, ge=0, description="SQLite page cache size (KiB)"
+    )
 
     # === Admin IDs ===
     admin_ids: str = Field(
@@ -59,6 +96,21 @@ class Settings(BaseSettings):
         description="Cooldown between account requests (seconds)",
     )
 
+    # === Rate limiting ===
+    rate_limit_backend: str = Field(
+        default="memory", description="Rate-limit store: memory | sqlite"
+    )
+    rate_limit_sqlite_path: str = Field(
+        default="./storage/rate_limits.db",
+        description="SQLite file for the sqlite rate-limit store",
+    )
+    active_limit_cache_ttl: int = Field(
+        default=600,
+        ge=10,
+        le=86400,
+        description="TTL of cached per-manager active account counters (seconds)",
+    )
+
     # === Telethon workers ===
     code_wait_timeout: int = Field(
         default=180,
@@ -66,6 +118,24 @@ class Settings(BaseSettings):
         le=600,
         description="Timeout for waiting confirmation code (seconds)",
     )
+    worker_max_concurrency: int = Field(
+        default=20,
+        ge=1,
+        le=500,
+        description="Max simultaneously running code listeners (others wait in queue)",
+    )
+    worker_queue_size: int = Field(
+        default=200,
+        ge=0,
+        le=10000,
+        description="Max code listeners waiting for a free slot",
+    )
+    worker_deadline: int = Field(
+        default=300,
+        ge=60,
+        le=3600,
+        description="Deadline for a code listener from submission: queue + connect + code wait (seconds)",
+    )
 
     # === Telethon connection settings ===
     connection_retries: int = Field(
@@ -87,6 +157,17 @@ class Settings(BaseSettings):
         default=30, ge=5, le=120, description="Connection timeout (seconds)"
     )
 
+    # === tdata conversion ===
+    tdata_conversion_workers: int = Field(
+        default=2, ge=1, le=16, description="Processes for CPU-bound tdata conversion"
+    )
+    tdata_conversion_timeout: int = Field(
+        default=120,
+        ge=10,
+        le=1800,
+        description="Timeout for a single tdata conversion (seconds)",
+    )
+
     # === Paths ===
     sessions_dir: str = Field(
         default="./sessions", description="Directory for session files"
@@ -94,6 +175,10 @@ class Settings(BaseSettings):
     storage_dir: str = Field(
         default="./storage", description="Directory for general storage (tdata, etc.)"
     )
+    phone_country_codes_file: str = Field(
+        default="",
+        description="Optional JSON file {prefix: country} extending built-in phone codes",
+    )
 
     # === Per-account API settings ===
     account_json_filenames: str = Field(
@@ -105,6 +190,73 @@ class Settings(BaseSettings):
         description="Use TG_API_ID/TG_API_HASH from .env.example if account JSON not found",
     )
 
+    # === Stats ===
+    stats_reconcile_interval: int = Field(
+        default=300,
+        ge=30,
+        le=3600,
+        description="Interval of stats snapshot reconciliation with DB (seconds)",
+    )
+
+    # === Health ===
+    health_fs_cache_ttl: int = Field(
+        default=30,
+        ge=0,
+        le=3600,
+        description="Cache TTL for filesystem health checks (seconds)",
+    )
+    health_check_timeout: int = Field(
+        default=10, ge=1, le=120, description="Timeout of a single health check (seconds)"
+    )
+    health_check_deadline: int = Field(
+        default=20, ge=1, le=300, description="Deadline for the whole health run (seconds)"
+    )
+    health_telegram_cache_ttl: int = Field(
+        default=60,
+        ge=0,
+        le=3600,
+        description="Reuse a successful Telegram API check for N seconds",
+    )
+    health_history_size: int = Field(
+        default=50, ge=1, le=1000, description="Health runs kept in history"
+    )
+
+    # === Instrumentation ===
+    loop_lag_interval: float = Field(
+        default=0.5, ge=0.05, le=60, description="Event loop lag sampling interval (seconds)"
+    )
+    perf_log_interval: int = Field(
+        default=300,
+        ge=0,
+        le=86400,
+        description="Log a perf summary every N seconds (0 = off)",
+    )
+
+    # === User cache ===
+    user_cache_size: int = Field(
+        default=2048, ge=16, le=1000000, description="Max users kept in the in-process cache"
+    )
+    user_cache_ttl: int = Field(
+        default=300, ge=0, le=86400, description="User cache entry TTL (seconds, 0 = off)"
+    )
+
+    # === Notifications ===
+    notify_concurrency: int = Field(
+        default=8, ge=1, le=100, description="Max notifications delivered concurrently"
+    )
+    notify_chat_rate: float = Field(
+        default=1.0, gt=0, le=30, description="Messages per second per chat"
+    )
+    notify_chat_burst: int = Field(
+        default=3, ge=1, le=30, description="Per-chat burst size (token bucket capacity)"
+    )
+    notify_queue_size: int = Field(
+        default=1000, ge=10, le=100000, description="Outbound notification queue size"
+    )
+    notify_max_retries: int = Field(
+        default=3, ge=0, le=10, description="Retries of a notification after FloodWait/errors"
+    )
+
     # === Feature flags ===
     debug: bool = Field(default=False, description="Enable debug mode")
     log_level: str = Field(default="INFO", description="Logging level")
@@ -139,6 +291,29 @@ class Settings(BaseSettings):
             int(x.strip()) for x in self.admin_ids.split(",") if x.strip().isdigit()
         ]
 
+    @field_validator("sqlite_journal_mode", "sqlite_synchronous")
+    @classmethod
+    def validate_sqlite_pragma(cls, v: str, info: ValidationInfo) -> str:
+        """Валидация значений PRAGMA (подставляются в SQL как есть)."""
+        allowed = {
+            "sqlite_journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+            "sqlite_synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+        }[info.field_name]
+        upper = v.upper()
+        if upper not in allowed:
+            raise ValueError(f"{info.field_name} must be one of {allowed}")
+        return upper
+
+    @field_validator("rate_limit_backend")
+    @classmethod
+    def validate_rate_limit_backend(cls, v: str) -> str:
+        """Валидация хранилища лимитов."""
+        allowed = {"memory", "sqlite"}
+        lower = v.lower()
+        if lower not in allowed:
+            raise ValueError(f"rate_limit_backend must be one of {allowed}")
+        return lower
+
     @field_validator("log_level")
     @classmethod
     def validate_log_level(cls, v: str) -> str:
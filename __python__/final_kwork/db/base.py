@@ -1,13 +1,197 @@
 """
 База SQLAlchemy 2.0 с async engine.
+
+Параметры пула и SQLite PRAGMA берутся из Settings (секция Database).
+Для наблюдаемости собираются метрики: ожидание соединения из пула
+и задержка SQL-запросов (см. get_db_metrics).
 """
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Метрики БД
+# =============================================================================
+
+
+@dataclass
+class DbMetrics:
+    """Метрики пула соединений и запросов."""
+    checkouts: int = 0
+    checkout_wait_total_ms: float = 0.0
+    checkout_wait_max_ms: float = 0.0
+    queries: int = 0
+    query_time_total_ms: float = 0.0
+    query_time_max_ms: float = 0.0
+    slow_queries: int = 0
+
+    @property
+    def checkout_wait_avg_ms(self) -> float:
+        return self.checkout_wait_total_ms / self.checkouts if self.checkouts else 0.0
+
+    @property
+    def query_time_avg_ms(self) -> float:
+        return self.query_time_total_ms / self.queries if self.queries else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "checkout_wait_avg_ms": round(self.checkout_wait_avg_ms, 2),
+            "checkout_wait_max_ms": round(self.checkout_wait_max_ms, 2),
+            "queries": self.queries,
+            "query_time_avg_ms": round(self.query_time_avg_ms, 2),
+            "query_time_max_ms": round(self.query_time_max_ms, 2),
+            "slow_queries": self.slow_queries,
+        }
+
+
+_metrics = DbMetrics()
+# События пула и курсора приходят из потоков драйвера
+_metrics_lock = threading.Lock()
+
+
+def _record_checkout_wait(wait_ms: float) -> None:
+    with _metrics_lock:
+        _metrics.checkouts += 1
+        _metrics.checkout_wait_total_ms += wait_ms
+        _metrics.checkout_wait_max_ms = max(_metrics.checkout_wait_max_ms, wait_ms)
+
+
+def _record_query(duration_ms: float, statement: str) -> None:
+    with _metrics_lock:
+        _metrics.queries += 1
+        _metrics.query_time_total_ms += duration_ms
+        _metrics.query_time_max_ms = max(_metrics.query_time_max_ms, duration_ms)
+        if duration_ms >= settings.db_slow_query_ms:
+            _metrics.slow_queries += 1
+            slow = True
+        else:
+            slow = False
+
+    if slow:
+        logger.warning(f"[db] slow query {duration_ms:.0f}ms: {statement[:200]}")
+
+
+def get_db_metrics() -> dict:
+    """Снимок метрик БД (включая текущее состояние пула)."""
+    with _metrics_lock:
+        data = _metrics.to_dict()
+
+    pool = engine.sync_engine.pool
+    data["pool"] = pool.status()
+    return data
+
+
+def reset_db_metrics() -> None:
+    """Сбросить накопленные метрики."""
+    global _metrics
+    with _metrics_lock:
+        _metrics = DbMetrics()
+
+
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания свободного соединения."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_checkout_wait((time.perf_counter() - start) * 1000)
+
+
+# =============================================================================
+# Engine
+# =============================================================================
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def _build_engine_kwargs(database_url: str) -> dict:
+    """Параметры create_async_engine в зависимости от диалекта."""
+    url = make_url(database_url)
+    kwargs = {"echo": False}
+
+    if url.get_backend_name() == "sqlite" and _is_sqlite_memory(url):
+        # In-memory SQLite живёт в одном соединении — пул не настраиваем
+        return kwargs
+
+    kwargs.update(
+        poolclass=_TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+    if url.get_backend_name() == "sqlite":
+        # Локальный файл: pre-ping и recycle бессмысленны
+        kwargs.update(pool_pre_ping=False, pool_recycle=-1)
+
+    return kwargs
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """PRAGMA при открытии каждого SQLite-соединения."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        # Отрицательное значение = размер в KiB, а не в страницах
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}")
+    finally:
+        cursor.close()
+
+
+# Время старта хранится в контексте выполнения, а не в conn.info:
+# запрос, упавший с ошибкой, не оставляет после себя «висящую» отметку
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    _record_query(duration_ms, statement)
+
+
+def _create_engine():
+    engine = create_async_engine(
+        settings.database_url, **_build_engine_kwargs(settings.database_url)
+    )
+    sync_engine = engine.sync_engine
+
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", _set_sqlite_pragmas)
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+    return engine
+
+
 # Async engine
-engine = create_async_engine(settings.database_url, echo=False)
+engine = _create_engine()
 
 # Session factory
 async_session = async_sessionmaker(engine, expire_on_commit=False)
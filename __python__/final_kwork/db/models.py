@@ -5,7 +5,7 @@ import enum
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Enum, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Boolean, DateTime, Enum, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.base import Base
@@ -49,6 +49,18 @@ class IssueStatus(str, enum.Enum):
 class Proxy(Base):
     """Прокси-серверы для аккаунтов."""
     __tablename__ = "proxies"
+    __table_args__ = (
+        # Покрывающий индекс для подбора прокси (get_best_proxy_for_account):
+        # id сразу после is_active — GROUP BY идёт по порядку индекса
+        Index(
+            "ix_proxies_selection",
+            "is_active",
+            "id",
+            "country",
+            "max_accounts",
+            "latency_ms",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     
@@ -127,6 +139,18 @@ class User(Base):
 class Account(Base):
     """Telegram-аккаунты для выдачи."""
     __tablename__ = "accounts"
+    __table_args__ = (
+        # Частичный индекс очереди свободных аккаунтов (get_free_account_with_lock).
+        # status в ключе нужен планировщику SQLite: иначе равенство по status
+        # уводит запрос на ix_accounts_status
+        Index(
+            "ix_accounts_free_ready",
+            "status",
+            "id",
+            sqlite_where=text("status = 'free' AND session_path IS NOT NULL"),
+            postgresql_where=text("status = 'free' AND session_path IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     
@@ -180,9 +204,30 @@ class Account(Base):
     issues: Mapped[List["Issue"]] = relationship("Issue", back_populates="account")
 
 
+# Условие «активной выдачи» для частичных индексов (Enum(IssueStatus) хранит имена)
+_ACTIVE_ISSUE = "status = 'APPROVED' AND confirmation_code IS NOT NULL"
+
+
 class Issue(Base):
     """Заявки на выдачу аккаунтов."""
     __tablename__ = "issues"
+    __table_args__ = (
+        # Keyset-пагинация лент заявок (issues_service.get_*_page)
+        Index("ix_issues_status_approved_at", "status", "approved_at", "id"),
+        Index("ix_issues_user_requested_at", "user_id", "requested_at", "id"),
+        Index("ix_issues_requested_at", "requested_at", "id"),
+        # Активные выдачи менеджера (APPROVED с отправленным кодом):
+        # check_manager_limit, get_user_active_issues. status в ключе — чтобы
+        # планировщик не предпочёл ix_issues_user_requested_at
+        Index(
+            "ix_issues_active_by_user",
+            "user_id",
+            "status",
+            "approved_at",
+            sqlite_where=text(_ACTIVE_ISSUE),
+            postgresql_where=text(_ACTIVE_ISSUE),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
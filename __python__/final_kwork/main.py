@@ -123,6 +123,30 @@ async def shutdown(client: TelegramClient) -> None:
     except Exception as e:
         logger.warning(f"Ошибка при остановке ProxyPool: {e}")
 
+    # Останавливаем мониторинг event loop
+    try:
+        from utils.instrumentation import stop_loop_monitor
+
+        await stop_loop_monitor()
+    except Exception as e:
+        logger.warning(f"Ошибка при остановке мониторинга event loop: {e}")
+
+    # Останавливаем сверку статистики
+    try:
+        from services.stats_service import stop_stats_reconciler
+
+        await stop_stats_reconciler()
+    except Exception as e:
+        logger.warning(f"Ошибка при остановке сверки статистики: {e}")
+
+    # Останавливаем пул конвертации tdata
+    try:
+        from services.conversion_pool import get_conversion_pool
+
+        get_conversion_pool().shutdown()
+    except Exception as e:
+        logger.warning(f"Ошибка при остановке пула конвертации: {e}")
+
     # Останавливаем всех workers
     try:
         from services.telethon_workers import stop_all_workers
@@ -133,6 +157,14 @@ async def shutdown(client: TelegramClient) -> None:
     except Exception as e:
         logger.warning(f"Ошибка при остановке воркеров: {e}")
 
+    # Досылаем очередь уведомлений, пока клиент ещё подключён
+    try:
+        from services.notification_service import get_notification_dispatcher
+
+        await get_notification_dispatcher().stop()
+    except Exception as e:
+        logger.warning(f"Ошибка при остановке диспетчера уведомлений: {e}")
+
     # Отключаем клиента
     if client and client.is_connected():
         try:
@@ -183,6 +215,30 @@ async def main() -> None:
     except Exception as e:
         logger.warning(f"Ошибка инициализации ProxyPool: {e}")
 
+    # Пул процессов для конвертации tdata
+    try:
+        from services.conversion_pool import get_conversion_pool
+
+        get_conversion_pool().start()
+    except Exception as e:
+        logger.warning(f"Ошибка запуска пула конвертации: {e}")
+
+    # Снимок статистики (строится из БД и далее обновляется дельтами)
+    try:
+        from services.stats_service import start_stats_reconciler
+
+        await start_stats_reconciler()
+    except Exception as e:
+        logger.warning(f"Ошибка запуска сверки статистики: {e}")
+
+    # Замер задержки event loop и сводка производительности
+    try:
+        from utils.instrumentation import start_loop_monitor
+
+        await start_loop_monitor()
+    except Exception as e:
+        logger.warning(f"Ошибка запуска мониторинга event loop: {e}")
+
     # Создание клиента бота с параметрами устойчивости
     _client = TelegramClient(
         "test_bot_session",
@@ -210,6 +266,11 @@ async def main() -> None:
     # Регистрация обработчиков
     register_all_handlers(_client)
 
+    # Очередь исходящих уведомлений (отправка начнётся после подключения)
+    from services.notification_service import get_notification_dispatcher
+
+    get_notification_dispatcher().start(_client)
+
     # Основной цикл с автоматическим переподключением
     reconnect_count = 0
     max_reconnects = 10
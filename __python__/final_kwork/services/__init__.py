@@ -1,32 +1,44 @@
 """Сервисы бизнес-логики."""
 from services import (
     accounts_service,
+    admission_service,
     ai_stub,
     batch_import_service,
+    conversion_pool,
     health_service,
     issues_service,
+    notification_service,
     proxy_service,
     proxy_pool,
+    rate_limiter,
     security_service,
     session_import_service,
     stats_service,
     tdata_converter,
     telethon_adapter,
     telethon_workers,
+    user_cache,
+    worker_supervisor,
 )
 
 __all__ = [
     'accounts_service',
+    'admission_service',
     'ai_stub',
     'batch_import_service',
+    'conversion_pool',
     'health_service',
     'issues_service',
+    'notification_service',
     'proxy_service',
     'proxy_pool',
+    'rate_limiter',
     'security_service',
     'session_import_service',
     'stats_service',
     'tdata_converter',
     'telethon_adapter',
     'telethon_workers',
+    'user_cache',
+    'worker_supervisor',
 ]
\ No newline at end of file
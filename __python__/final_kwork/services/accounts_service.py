@@ -7,73 +7,101 @@
 import logging
 import os
 import shutil
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import Account, AccountStatus, StorageType
+from services import stats_service
 
 logger = logging.getLogger(__name__)
 
 
-async def get_free_account_with_lock(
-    session: AsyncSession, _retry_count: int = 0
-) -> Optional[Account]:
+# Максимум попыток захвата для диалектов без атомарного UPDATE ... RETURNING
+_ALLOCATE_MAX_ATTEMPTS = 5
+
+
+def _free_account_candidates():
+    """Базовый запрос кандидатов на выдачу (идёт по частичному индексу ix_accounts_free_ready)."""
+    return (
+        select(Account.id)
+        .where(Account.status == AccountStatus.FREE, Account.session_path.isnot(None))
+        .order_by(Account.id)
+        .limit(1)
+    )
+
+
+async def get_free_account_with_lock(session: AsyncSession) -> Optional[Account]:
     """
     Получить и заблокировать свободный аккаунт для выдачи.
 
-    Использует атомарный UPDATE с WHERE для защиты от race condition.
-    Два админа не смогут выдать один аккаунт одновременно.
+    Захват выполняется одним атомарным UPDATE ... RETURNING, поэтому
+    конкурирующие админы не выбирают одну и ту же строку и не уходят в повторы:
+    - PostgreSQL: кандидат выбирается через FOR UPDATE SKIP LOCKED —
+      строки, захваченные параллельными транзакциями, просто пропускаются;
+    - SQLite: запись сериализуется на уровне БД, подзапрос и UPDATE
+      выполняются в одном операторе, гонки между ними нет.
+    Для прочих диалектов — SELECT + условный UPDATE с ограниченным числом попыток.
 
     Args:
         session: Сессия БД
-        _retry_count: Внутренний счётчик попыток (не передавать вручную)
 
     Returns:
         Account если найден и заблокирован, None если нет свободных.
     """
-    MAX_RETRIES = 5
+    dialect = session.get_bind().dialect.name
 
-    if _retry_count >= MAX_RETRIES:
-        logger.error(
-            f"[get_free_account_with_lock] max retries exceeded ({MAX_RETRIES})"
-        )
-        return None
+    if dialect in ("postgresql", "sqlite"):
+        candidate = _free_account_candidates()
+        if dialect == "postgresql":
+            candidate = candidate.with_for_update(skip_locked=True)
 
-    stmt = (
-        select(Account.id)
-        .where(Account.status == AccountStatus.FREE, Account.session_path.isnot(None))
-        .limit(1)
-    )
+        update_stmt = (
+            update(Account)
+            .where(
+                Account.id == candidate.scalar_subquery(),
+                Account.status == AccountStatus.FREE,
+            )
+            .values(status=AccountStatus.ASSIGNED)
+            .returning(Account.id)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(update_stmt)
+        updated_id = result.scalar_one_or_none()
+    else:
+        updated_id = None
+        for attempt in range(1, _ALLOCATE_MAX_ATTEMPTS + 1):
+            result = await session.execute(_free_account_candidates())
+            account_id = result.scalar_one_or_none()
+            if not account_id:
+                break
+
+            update_result = await session.execute(
+                update(Account)
+                .where(Account.id == account_id, Account.status == AccountStatus.FREE)
+                .values(status=AccountStatus.ASSIGNED)
+                .returning(Account.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated_id = update_result.scalar_one_or_none()
+            if updated_id:
+                break
 
-    result = await session.execute(stmt)
-    account_id = result.scalar_one_or_none()
+            logger.warning(
+                f"[get_free_account_with_lock] race for account_id={account_id}, attempt {attempt}"
+            )
 
-    if not account_id:
+    if not updated_id:
         logger.debug("[get_free_account_with_lock] no free accounts")
         return None
 
-    # Атомарно обновляем статус (защита от race condition)
-    update_stmt = (
-        update(Account)
-        .where(Account.id == account_id, Account.status == AccountStatus.FREE)
-        .values(status=AccountStatus.ASSIGNED)
-        .returning(Account.id)
+    stats_service.record_account_transition(
+        session, AccountStatus.FREE, AccountStatus.ASSIGNED
     )
 
-    update_result = await session.execute(update_stmt)
-    updated_id = update_result.scalar_one_or_none()
-
-    if not updated_id:
-        # Гонка — пробуем ещё раз с увеличенным счётчиком
-        logger.warning(
-            f"[get_free_account_with_lock] race for account_id={account_id}, retry {_retry_count + 1}"
-        )
-        return await get_free_account_with_lock(session, _retry_count + 1)
-
-    # Получаем полный объект
-    account = await session.get(Account, updated_id)
+    # Получаем полный объект (populate_existing — статус в identity map мог устареть)
+    account = await session.get(Account, updated_id, populate_existing=True)
     logger.info(f"[get_free_account_with_lock] locked account_id={account.id}")
 
     return account
@@ -93,8 +121,71 @@ async def get_all_accounts(session: AsyncSession) -> List[Account]:
     return list(result.scalars().all())
 
 
+async def count_accounts_by_status(session: AsyncSession) -> Dict[str, int]:
+    """
+    Количество аккаунтов по статусам (один GROUP BY по индексу status).
+
+    Returns:
+        {значение статуса: количество}, только статусы с ненулевым количеством.
+    """
+    result = await session.execute(
+        select(Account.status, func.count(Account.id)).group_by(Account.status)
+    )
+    return {
+        (status.value if hasattr(status, "value") else str(status)): count
+        for status, count in result.all()
+    }
+
+
+async def get_accounts_page(
+    session: AsyncSession,
+    status: Optional[AccountStatus] = None,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    limit: int = 5,
+) -> Tuple[List[Account], bool]:
+    """
+    Страница аккаунтов с keyset-пагинацией по id.
+
+    WHERE status = ? AND id > ? ORDER BY id LIMIT n — стоимость не зависит
+    от номера страницы и размера таблицы.
+
+    Args:
+        session: Сессия БД
+        status: Фильтр по статусу (None — все аккаунты)
+        after_id: Вернуть аккаунты с id > after_id (страница вперёд)
+        before_id: Вернуть аккаунты с id < before_id (страница назад)
+        limit: Размер страницы
+
+    Returns:
+        (аккаунты по возрастанию id, есть ли ещё строки в направлении обхода)
+    """
+    stmt = select(Account)
+    if status is not None:
+        stmt = stmt.where(Account.status == status)
+
+    if before_id is not None:
+        stmt = stmt.where(Account.id < before_id).order_by(Account.id.desc())
+    else:
+        if after_id is not None:
+            stmt = stmt.where(Account.id > after_id)
+        stmt = stmt.order_by(Account.id)
+
+    # Берём на одну строку больше, чтобы узнать, есть ли продолжение
+    result = await session.execute(stmt.limit(limit + 1))
+    accounts = list(result.scalars().all())
+
+    has_more = len(accounts) > limit
+    accounts = accounts[:limit]
+    if before_id is not None:
+        accounts.reverse()
+
+    return accounts, has_more
+
+
 async def release_account(session: AsyncSession, account: Account) -> None:
     """Освободить аккаунт (вернуть статус FREE)."""
+    stats_service.record_account_transition(session, account.status, AccountStatus.FREE)
     account.status = AccountStatus.FREE
     await session.flush()
     logger.info(f"[release_account] account_id={account.id} released")
@@ -104,6 +195,9 @@ async def disable_account(
     session: AsyncSession, account: Account, error_text: Optional[str] = None
 ) -> None:
     """Отключить проблемный аккаунт."""
+    stats_service.record_account_transition(
+        session, account.status, AccountStatus.DISABLED
+    )
     account.status = AccountStatus.DISABLED
     if error_text:
         account.error_text = error_text
@@ -150,6 +244,7 @@ async def delete_account(
                 logger.warning(f"[delete_account] failed to delete tdata: {e}")
 
     # Удаляем из БД
+    stats_service.record_account_transition(session, account.status, None)
     await session.delete(account)
     await session.flush()
 
@@ -206,6 +301,7 @@ async def add_account(
     session.add(account)
     await session.flush()
     await session.refresh(account)
+    stats_service.record_account_transition(session, None, AccountStatus.FREE)
 
     logger.info(f"[add_account] NEW: phone={phone}, account_id={account.id}")
     return account
@@ -0,0 +1,135 @@
+"""
+Сервис приёма запросов менеджеров на выдачу аккаунта.
+
+Весь приём — одна транзакция с ограниченным набором запросов,
+не зависящим от длины истории менеджера:
+1. Пользователь (кэш user_cache; SELECT/INSERT только при промахе)
+2. Лимиты (security_service: счётчики без COUNT на каждый запрос)
+3. Агрегаты истории (один GROUP BY по статусам)
+4. Оценка риска по агрегатам (ai_stub.score_from_aggregates)
+5. Создание заявки (INSERT)
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Issue, IssueStatus
+from services import ai_stub, issues_service, security_service
+from services.user_cache import CachedUser
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class UserHistoryStats:
+    """Агрегаты истории заявок пользователя."""
+
+    total: int = 0
+    by_status: Dict[str, int] = field(default_factory=dict)
+    recent_requests: int = 0  # За последние RECENT_REQUESTS_WINDOW_HOURS часов
+
+    @property
+    def approved(self) -> int:
+        return self.by_status.get(IssueStatus.APPROVED.value, 0)
+
+    @property
+    def revoked(self) -> int:
+        return self.by_status.get(IssueStatus.REVOKED.value, 0)
+
+    @property
+    def rejected(self) -> int:
+        return self.by_status.get(IssueStatus.REJECTED.value, 0)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "by_status": dict(self.by_status),
+            "recent_requests": self.recent_requests,
+        }
+
+
+@dataclass
+class AdmissionResult:
+    """Результат приёма запроса."""
+
+    admitted: bool
+    user: CachedUser
+    error: str = ""
+    issue: Optional[Issue] = None
+    history: UserHistoryStats = field(default_factory=UserHistoryStats)
+    risk_score: Optional[float] = None
+
+
+async def get_user_history_stats(
+    session: AsyncSession, user_id: int
+) -> UserHistoryStats:
+    """Агрегаты истории пользователя одним запросом (по статусам + за 24 часа)."""
+    window_start = datetime.utcnow() - timedelta(
+        hours=ai_stub.RECENT_REQUESTS_WINDOW_HOURS
+    )
+    stmt = (
+        select(
+            Issue.status,
+            func.count(Issue.id),
+            func.coalesce(
+                func.sum(case((Issue.requested_at >= window_start, 1), else_=0)), 0
+            ),
+        )
+        .where(Issue.user_id == user_id)
+        .group_by(Issue.status)
+    )
+    result = await session.execute(stmt)
+
+    stats = UserHistoryStats()
+    for status, count, recent in result.all():
+        stats.by_status[status.value] = count
+        stats.total += count
+        stats.recent_requests += recent
+    return stats
+
+
+async def admit_request(
+    session: AsyncSession,
+    tg_id: int,
+    username: Optional[str] = None,
+    full_name: Optional[str] = None,
+    ip_address: Optional[str] = None,
+) -> AdmissionResult:
+    """
+    Принять запрос менеджера на выдачу аккаунта.
+
+    Вызывается внутри одной сессии (get_session) — commit выполняет вызывающий.
+
+    Returns:
+        AdmissionResult: admitted=False и error, если запрос отклонён лимитами
+    """
+    user = await issues_service.get_user_identity(session, tg_id, username, full_name)
+
+    is_valid, error_msg = await security_service.validate_request(session, user.id)
+    if not is_valid:
+        return AdmissionResult(admitted=False, user=user, error=error_msg)
+
+    history = await get_user_history_stats(session, user.id)
+    risk_score = ai_stub.score_from_aggregates(
+        history.total, history.revoked, history.rejected, history.recent_requests
+    )
+
+    issue = await issues_service.create_issue(
+        session, user, ip_address=ip_address, risk_score=risk_score
+    )
+    logger.info(
+        f"[admission] issue #{issue.id} for tg_id={tg_id}: "
+        f"history={history.total}, risk={risk_score:.2f}"
+    )
+
+    return AdmissionResult(
+        admitted=True,
+        user=user,
+        issue=issue,
+        history=history,
+        risk_score=risk_score,
+    )
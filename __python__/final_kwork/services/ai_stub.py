@@ -19,6 +19,46 @@ RECENT_REQUESTS_WINDOW_HOURS = 24
 MAX_RECENT_REQUESTS = 5
 
 
+def score_from_aggregates(
+    total: int, revoked_count: int, rejected_count: int, recent_requests: int
+) -> float:
+    """
+    Оценка риска по агрегатам истории пользователя.
+
+    Args:
+        total: Всего заявок
+        revoked_count: Отозванных
+        rejected_count: Отклонённых
+        recent_requests: Заявок за последние RECENT_REQUESTS_WINDOW_HOURS часов
+
+    Returns:
+        risk_score от 0.0 (безопасно) до 1.0 (подозрительно)
+    """
+    if not total:
+        return 0.1  # Новый пользователь - низкий риск
+
+    risk_score = 0.0
+
+    # 1. Отозванные аккаунты
+    if revoked_count >= MAX_REVOKED_FOR_HIGH_RISK:
+        risk_score += 0.5
+    elif revoked_count >= MAX_REVOKED_FOR_MEDIUM_RISK:
+        risk_score += 0.2
+
+    # 2. Частота запросов за последние 24 часа
+    if recent_requests >= MAX_RECENT_REQUESTS:
+        risk_score += 0.3
+    elif recent_requests >= 3:
+        risk_score += 0.1
+
+    # 3. Наличие отклонённых заявок
+    if rejected_count >= 2:
+        risk_score += 0.2
+
+    # Нормализуем до [0, 1]
+    return min(1.0, max(0.0, risk_score))
+
+
 async def analyze_request(
     user_tg_id: int, 
     username: Optional[str], 
@@ -36,18 +76,12 @@ async def analyze_request(
         risk_score от 0.0 (безопасно) до 1.0 (подозрительно)
     """
     if not history:
-        return 0.1  # Новый пользователь - низкий риск
+        return score_from_aggregates(0, 0, 0, 0)
     
-    risk_score = 0.0
-    
-    # 1. Подсчёт отозванных аккаунтов
     revoked_count = sum(1 for h in history if h.get("status") == "revoked")
-    if revoked_count >= MAX_REVOKED_FOR_HIGH_RISK:
-        risk_score += 0.5
-    elif revoked_count >= MAX_REVOKED_FOR_MEDIUM_RISK:
-        risk_score += 0.2
+    rejected_count = sum(1 for h in history if h.get("status") == "rejected")
     
-    # 2. Частота запросов за последние 24 часа
+    # Частота запросов за последние 24 часа
     now = datetime.utcnow()
     window_start = now - timedelta(hours=RECENT_REQUESTS_WINDOW_HOURS)
     recent_requests = 0
@@ -63,15 +97,6 @@ async def analyze_request(
             if isinstance(requested_at, datetime) and requested_at >= window_start:
                 recent_requests += 1
     
-    if recent_requests >= MAX_RECENT_REQUESTS:
-        risk_score += 0.3
-    elif recent_requests >= 3:
-        risk_score += 0.1
-    
-    # 3. Наличие отклонённых заявок
-    rejected_count = sum(1 for h in history if h.get("status") == "rejected")
-    if rejected_count >= 2:
-        risk_score += 0.2
-    
-    # Нормализуем до [0, 1]
-    return min(1.0, max(0.0, risk_score))
+    return score_from_aggregates(
+        len(history), revoked_count, rejected_count, recent_requests
+    )
@@ -6,17 +6,24 @@
 - Автоматический поиск JSON с api_id/api_hash рядом с каждой сессией
 - Различные форматы JSON (плоский, вложенный, разные ключи)
 - Отчёт об импорте с детализацией
+
+Импорт идёт в два этапа:
+1. Планирование (в потоках): индекс JSON (JsonMetadataIndex),
+   параллельное чтение заголовков .session файлов
+2. Запись в БД: один запрос на дубликаты, одна транзакция на все аккаунты
 """
 
+import asyncio
 import json
 import logging
 import os
 import shutil
 import uuid
-import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import settings
@@ -24,18 +31,29 @@ from db.models import Account, AccountStatus, StorageType
 from services.session_import_service import (
     INBOX_DIR,
     SESSIONS_DIR,
+    JsonMetadataIndex,
     ensure_directories,
+    SessionValidationResult,
     validate_session,
+    validate_session_offline,
     check_duplicate,
     extract_api_credentials_from_dict,
+    extract_zip_members,
+    ZipExtractError,
 )
-from services import proxy_service
+from services import proxy_service, stats_service
 
 logger = logging.getLogger(__name__)
 
 # Максимальный размер ZIP (500 MB)
 MAX_ZIP_SIZE = 500 * 1024 * 1024
 
+# Потоков для чтения .session файлов (работа в основном с диском)
+HEADER_READ_WORKERS = 4
+
+# Размер пачки для запроса дубликатов (лимит параметров SQLite)
+_DUPLICATE_QUERY_CHUNK = 500
+
 
 @dataclass
 class SessionImportItem:
@@ -129,35 +147,31 @@ class BatchImportReport:
         return "\n".join(lines)
 
 
-def extract_zip(zip_path: str, dst_dir: str) -> Tuple[bool, str]:
+def _is_batch_member(name: str) -> bool:
+    """Нужен ли член архива для пакетного импорта (.session и .json)."""
+    lower = name.lower()
+    return lower.endswith(".session") or lower.endswith(".json")
+
+
+def extract_zip(zip_data: bytes, dst_dir: str) -> Tuple[bool, str]:
     """
-    Распаковать ZIP-архив.
+    Распаковать из ZIP-архива только .session и .json файлы.
 
     Args:
-        zip_path: Путь к ZIP файлу
+        zip_data: Содержимое ZIP файла
         dst_dir: Целевая директория
 
     Returns:
         (success, error_message)
     """
     try:
-        os.makedirs(dst_dir, exist_ok=True)
-
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            # Проверка на ZIP bomb
-            total_size = sum(info.file_size for info in zf.infolist())
-            if total_size > MAX_ZIP_SIZE * 10:
-                return (
-                    False,
-                    f"Архив слишком большой после распаковки ({total_size // 1024 // 1024} MB)",
-                )
-
-            zf.extractall(dst_dir)
-
+        extract_zip_members(
+            zip_data, dst_dir, _is_batch_member, max_total_size=MAX_ZIP_SIZE * 10
+        )
         return True, ""
 
-    except zipfile.BadZipFile:
-        return False, "Повреждённый ZIP-архив"
+    except ZipExtractError as e:
+        return False, str(e)
     except Exception as e:
         return False, f"Ошибка распаковки: {e}"
 
@@ -258,6 +272,247 @@ def mask_api_hash(api_hash: str) -> str:
     return f"{api_hash[:4]}...{api_hash[-4:]}"
 
 
+def _find_session_credentials(
+    json_index: JsonMetadataIndex, session_path: str
+) -> Tuple[Optional[str], Optional[Tuple[int, str]]]:
+    """
+    Найти JSON и credentials для сессии по индексу (та же стратегия, что find_matching_json).
+
+    Returns:
+        (json_path, (api_id, api_hash)) — любой элемент может быть None
+    """
+    files = json_index.list_json(os.path.dirname(session_path))
+    if not files:
+        return None, None
+
+    # 1. Точное совпадение имени: name.session -> name.json
+    session_basename = os.path.splitext(os.path.basename(session_path))[0]
+    matching = files.get(f"{session_basename}.json".lower())
+    if matching:
+        return matching, json_index.credentials(matching)
+
+    # 2. Приоритетные имена, 3. любой .json файл с credentials
+    priority = [
+        files[name.lower()]
+        for name in settings.account_json_filenames_list
+        if name.lower() in files
+    ]
+    for json_path in priority + list(files.values()):
+        creds = json_index.credentials(json_path)
+        if creds:
+            return json_path, creds
+
+    return None, None
+
+
+@dataclass
+class _PlannedSession:
+    """Сессия после этапа планирования (до записи в БД)."""
+
+    item: SessionImportItem
+    validation: SessionValidationResult
+    api_id: Optional[int] = None
+    api_hash: Optional[str] = None
+    final_path: Optional[str] = None
+
+
+def _plan_one_session(
+    session_path: str, json_index: JsonMetadataIndex
+) -> _PlannedSession:
+    """Подготовить одну сессию: credentials + чтение файла (без БД)."""
+    session_name = os.path.splitext(os.path.basename(session_path))[0]
+    item = SessionImportItem(
+        session_path=session_path, session_name=session_name, success=False
+    )
+
+    api_id = api_hash = None
+    json_path, creds = _find_session_credentials(json_index, session_path)
+    if creds:
+        api_id, api_hash = creds
+        item.api_source = "json"
+        logger.info(f"Found credentials for {session_path} in {json_path}: api_id={api_id}")
+    elif settings.fallback_env_api and settings.api_id and settings.api_hash:
+        api_id = settings.api_id
+        api_hash = settings.api_hash
+        item.api_source = "env"
+
+    if api_id:
+        item.api_id = api_id
+    if api_hash:
+        item.api_hash_masked = mask_api_hash(api_hash)
+
+    try:
+        # Без подключения к Telegram — только чтение файлов
+        validation = validate_session_offline(
+            session_path, api_id=api_id, api_hash=api_hash, json_index=json_index
+        )
+    except Exception as e:
+        logger.exception(f"Error reading session {session_path}: {e}")
+        validation = SessionValidationResult(success=False, error=str(e))
+
+    if not validation.success:
+        item.error = validation.error
+    else:
+        item.tg_user_id = validation.tg_user_id  # Может быть None — это нормально
+        item.username = validation.username
+        item.phone = validation.phone
+
+    return _PlannedSession(item=item, validation=validation, api_id=api_id, api_hash=api_hash)
+
+
+def _plan_batch(session_files: List[str]) -> List[_PlannedSession]:
+    """
+    Прочитать все сессии небольшим пулом потоков (порядок сохраняется).
+
+    Индекс JSON общий на весь архив: каждая директория сканируется
+    и каждый JSON разбирается один раз.
+    """
+    json_index = JsonMetadataIndex()
+    with ThreadPoolExecutor(
+        max_workers=HEADER_READ_WORKERS, thread_name_prefix="batch_import"
+    ) as executor:
+        return list(
+            executor.map(lambda path: _plan_one_session(path, json_index), session_files)
+        )
+
+
+def _copy_planned_sessions(planned: List[_PlannedSession]) -> None:
+    """Скопировать файлы новых сессий в постоянное хранилище."""
+    for plan in planned:
+        # - Если есть tg_user_id: storage/sessions/{tg_user_id}/
+        # - Если нет: storage/sessions/pending_{uuid}/
+        if plan.item.tg_user_id:
+            storage_id = str(plan.item.tg_user_id)
+        else:
+            storage_id = f"pending_{uuid.uuid4().hex[:8]}"
+            logger.info(f"No user_id, using temporary storage: {storage_id}")
+
+        final_dir = os.path.join(SESSIONS_DIR, storage_id)
+        os.makedirs(final_dir, exist_ok=True)
+        plan.final_path = os.path.join(final_dir, "account.session")
+        shutil.copy2(plan.item.session_path, plan.final_path)
+
+
+def _remove_copied_sessions(planned: List[_PlannedSession]) -> None:
+    """Откатить копирование файлов, если транзакция не прошла."""
+    for plan in planned:
+        if plan.final_path and os.path.exists(plan.final_path):
+            try:
+                os.remove(plan.final_path)
+            except OSError as e:
+                logger.warning(f"Failed to remove {plan.final_path}: {e}")
+
+
+async def _find_existing_accounts(
+    db_session: AsyncSession, tg_user_ids: List[int]
+) -> Dict[int, int]:
+    """tg_user_id -> id аккаунта для уже импортированных (одним IN-запросом на пачку)."""
+    existing: Dict[int, int] = {}
+    for i in range(0, len(tg_user_ids), _DUPLICATE_QUERY_CHUNK):
+        chunk = tg_user_ids[i : i + _DUPLICATE_QUERY_CHUNK]
+        result = await db_session.execute(
+            select(Account.tg_user_id, Account.id).where(Account.tg_user_id.in_(chunk))
+        )
+        existing.update(result.all())
+    return existing
+
+
+async def _commit_planned_sessions(
+    db_session: AsyncSession, planned: List[_PlannedSession]
+) -> None:
+    """
+    Записать все подготовленные сессии одной транзакцией.
+
+    Заполняет item.success / item.account_id / item.error у каждой сессии.
+    """
+    valid = [p for p in planned if p.validation.success]
+
+    # Дубликаты: в БД — одним запросом, внутри архива — по первому вхождению
+    tg_user_ids = sorted({p.item.tg_user_id for p in valid if p.item.tg_user_id})
+    existing = await _find_existing_accounts(db_session, tg_user_ids)
+
+    new_plans: List[_PlannedSession] = []
+    batch_duplicates: List[Tuple[_PlannedSession, _PlannedSession]] = []
+    first_by_tg_id: Dict[int, _PlannedSession] = {}
+
+    for plan in valid:
+        tg_user_id = plan.item.tg_user_id
+        if tg_user_id and tg_user_id in existing:
+            plan.item.error = f"Дубликат (ID: {existing[tg_user_id]})"
+            plan.item.is_duplicate = True
+        elif tg_user_id and tg_user_id in first_by_tg_id:
+            batch_duplicates.append((plan, first_by_tg_id[tg_user_id]))
+        else:
+            if tg_user_id:
+                first_by_tg_id[tg_user_id] = plan
+            new_plans.append(plan)
+
+    if not new_plans:
+        return
+
+    await asyncio.to_thread(_copy_planned_sessions, new_plans)
+
+    accounts: List[Account] = []
+    for plan in new_plans:
+        validation = plan.validation
+        # Сохраняем api_id/api_hash только если они из JSON
+        from_json = plan.item.api_source == "json"
+        fp = validation.fingerprint
+        accounts.append(
+            Account(
+                tg_user_id=validation.tg_user_id,
+                username=validation.username,
+                phone=validation.phone,
+                storage_type=StorageType.TELETHON_SESSION,
+                session_path=plan.final_path,
+                status=AccountStatus.FREE,
+                is_premium=validation.is_premium,
+                api_id=plan.api_id if from_json else None,
+                api_hash=plan.api_hash if from_json else None,
+                device_model=fp.device_model if fp else None,
+                system_version=fp.system_version if fp else None,
+                app_version=fp.app_version if fp else None,
+                lang_code=fp.lang_code if fp else None,
+                system_lang_code=fp.system_lang_code if fp else None,
+                error_text=None,
+            )
+        )
+
+    try:
+        db_session.add_all(accounts)
+        await db_session.flush()
+
+        # Автоматически назначаем прокси (в той же транзакции)
+        await proxy_service.assign_proxies_to_accounts(db_session, accounts)
+
+        for _ in accounts:
+            stats_service.record_account_transition(db_session, None, AccountStatus.FREE)
+
+        await db_session.commit()
+    except Exception as e:
+        logger.exception(f"Batch import: transaction failed: {e}")
+        await db_session.rollback()
+        await asyncio.to_thread(_remove_copied_sessions, new_plans)
+        for plan in new_plans:
+            plan.item.error = f"Ошибка записи в БД: {e}"
+        for plan, _ in batch_duplicates:
+            plan.item.error = f"Ошибка записи в БД: {e}"
+        return
+
+    for plan, account in zip(new_plans, accounts):
+        plan.item.account_id = account.id
+        plan.item.success = True
+        logger.info(
+            f"Batch import: account #{account.id} created, "
+            f"tg_user_id={account.tg_user_id or 'pending (будет получен при подключении)'}, "
+            f"phone={account.phone or 'pending'}, api_source={plan.item.api_source}"
+        )
+
+    for plan, first in batch_duplicates:
+        plan.item.error = f"Дубликат (ID: {first.item.account_id})"
+        plan.item.is_duplicate = True
+
+
 async def import_one_session(
     db_session: AsyncSession,
     session_path: str,
@@ -438,21 +693,15 @@ async def import_zip(
         )
         return report
 
-    # Временные пути
+    # Временная директория (архив целиком на диск не пишется)
     temp_id = str(uuid.uuid4())
-    zip_path = os.path.join(INBOX_DIR, f"{temp_id}.zip")
     extract_dir = os.path.join(INBOX_DIR, f"batch_{temp_id}")
 
     try:
-        # Сохраняем ZIP
-        os.makedirs(INBOX_DIR, exist_ok=True)
-        with open(zip_path, "wb") as f:
-            f.write(zip_data)
-
-        logger.info(f"ZIP saved: {zip_path}, size: {len(zip_data)} bytes")
+        logger.info(f"ZIP received: {original_filename}, size: {len(zip_data)} bytes")
 
-        # Распаковываем
-        success, error = extract_zip(zip_path, extract_dir)
+        # Распаковываем только нужные файлы (в потоке, чтобы не блокировать loop)
+        success, error = await asyncio.to_thread(extract_zip, zip_data, extract_dir)
         if not success:
             report.errors = 1
             report.items.append(
@@ -463,7 +712,7 @@ async def import_zip(
             return report
 
         # Ищем .session файлы
-        session_files = find_session_files(extract_dir)
+        session_files = await asyncio.to_thread(find_session_files, extract_dir)
         report.total_sessions_found = len(session_files)
 
         if not session_files:
@@ -480,36 +729,15 @@ async def import_zip(
 
         logger.info(f"Found {len(session_files)} session files in ZIP")
 
-        # Импортируем каждую сессию
-        for session_path in session_files:
-            # Ищем JSON с credentials
-            json_path = find_matching_json(session_path)
-            api_id = None
-            api_hash = None
-            api_source = "none"
-
-            if json_path:
-                creds = extract_api_credentials(json_path)
-                if creds:
-                    api_id, api_hash = creds
-                    api_source = "json"
-                    logger.info(
-                        f"Found credentials for {session_path}: api_id={api_id}"
-                    )
-
-            # Импортируем
-            item = await import_one_session(
-                db_session,
-                session_path,
-                api_id=api_id,
-                api_hash=api_hash,
-                api_source=api_source,
-            )
+        # Читаем сессии параллельно, затем пишем в БД одной транзакцией
+        planned = await asyncio.to_thread(_plan_batch, session_files)
+        await _commit_planned_sessions(db_session, planned)
 
-            if item.success:
-                report.add_success(item)
+        for plan in planned:
+            if plan.item.success:
+                report.add_success(plan.item)
             else:
-                report.add_error(item)
+                report.add_error(plan.item)
 
         return report
 
@@ -529,8 +757,6 @@ async def import_zip(
     finally:
         # Очистка временных файлов
         try:
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
             if os.path.exists(extract_dir):
                 shutil.rmtree(extract_dir, ignore_errors=True)
             logger.info("Temporary files cleaned up")
@@ -0,0 +1,204 @@
+"""
+ConversionPool - пул процессов для CPU-bound конвертации tdata.
+
+Особенности:
+- Отдельный ProcessPoolExecutor: PBKDF2/AES/opentele не держат GIL бот-процесса
+- Ограниченное число одновременных задач (остальные ждут в очереди)
+- Таймаут и отмена: зависший воркер-процесс завершается, пул пересоздаётся
+- Процессы запускаются через spawn: fork из процесса с event loop, потоками
+  и открытыми соединениями копирует их состояние (в т.ч. захваченные локи)
+- Статистика очереди для экрана статистики
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+class ConversionTimeoutError(Exception):
+    """Конвертация не уложилась в таймаут."""
+
+
+def _report_pid(pids) -> None:
+    """Инициализатор процесса пула: сообщить свой PID родителю."""
+    pids.put(os.getpid())
+
+
+def _drain_pids(pids) -> List[int]:
+    """PID процессов, запущенных пулом (без блокировки)."""
+    result = []
+    while not pids.empty():
+        result.append(pids.get())
+    return result
+
+
+def _terminate(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except OSError:
+        # Процесс уже завершился
+        pass
+
+
+@dataclass
+class ConversionPoolStats:
+    """Статистика пула конвертации."""
+
+    workers: int = 0
+    running: int = 0
+    queued: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+        }
+
+
+class ConversionPool:
+    """
+    Ограниченный пул процессов.
+
+    Использование:
+        pool = get_conversion_pool()
+        pool.start()
+        result = await pool.run(func, arg1, arg2, timeout=120)
+        pool.shutdown()
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or settings.tdata_conversion_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # PID процессов текущего executor (их сообщает _report_pid)
+        self._pids = None
+        # Не отдаём в executor больше задач, чем процессов — очередь
+        # ожидания живёт здесь и видна в статистике
+        self._slots = asyncio.Semaphore(self.workers)
+        self._stats = ConversionPoolStats(workers=self.workers)
+
+    def start(self) -> None:
+        """Создать процессы пула (идемпотентно)."""
+        if self._executor is None:
+            self._pids = _MP_CONTEXT.SimpleQueue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=_MP_CONTEXT,
+                initializer=_report_pid,
+                initargs=(self._pids,),
+            )
+            logger.info(f"[conversion_pool] started with {self.workers} workers")
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Остановить пул, отменив ожидающие задачи."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            self._pids = None
+            logger.info("[conversion_pool] stopped")
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        """
+        Принудительно завершить процессы пула и пересоздать его.
+
+        Другие выполняющиеся в этот момент задачи получат BrokenProcessPool.
+        """
+        if self._executor is not executor:
+            # Пул уже пересоздан другой задачей
+            return
+        pids, self._pids = self._pids, None
+        self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # Выполняющуюся задачу shutdown не прерывает — завершаем процессы сами
+            for pid in _drain_pids(pids):
+                _terminate(pid)
+        self.start()
+        logger.warning("[conversion_pool] restarted after cancelled/timed out task")
+
+    async def run(
+        self, func: Callable[..., Any], *args: Any, timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Выполнить func(*args) в отдельном процессе.
+
+        Raises:
+            ConversionTimeoutError: задача не уложилась в timeout
+            asyncio.CancelledError: ожидающая корутина отменена
+        """
+        timeout = timeout or settings.tdata_conversion_timeout
+
+        self._stats.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._stats.queued -= 1
+
+        self._stats.running += 1
+        try:
+            self.start()
+            loop = asyncio.get_running_loop()
+            executor = self._executor
+            future = executor.submit(func, *args)
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.wrap_future(future, loop=loop), timeout
+                )
+            except asyncio.TimeoutError:
+                self._stats.timed_out += 1
+                if not future.cancel():
+                    self._restart(executor)
+                raise ConversionTimeoutError(
+                    f"Конвертация превысила таймаут ({timeout:.0f} сек)"
+                )
+            except asyncio.CancelledError:
+                if not future.cancel():
+                    self._restart(executor)
+                raise
+            except BrokenProcessPool:
+                self._stats.failed += 1
+                self._restart(executor)
+                raise
+            except Exception:
+                self._stats.failed += 1
+                raise
+
+            self._stats.completed += 1
+            return result
+        finally:
+            self._stats.running -= 1
+            self._slots.release()
+
+    def get_stats(self) -> ConversionPoolStats:
+        """Снимок статистики."""
+        return ConversionPoolStats(**self._stats.to_dict())
+
+
+# Глобальный экземпляр пула
+_conversion_pool: Optional[ConversionPool] = None
+
+
+def get_conversion_pool() -> ConversionPool:
+    """Получить глобальный экземпляр пула конвертации."""
+    global _conversion_pool
+    if _conversion_pool is None:
+        _conversion_pool = ConversionPool()
+    return _conversion_pool
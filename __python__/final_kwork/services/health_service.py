@@ -5,11 +5,13 @@
 import asyncio
 import logging
 import os
-from dataclasses import dataclass
+import time
+from collections import deque
+from dataclasses import dataclass, replace
 from datetime import datetime
-from typing import List, Optional
+from typing import Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
 
-from sqlalchemy import text
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from services.telethon_adapter import (
@@ -19,9 +21,8 @@ from services.telethon_adapter import (
 )
 
 from config import settings
-from db.base import async_session
+from db.base import async_session, engine, get_db_metrics
 from db.models import Account, AccountStatus
-from services.accounts_service import get_all_accounts
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ class HealthCheckResult:
     status: bool  # True = OK, False = FAIL
     details: str
     duration_ms: float
+    cached: bool = False  # Результат взят из кэша проверки
 
 
 @dataclass
@@ -41,6 +43,16 @@ class SystemHealth:
     overall: bool
     checks: List[HealthCheckResult]
     timestamp: datetime
+    duration_ms: float = 0.0  # Длительность всего прогона
+
+
+@dataclass
+class HealthCheck:
+    """Зарегистрированная проверка."""
+    name: str
+    func: Callable[[], Awaitable[HealthCheckResult]]
+    timeout: float  # Таймаут одной проверки (секунды)
+    cache_ttl: float = 0  # Сколько секунд переиспользовать результат (0 = не кэшировать)
 
 
 async def check_database() -> HealthCheckResult:
@@ -50,10 +62,16 @@ async def check_database() -> HealthCheckResult:
         async with async_session() as session:
             await session.execute(text("SELECT 1"))
         duration = (datetime.now() - start).total_seconds() * 1000
+        metrics = get_db_metrics()
         return HealthCheckResult(
             name="database",
             status=True,
-            details="SQLite connection OK",
+            details=(
+                f"{engine.dialect.name} connection OK, "
+                f"pool wait avg/max {metrics['checkout_wait_avg_ms']}/{metrics['checkout_wait_max_ms']}ms, "
+                f"query avg/max {metrics['query_time_avg_ms']}/{metrics['query_time_max_ms']}ms, "
+                f"slow: {metrics['slow_queries']}"
+            ),
             duration_ms=duration
         )
     except Exception as e:
@@ -67,13 +85,144 @@ async def check_database() -> HealthCheckResult:
         )
 
 
+# =============================================================================
+# Файловая система: кэшируемые снимки
+# =============================================================================
+
+@dataclass(frozen=True)
+class _SessionsListing:
+    """Снимок папки сессий."""
+    top_level_count: int      # .session записей в самой папке (как os.listdir)
+    paths: FrozenSet[str]     # все .session файлы, включая <id>/account.session
+
+
+# (monotonic-время построения, значение). Устаревают только по TTL:
+# аккаунты пишутся и через ORM, и через Core/bulk, и вручную в БД.
+_sessions_listing_cache: Optional[Tuple[float, Optional[_SessionsListing]]] = None
+_consistency_cache: Optional[Tuple[float, Tuple[int, List[int]]]] = None
+_fs_cache_lock = asyncio.Lock()
+
+
+def invalidate_consistency_cache() -> None:
+    """Сбросить кэш проверок файловой системы (следующая проверка пересканирует)."""
+    global _sessions_listing_cache, _consistency_cache
+    _sessions_listing_cache = None
+    _consistency_cache = None
+
+
+def _is_fresh(cached: Optional[tuple]) -> bool:
+    return cached is not None and time.monotonic() - cached[0] < settings.health_fs_cache_ttl
+
+
+def _scan_session_files(root: str) -> Optional[_SessionsListing]:
+    """Листинг .session файлов под root (рекурсивно через os.scandir); None — папки нет."""
+    if not os.path.exists(root):
+        return None
+
+    root = os.path.abspath(root)
+    top_level_count = 0
+    found: Set[str] = set()
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    is_session = entry.name.endswith(".session")
+                    if directory == root and is_session:
+                        top_level_count += 1
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif is_session:
+                        found.add(entry.path)
+        except OSError as e:
+            logger.warning(f"[health] cannot scan {directory}: {e}")
+    return _SessionsListing(top_level_count=top_level_count, paths=frozenset(found))
+
+
+def _find_missing_sessions(
+    rows: List[Tuple[int, str]], root: str, listing: Optional[_SessionsListing]
+) -> List[int]:
+    """
+    ID аккаунтов, у которых нет session файла.
+
+    Пути под sessions_dir сверяются с готовым листингом одной операцией над
+    множествами; остальные — листингом их директорий (по одному scandir на папку).
+    Листинг может устареть в пределах TTL и не заходит в симлинки на папки,
+    поэтому не найденные в нём пути перепроверяются через os.path.exists.
+    """
+    root = os.path.abspath(root) + os.sep
+    expected: Dict[str, List[int]] = {}
+    for account_id, session_path in rows:
+        if not session_path.endswith(".session"):
+            session_path += ".session"
+        expected.setdefault(os.path.abspath(session_path), []).append(account_id)
+
+    inside = {p for p in expected if listing is not None and p.startswith(root)}
+    outside = expected.keys() - inside
+
+    present: Set[str] = set(inside & listing.paths) if inside else set()
+    by_dir: Dict[str, Set[str]] = {}
+    for path in outside:
+        by_dir.setdefault(os.path.dirname(path), set()).add(path)
+    for directory, paths in by_dir.items():
+        try:
+            with os.scandir(directory) as entries:
+                names = {entry.path for entry in entries}
+        except OSError:
+            continue
+        present |= paths & names
+
+    missing = {path for path in expected.keys() - present if not os.path.exists(path)}
+    return sorted(account_id for path in missing for account_id in expected[path])
+
+
+async def _get_sessions_listing() -> Optional[_SessionsListing]:
+    """Листинг .session файлов папки сессий (кэш с TTL, скан в потоке)."""
+    global _sessions_listing_cache
+
+    if _is_fresh(_sessions_listing_cache):
+        return _sessions_listing_cache[1]
+
+    async with _fs_cache_lock:
+        if _is_fresh(_sessions_listing_cache):
+            return _sessions_listing_cache[1]
+        listing = await asyncio.to_thread(_scan_session_files, settings.sessions_dir)
+        _sessions_listing_cache = (time.monotonic(), listing)
+        return listing
+
+
+async def _get_consistency() -> Tuple[int, List[int]]:
+    """(количество аккаунтов, ID аккаунтов без session файла) — кэш с TTL."""
+    global _consistency_cache
+
+    if _is_fresh(_consistency_cache):
+        return _consistency_cache[1]
+
+    listing = await _get_sessions_listing()
+
+    async with async_session() as session:
+        result = await session.execute(select(Account.id, Account.session_path))
+        rows = result.all()
+
+    with_path = [(account_id, path) for account_id, path in rows if path]
+    missing = await asyncio.to_thread(
+        _find_missing_sessions, with_path, settings.sessions_dir, listing
+    )
+
+    value = (len(rows), missing)
+    _consistency_cache = (time.monotonic(), value)
+    return value
+
+
 async def check_sessions_folder() -> HealthCheckResult:
     """Проверка папки сессий."""
     start = datetime.now()
     try:
         sessions_dir = settings.sessions_dir
-        
-        if not os.path.exists(sessions_dir):
+        listing = await _get_sessions_listing()
+
+        if listing is None:
             duration = (datetime.now() - start).total_seconds() * 1000
             return HealthCheckResult(
                 name="sessions_folder",
@@ -81,15 +230,13 @@ async def check_sessions_folder() -> HealthCheckResult:
                 details=f"Folder does not exist: {sessions_dir}",
                 duration_ms=duration
             )
-        
-        # Считаем .session файлы
-        session_files = [f for f in os.listdir(sessions_dir) if f.endswith('.session')]
+
         duration = (datetime.now() - start).total_seconds() * 1000
-        
+
         return HealthCheckResult(
             name="sessions_folder",
             status=True,
-            details=f"Found {len(session_files)} session files",
+            details=f"Found {listing.top_level_count} session files",
             duration_ms=duration
         )
     except Exception as e:
@@ -107,34 +254,23 @@ async def check_accounts_consistency() -> HealthCheckResult:
     """Проверка консистентности аккаунтов."""
     start = datetime.now()
     try:
-        async with async_session() as session:
-            accounts = await get_all_accounts(session)
-        
-        issues = []
-        for acc in accounts:
-            # Проверяем наличие session файла
-            if acc.session_path:
-                session_path = acc.session_path
-                if not session_path.endswith('.session'):
-                    session_path += '.session'
-                
-                if not os.path.exists(session_path):
-                    issues.append(f"Account {acc.id}: session file missing")
-        
+        total, missing = await _get_consistency()
+
         duration = (datetime.now() - start).total_seconds() * 1000
-        
-        if issues:
+
+        if missing:
+            issues = [f"Account {account_id}: session file missing" for account_id in missing[:3]]
             return HealthCheckResult(
                 name="accounts_consistency",
                 status=False,
-                details=f"{len(issues)} issues: " + "; ".join(issues[:3]),
+                details=f"{len(missing)} issues: " + "; ".join(issues),
                 duration_ms=duration
             )
-        
+
         return HealthCheckResult(
             name="accounts_consistency",
             status=True,
-            details=f"All {len(accounts)} accounts OK",
+            details=f"All {total} accounts OK",
             duration_ms=duration
         )
     except Exception as e:
@@ -149,8 +285,14 @@ async def check_accounts_consistency() -> HealthCheckResult:
 
 
 async def check_telegram_api() -> HealthCheckResult:
-    """Проверка доступности Telegram API (без авторизации)."""
+    """
+    Проверка доступности Telegram API (без авторизации).
+
+    Подключение дорогое, поэтому проверка зарегистрирована с cache_ttl.
+    Клиент отключается и при отмене по таймауту.
+    """
     start = datetime.now()
+    client = None
     try:
         # Простая проверка - создаём клиент без авторизации
         # Используем :memory: — это безопасно, т.к. сессия временная
@@ -167,7 +309,6 @@ async def check_telegram_api() -> HealthCheckResult:
         await client.connect()
         # Проверяем что соединение установлено
         connected = client.is_connected()
-        await client.disconnect()
         
         duration = (datetime.now() - start).total_seconds() * 1000
         
@@ -186,6 +327,12 @@ async def check_telegram_api() -> HealthCheckResult:
             details=f"Error: {e}",
             duration_ms=duration
         )
+    finally:
+        if client:
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
 
 
 async def check_single_account(account: Account) -> HealthCheckResult:
@@ -281,42 +428,130 @@ async def check_single_account(account: Account) -> HealthCheckResult:
         )
 
 
-async def run_health_check() -> SystemHealth:
+# =============================================================================
+# Реестр проверок
+# =============================================================================
+
+_checks: Dict[str, HealthCheck] = {}
+# name -> (monotonic-время, результат) для проверок с cache_ttl
+_check_results_cache: Dict[str, Tuple[float, HealthCheckResult]] = {}
+# Кольцевой буфер последних прогонов
+_history: Deque[SystemHealth] = deque(maxlen=settings.health_history_size)
+
+
+def register_check(
+    name: str,
+    func: Callable[[], Awaitable[HealthCheckResult]],
+    timeout: Optional[float] = None,
+    cache_ttl: float = 0,
+) -> None:
+    """
+    Зарегистрировать проверку (повторная регистрация заменяет прежнюю).
+
+    Args:
+        name: Имя проверки в отчёте
+        func: Корутина-функция без аргументов, возвращающая HealthCheckResult
+        timeout: Таймаут проверки (по умолчанию HEALTH_CHECK_TIMEOUT)
+        cache_ttl: Переиспользовать успешный результат N секунд
+    """
+    _checks[name] = HealthCheck(
+        name=name,
+        func=func,
+        timeout=timeout or settings.health_check_timeout,
+        cache_ttl=cache_ttl,
+    )
+    _check_results_cache.pop(name, None)
+
+
+def get_registered_checks() -> List[str]:
+    """Имена зарегистрированных проверок."""
+    return list(_checks)
+
+
+async def _run_check(check: HealthCheck, deadline: float) -> HealthCheckResult:
+    """Выполнить одну проверку с таймаутом, не превышающим общий дедлайн."""
+    now = time.monotonic()
+
+    cached = _check_results_cache.get(check.name)
+    if cached and now - cached[0] < check.cache_ttl:
+        return replace(cached[1], cached=True)
+
+    timeout = min(check.timeout, deadline - now)
+    start = datetime.now()
+    try:
+        if timeout <= 0:
+            raise asyncio.TimeoutError
+        result = await asyncio.wait_for(check.func(), timeout)
+    except asyncio.TimeoutError:
+        duration = (datetime.now() - start).total_seconds() * 1000
+        logger.warning(f"[health] {check.name} check timed out after {timeout:.1f}s")
+        return HealthCheckResult(
+            name=check.name,
+            status=False,
+            details=f"Timeout ({max(timeout, 0):.0f}s)",
+            duration_ms=duration
+        )
+    except Exception as e:
+        duration = (datetime.now() - start).total_seconds() * 1000
+        logger.error(f"[health] {check.name} check crashed: {e}")
+        return HealthCheckResult(
+            name=check.name,
+            status=False,
+            details=f"Check failed: {e}",
+            duration_ms=duration
+        )
+
+    # Кэшируем только успешные результаты — сбой перепроверяется сразу
+    if check.cache_ttl and result.status:
+        _check_results_cache[check.name] = (time.monotonic(), result)
+    return result
+
+
+async def run_health_check(deadline: Optional[float] = None) -> SystemHealth:
     """
     Запустить полную проверку здоровья системы.
     
+    Проверки выполняются параллельно, каждая со своим таймаутом; весь прогон
+    ограничен общим дедлайном. Результат сохраняется в историю.
+
+    Args:
+        deadline: Общий лимит времени на прогон (секунды, по умолчанию HEALTH_CHECK_DEADLINE)
+
     Returns:
         SystemHealth с результатами всех проверок
     """
-    checks = []
+    start = time.monotonic()
+    deadline_at = start + (deadline or settings.health_check_deadline)
     
-    # Параллельно запускаем независимые проверки
-    results = await asyncio.gather(
-        check_database(),
-        check_sessions_folder(),
-        check_accounts_consistency(),
-        check_telegram_api(),
-        return_exceptions=True
+    checks = list(
+        await asyncio.gather(*(_run_check(check, deadline_at) for check in _checks.values()))
     )
     
-    for result in results:
-        if isinstance(result, Exception):
-            checks.append(HealthCheckResult(
-                name="unknown",
-                status=False,
-                details=f"Check failed: {result}",
-                duration_ms=0
-            ))
-        else:
-            checks.append(result)
-    
     overall = all(c.status for c in checks)
     
-    return SystemHealth(
+    health = SystemHealth(
         overall=overall,
         checks=checks,
-        timestamp=datetime.now()
+        timestamp=datetime.now(),
+        duration_ms=(time.monotonic() - start) * 1000,
     )
+    _history.append(health)
+    return health
+
+
+def get_health_history() -> List[SystemHealth]:
+    """Последние прогоны (от старых к новым)."""
+    return list(_history)
+
+
+register_check("database", check_database)
+register_check("sessions_folder", check_sessions_folder)
+register_check("accounts_consistency", check_accounts_consistency)
+register_check(
+    "telegram_api",
+    check_telegram_api,
+    cache_ttl=settings.health_telegram_cache_ttl,
+)
 
 
 def format_health_report(health: SystemHealth) -> str:
@@ -339,6 +574,53 @@ def format_health_report(health: SystemHealth) -> str:
     
     for check in health.checks:
         emoji = "✅" if check.status else "❌"
-        lines.append(f"{emoji} **{check.name}**: {check.details} ({check.duration_ms:.0f}ms)")
+        cached = ", кэш" if check.cached else ""
+        lines.append(
+            f"{emoji} **{check.name}**: {check.details} ({check.duration_ms:.0f}ms{cached})"
+        )
+
+    lines.append("")
+    lines.append(f"⏱ Проверка заняла {health.duration_ms:.0f}ms")
+    
+    return "\n".join(lines)
+
+
+def format_health_history(history: List[SystemHealth], limit: int = 10) -> str:
+    """
+    Форматирование истории проверок: последние прогоны и задержки по проверкам.
+
+    Args:
+        history: Результаты get_health_history()
+        limit: Сколько последних прогонов показать
+    """
+    if not history:
+        return "📭 История проверок пуста"
+
+    lines = [f"🕘 **История проверок** (последние {min(limit, len(history))} из {len(history)})", ""]
+
+    for health in reversed(history[-limit:]):
+        emoji = "✅" if health.overall else "❌"
+        failed = [c.name for c in health.checks if not c.status]
+        suffix = f" — сбой: {', '.join(failed)}" if failed else ""
+        lines.append(
+            f"{emoji} {health.timestamp.strftime('%H:%M:%S')} "
+            f"({health.duration_ms:.0f}ms){suffix}"
+        )
+
+    # Тренд задержек по каждой проверке (без кэшированных результатов)
+    durations: Dict[str, List[float]] = {}
+    for health in history:
+        for check in health.checks:
+            if not check.cached:
+                durations.setdefault(check.name, []).append(check.duration_ms)
+
+    if durations:
+        lines.append("")
+        lines.append("**Задержки (avg / max / последняя):**")
+        for name, values in durations.items():
+            lines.append(
+                f"• {name}: {sum(values) / len(values):.0f} / "
+                f"{max(values):.0f} / {values[-1]:.0f}ms"
+            )
     
     return "\n".join(lines)
@@ -3,13 +3,16 @@
 """
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import Row, func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from db.models import Issue, IssueStatus, User, UserRole, Account
+from services import security_service, stats_service, user_cache
+from services.user_cache import CachedUser
+from utils.cursors import IssueCursor
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +37,7 @@ async def get_or_create_user(
         )
         session.add(user)
         await session.flush()
-        await session.refresh(user)
+        stats_service.record_user_created(session)
         logger.info(f"New user created: tg_id={tg_id}")
     else:
         # Обновляем username если изменился
@@ -42,14 +45,39 @@ async def get_or_create_user(
             user.username = username
         if full_name and user.full_name != full_name:
             user.full_name = full_name
-        await session.flush()
+        if session.dirty:
+            await session.flush()
     
     return user
 
 
+async def get_user_identity(
+    session: AsyncSession,
+    tg_id: int,
+    username: str | None = None,
+    full_name: str | None = None
+) -> CachedUser:
+    """
+    Идентичность и роль пользователя — из кэша, без запросов в БД.
+
+    При промахе кэша или изменившемся username/full_name работает как
+    get_or_create_user; кэш обновляется после commit сессии.
+    """
+    cached = user_cache.get_user_cache().get(tg_id)
+    if (
+        cached is not None
+        and (not username or cached.username == username)
+        and (not full_name or cached.full_name == full_name)
+    ):
+        return cached
+
+    user = await get_or_create_user(session, tg_id, username, full_name)
+    return user_cache.remember(session.sync_session, user)
+
+
 async def create_issue(
     session: AsyncSession,
-    user: User,
+    user: Union[User, CachedUser],
     ip_address: str | None = None,
     risk_score: float | None = None
 ) -> Issue:
@@ -62,7 +90,7 @@ async def create_issue(
     )
     session.add(issue)
     await session.flush()
-    await session.refresh(issue)
+    stats_service.record_issue_transition(session, None, IssueStatus.PENDING)
     logger.info(f"Issue created: id={issue.id}, user_id={user.id}")
     return issue
 
@@ -83,6 +111,7 @@ async def approve_issue(
     account: Account
 ) -> None:
     """Одобрить заявку и привязать аккаунт."""
+    stats_service.record_issue_transition(session, issue.status, IssueStatus.APPROVED)
     issue.status = IssueStatus.APPROVED
     issue.approved_at = datetime.utcnow()
     issue.account_id = account.id
@@ -93,6 +122,7 @@ async def approve_issue(
 
 async def reject_issue(session: AsyncSession, issue: Issue) -> None:
     """Отклонить заявку."""
+    stats_service.record_issue_transition(session, issue.status, IssueStatus.REJECTED)
     issue.status = IssueStatus.REJECTED
     issue.rejected_at = datetime.utcnow()
     await session.flush()
@@ -101,6 +131,9 @@ async def reject_issue(session: AsyncSession, issue: Issue) -> None:
 
 async def revoke_issue(session: AsyncSession, issue: Issue) -> None:
     """Отозвать выданный аккаунт."""
+    stats_service.record_issue_transition(session, issue.status, IssueStatus.REVOKED)
+    if issue.status == IssueStatus.APPROVED and issue.confirmation_code is not None:
+        security_service.record_active_change(session, issue.user_id, -1)
     issue.status = IssueStatus.REVOKED
     issue.revoked_at = datetime.utcnow()
     await session.flush()
@@ -109,6 +142,9 @@ async def revoke_issue(session: AsyncSession, issue: Issue) -> None:
 
 async def set_confirmation_code(session: AsyncSession, issue: Issue, code: str) -> None:
     """Сохранить код подтверждения."""
+    if issue.status == IssueStatus.APPROVED and issue.confirmation_code is None:
+        # С этого момента выдача считается активной
+        security_service.record_active_change(session, issue.user_id, 1)
     issue.confirmation_code = code
     await session.flush()
 
@@ -138,7 +174,6 @@ async def get_active_issues(session: AsyncSession) -> List[Issue]:
 
 async def count_active_by_user(session: AsyncSession, user_id: int) -> int:
     """Подсчитать количество активных выдач у пользователя."""
-    from sqlalchemy import func
     stmt = select(func.count()).select_from(Issue).where(
         Issue.user_id == user_id,
         Issue.status == IssueStatus.APPROVED,
@@ -221,8 +256,6 @@ async def get_managers_with_accounts(session: AsyncSession) -> List[dict]:
     Returns:
         Список dict: user_id, tg_id, username, full_name, accounts_count
     """
-    from sqlalchemy import func
-    
     # Подзапрос для подсчёта активных выдач
     stmt = (
         select(
@@ -256,6 +289,171 @@ async def get_managers_with_accounts(session: AsyncSession) -> List[dict]:
     ]
 
 
+async def _issues_page(
+    session: AsyncSession,
+    stmt,
+    order_col,
+    after: Optional[IssueCursor],
+    before: Optional[IssueCursor],
+    limit: int,
+) -> Tuple[List[Row], bool]:
+    """
+    Keyset-страница заявок по убыванию (order_col, id).
+
+    stmt должен выбирать колонки id и at (= order_col). Условие
+    (order_col, id) < курсор + ORDER BY ... LIMIT n идёт по составному индексу,
+    поэтому страница N стоит столько же, сколько первая.
+
+    Returns:
+        (строки по убыванию, есть ли ещё строки в направлении обхода)
+    """
+    key = tuple_(order_col, Issue.id)
+    if before is not None:
+        stmt = stmt.where(key > tuple_(before.at, before.id)).order_by(
+            order_col.asc(), Issue.id.asc()
+        )
+    else:
+        if after is not None:
+            stmt = stmt.where(key < tuple_(after.at, after.id))
+        stmt = stmt.order_by(order_col.desc(), Issue.id.desc())
+
+    # Берём на одну строку больше, чтобы узнать, есть ли продолжение
+    result = await session.execute(stmt.limit(limit + 1))
+    rows = list(result.all())
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if before is not None:
+        rows.reverse()
+
+    return rows, has_more
+
+
+async def get_history_page(
+    session: AsyncSession,
+    after: Optional[IssueCursor] = None,
+    before: Optional[IssueCursor] = None,
+    limit: int = 8,
+) -> Tuple[List[Row], bool]:
+    """
+    Страница истории заявок (для админа), новые сверху.
+
+    Строки: id, status, at (requested_at), username, tg_id.
+    """
+    stmt = select(
+        Issue.id,
+        Issue.status,
+        Issue.requested_at.label("at"),
+        User.username,
+        User.tg_id,
+    ).join(User, User.id == Issue.user_id)
+    return await _issues_page(session, stmt, Issue.requested_at, after, before, limit)
+
+
+async def get_active_page(
+    session: AsyncSession,
+    after: Optional[IssueCursor] = None,
+    before: Optional[IssueCursor] = None,
+    limit: int = 5,
+) -> Tuple[List[Row], bool]:
+    """
+    Страница активных выдач, последние выданные сверху.
+
+    Строки: id, at (approved_at), username, tg_id, phone.
+    """
+    stmt = (
+        select(
+            Issue.id,
+            Issue.approved_at.label("at"),
+            User.username,
+            User.tg_id,
+            Account.phone,
+        )
+        .join(User, User.id == Issue.user_id)
+        .outerjoin(Account, Account.id == Issue.account_id)
+        .where(
+            Issue.status == IssueStatus.APPROVED,
+            Issue.confirmation_code.is_not(None),
+        )
+    )
+    return await _issues_page(session, stmt, Issue.approved_at, after, before, limit)
+
+
+async def get_user_history_page(
+    session: AsyncSession,
+    user_id: int,
+    after: Optional[IssueCursor] = None,
+    before: Optional[IssueCursor] = None,
+    limit: int = 5,
+) -> Tuple[List[Row], bool]:
+    """
+    Страница истории выдач менеджера, новые сверху.
+
+    Строки: id, status, at (requested_at), phone.
+    """
+    stmt = (
+        select(
+            Issue.id,
+            Issue.status,
+            Issue.requested_at.label("at"),
+            Account.phone,
+        )
+        .outerjoin(Account, Account.id == Issue.account_id)
+        .where(Issue.user_id == user_id)
+    )
+    return await _issues_page(session, stmt, Issue.requested_at, after, before, limit)
+
+
+async def load_issues_page(
+    session: AsyncSession,
+    fetch: Callable[..., Awaitable[Tuple[List[Row], bool]]],
+    page: int,
+    direction: Optional[str],
+    cursor: Optional[IssueCursor],
+    limit: int,
+) -> Tuple[List[Row], int, bool]:
+    """
+    Страница ленты по курсору из callback data (direction: "a" — вперёд, "b" — назад).
+
+    Устаревший курсор (заявки сменили статус) — первая страница.
+
+    Returns:
+        (строки, номер страницы, есть ли следующая)
+    """
+    rows, has_more = await fetch(
+        session,
+        after=cursor if direction == "a" else None,
+        before=cursor if direction == "b" else None,
+        limit=limit,
+    )
+    if not rows and cursor is not None:
+        page, direction = 0, None
+        rows, has_more = await fetch(session, limit=limit)
+
+    # При движении назад has_more означает наличие предыдущих страниц,
+    # а следующая страница существует всегда (мы пришли с неё)
+    return rows, page, (True if direction == "b" else has_more)
+
+
+async def count_issues(session: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Количество заявок (всех или одного пользователя)."""
+    stmt = select(func.count(Issue.id))
+    if user_id is not None:
+        stmt = stmt.where(Issue.user_id == user_id)
+    result = await session.execute(stmt)
+    return result.scalar() or 0
+
+
+async def count_active_issues(session: AsyncSession) -> int:
+    """Количество активных выдач (APPROVED с отправленным кодом)."""
+    stmt = select(func.count(Issue.id)).where(
+        Issue.status == IssueStatus.APPROVED,
+        Issue.confirmation_code.is_not(None),
+    )
+    result = await session.execute(stmt)
+    return result.scalar() or 0
+
+
 async def get_user_active_issues(session: AsyncSession, user_id: int) -> List[Issue]:
     """
     Получить активные выдачи конкретного менеджера.
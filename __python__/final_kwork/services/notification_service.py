@@ -0,0 +1,386 @@
+"""
+Диспетчер исходящих уведомлений бота.
+
+Включает:
+- Общую очередь исходящих сообщений (notify не ждёт отправки)
+- Параллельную доставку, ограниченную семафором (NOTIFY_CONCURRENCY)
+- Token bucket на каждый чат; FloodWait блокирует только свой чат
+- Склейку повторных уведомлений с одним ключом, пока они ждут отправки
+- Замер задержки доставки (от постановки в очередь до отправки)
+
+Сообщения одному чату уходят в порядке постановки; медленный или
+упёршийся в FloodWait получатель не задерживает остальных.
+
+Клиент передаётся в start() — для проверки достаточно объекта с
+async send_message(chat_id, text, buttons=None).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Optional, Set, Tuple
+
+from config import settings
+from services.telethon_adapter import FloodWaitError, get_flood_wait_seconds
+from utils.instrumentation import NOTIFY_LATENCY_METRIC, percentiles, record
+
+logger = logging.getLogger(__name__)
+
+# Ошибки сети, после которых отправку стоит повторить
+_RETRYABLE_ERRORS = (ConnectionError, TimeoutError, asyncio.TimeoutError, OSError)
+
+# Раз в сколько постановок удалять состояние простаивающих чатов
+_PRUNE_EVERY = 256
+
+
+@dataclass
+class Notification:
+    """Исходящее уведомление."""
+
+    chat_id: int
+    text: str
+    buttons: Any = None
+    coalesce_key: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+@dataclass
+class NotificationStats:
+    """Счётчики диспетчера."""
+
+    enqueued: int = 0
+    sent: int = 0
+    failed: int = 0
+    dropped: int = 0  # Очередь переполнена
+    coalesced: int = 0
+    flood_waits: int = 0
+    retries: int = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "flood_waits": self.flood_waits,
+            "retries": self.retries,
+            "latency_ms": percentiles(NOTIFY_LATENCY_METRIC),
+        }
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше capacity."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до следующей отправки (0 — можно сейчас)."""
+        now = self._clock()
+        if self._blocked_until > now:
+            return self._blocked_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self) -> None:
+        """Списать токен за отправку."""
+        self._refill(self._clock())
+        self._tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        """Запретить отправку на seconds секунд (FloodWait)."""
+        now = self._clock()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = now
+
+    def is_idle(self) -> bool:
+        """Бакет полон и не заблокирован — состояние можно забыть."""
+        return self.delay() == 0.0 and self._tokens >= self.capacity
+
+
+class _ChatState:
+    """Очередь и бакет одного чата."""
+
+    __slots__ = ("bucket", "pending", "busy")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.pending: Deque[Notification] = deque()
+        self.busy = False
+
+
+class NotificationDispatcher:
+    """Очередь уведомлений с параллельной доставкой и лимитами на чат."""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        chat_rate: Optional[float] = None,
+        chat_burst: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.concurrency = concurrency or settings.notify_concurrency
+        self.chat_rate = chat_rate or settings.notify_chat_rate
+        self.chat_burst = chat_burst or settings.notify_chat_burst
+        self.max_retries = (
+            settings.notify_max_retries if max_retries is None else max_retries
+        )
+        self.stats = NotificationStats()
+
+        self._clock = clock
+        self._queue: asyncio.Queue = asyncio.Queue(
+            maxsize=queue_size or settings.notify_queue_size
+        )
+        self._client: Any = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._drainers: Set[asyncio.Task] = set()
+        self._chats: Dict[int, _ChatState] = {}
+        # (chat_id, coalesce_key) -> уведомление, ещё не отправленное
+        self._waiting: Dict[Tuple[int, str], Notification] = {}
+        self._puts = 0
+
+    # === Постановка ===
+
+    def notify(
+        self,
+        chat_id: int,
+        text: str,
+        buttons: Any = None,
+        coalesce_key: Optional[str] = None,
+    ) -> bool:
+        """
+        Поставить уведомление в очередь (без ожидания отправки).
+
+        Если для (chat_id, coalesce_key) уже ждёт отправки уведомление,
+        оно заменяется новым текстом — в чат уйдёт только последнее.
+
+        Returns:
+            False, если очередь переполнена и уведомление отброшено
+        """
+        if coalesce_key is not None:
+            waiting = self._waiting.get((chat_id, coalesce_key))
+            if waiting is not None:
+                waiting.text = text
+                waiting.buttons = buttons
+                self.stats.coalesced += 1
+                return True
+
+        item = Notification(
+            chat_id=chat_id,
+            text=text,
+            buttons=buttons,
+            coalesce_key=coalesce_key,
+            enqueued_at=self._clock(),
+        )
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            logger.warning(f"[notify] queue full, dropped notification to {chat_id}")
+            return False
+
+        if coalesce_key is not None:
+            self._waiting[(chat_id, coalesce_key)] = item
+        self.stats.enqueued += 1
+        return True
+
+    def notify_many(
+        self,
+        chat_ids: Iterable[int],
+        text: str,
+        buttons: Any = None,
+        coalesce_key: Optional[str] = None,
+    ) -> int:
+        """Разослать одно уведомление нескольким чатам. Возвращает число поставленных."""
+        return sum(
+            self.notify(chat_id, text, buttons=buttons, coalesce_key=coalesce_key)
+            for chat_id in chat_ids
+        )
+
+    def notify_admins(
+        self, text: str, buttons: Any = None, coalesce_key: Optional[str] = None
+    ) -> int:
+        """Разослать уведомление всем админам."""
+        return self.notify_many(
+            settings.admin_ids_list, text, buttons=buttons, coalesce_key=coalesce_key
+        )
+
+    # === Доставка ===
+
+    def _chat(self, chat_id: int) -> _ChatState:
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = _ChatState(
+                TokenBucket(self.chat_rate, self.chat_burst, clock=self._clock)
+            )
+        return state
+
+    def _prune_chats(self) -> None:
+        for chat_id in [
+            cid
+            for cid, state in self._chats.items()
+            if not state.busy and not state.pending and state.bucket.is_idle()
+        ]:
+            del self._chats[chat_id]
+
+    async def _consume(self) -> None:
+        """Разбирать общую очередь по очередям чатов."""
+        while True:
+            item = await self._queue.get()
+            try:
+                state = self._chat(item.chat_id)
+                state.pending.append(item)
+                if not state.busy:
+                    state.busy = True
+                    task = asyncio.create_task(
+                        self._drain(item.chat_id, state), name=f"notify:{item.chat_id}"
+                    )
+                    self._drainers.add(task)
+                    task.add_done_callback(self._drainers.discard)
+
+                self._puts += 1
+                if self._puts % _PRUNE_EVERY == 0:
+                    self._prune_chats()
+            finally:
+                self._queue.task_done()
+
+    async def _drain(self, chat_id: int, state: _ChatState) -> None:
+        """Отправить по порядку всё, что накопилось для чата."""
+        try:
+            while state.pending:
+                # Ждём бакет, не занимая слот доставки
+                delay = state.bucket.delay()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+
+                item = state.pending.popleft()
+                if item.coalesce_key is not None:
+                    self._waiting.pop((chat_id, item.coalesce_key), None)
+
+                state.bucket.take()
+                if not await self._send(item, state):
+                    continue
+
+                # Повтор — первым в очереди чата, чтобы сохранить порядок
+                state.pending.appendleft(item)
+                if item.coalesce_key is not None:
+                    self._waiting.setdefault((chat_id, item.coalesce_key), item)
+        finally:
+            state.busy = False
+
+    async def _send(self, item: Notification, state: _ChatState) -> bool:
+        """
+        Отправить уведомление.
+
+        Returns:
+            True, если отправку нужно повторить
+        """
+        item.attempts += 1
+        try:
+            async with self._slots:
+                await self._client.send_message(item.chat_id, item.text, buttons=item.buttons)
+        except FloodWaitError as e:
+            seconds = get_flood_wait_seconds(e)
+            self.stats.flood_waits += 1
+            state.bucket.block(seconds)
+            logger.warning(f"[notify] FloodWait {seconds}s for chat {item.chat_id}")
+            return self._should_retry(item)
+        except _RETRYABLE_ERRORS as e:
+            state.bucket.block(min(2 ** item.attempts, 60))
+            logger.warning(f"[notify] send to {item.chat_id} failed: {e}")
+            return self._should_retry(item)
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning(f"[notify] failed to notify {item.chat_id}: {e}")
+            return False
+
+        self.stats.sent += 1
+        record(NOTIFY_LATENCY_METRIC, (self._clock() - item.enqueued_at) * 1000)
+        return False
+
+    def _should_retry(self, item: Notification) -> bool:
+        if item.attempts <= self.max_retries:
+            self.stats.retries += 1
+            return True
+        self.stats.failed += 1
+        logger.warning(
+            f"[notify] giving up on chat {item.chat_id} after {item.attempts} attempts"
+        )
+        return False
+
+    # === Жизненный цикл ===
+
+    def start(self, client: Any) -> None:
+        """Запустить доставку через client (повторный вызов только меняет клиента)."""
+        self._client = client
+        if self._consumer and not self._consumer.done():
+            return
+
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._consumer = asyncio.create_task(self._consume(), name="background:notify")
+        logger.info(
+            f"[notify] Dispatcher started (concurrency={self.concurrency}, "
+            f"chat_rate={self.chat_rate}/s, burst={self.chat_burst})"
+        )
+
+    def pending_count(self) -> int:
+        """Уведомлений в очереди и в очередях чатов."""
+        return self._queue.qsize() + sum(len(s.pending) for s in self._chats.values())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Дождаться отправки очереди (не дольше timeout) и остановить доставку."""
+        if self._consumer is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.pending_count() and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+        lost = self.pending_count()
+        tasks = [self._consumer, *self._drainers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._consumer = None
+        self._drainers.clear()
+
+        if lost:
+            logger.warning(f"[notify] {lost} notifications not delivered on shutdown")
+        logger.info(f"[notify] Dispatcher stopped: {self.stats.to_dict()}")
+
+
+# Глобальный экземпляр
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    """Получить диспетчер уведомлений."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = NotificationDispatcher()
+    return _dispatcher
@@ -632,7 +632,9 @@ class ProxyPool:
 
                 await asyncio.sleep(interval)
 
-        self._check_task = asyncio.create_task(checker())
+        self._check_task = asyncio.create_task(
+            checker(), name="background:proxy_checker"
+        )
         logger.info(f"[proxy_pool] Background checker started (interval={interval}s)")
 
     async def stop_background_checker(self) -> None:
@@ -9,13 +9,16 @@
 """
 
 import asyncio
+import json
 import logging
+import re
 from datetime import datetime
-from typing import List, Optional, Tuple
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import aiohttp
-from sqlalchemy import select, func
+from sqlalchemy import case, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -30,6 +33,7 @@ except ImportError:
     SocksProxy = None
     SocksProxyType = None
 
+from config import settings
 from db.models import Proxy, ProxyType, Account
 
 logger = logging.getLogger(__name__)
@@ -42,6 +46,9 @@ if not PYTHON_SOCKS_AVAILABLE:
 
 # Таймаут проверки прокси (секунды)
 PROXY_CHECK_TIMEOUT = 15
+
+# Размер пачки для IN-запросов и executemany при импорте прокси
+_IMPORT_CHUNK = 500
 # URL для проверки IP
 CHECK_URL = "https://api.ipify.org"
 # URL для определения страны по IP
@@ -155,6 +162,80 @@ PHONE_COUNTRY_CODES = {
 }
 
 
+class PhonePrefixTable:
+    """
+    Поиск страны по самому длинному совпавшему префиксу номера.
+
+    Префиксы хранятся в одном словаре; при поиске проверяются только
+    встречающиеся в таблице длины префиксов (от длинных к коротким),
+    поэтому 77 → KZ находится раньше 7 → RU.
+    """
+
+    def __init__(self, codes: Optional[Dict[str, str]] = None):
+        self._codes: Dict[str, str] = {}
+        self._lengths: List[int] = []
+        if codes:
+            self.update(codes)
+
+    def update(self, codes: Dict[str, str]) -> None:
+        """Добавить или переопределить префиксы (prefix -> ISO код страны)."""
+        for prefix, country in codes.items():
+            prefix = str(prefix).lstrip("+")
+            if prefix.isdigit() and country:
+                self._codes[prefix] = str(country).upper()
+        self._lengths = sorted({len(p) for p in self._codes}, reverse=True)
+
+    def lookup(self, digits: str) -> Optional[str]:
+        """ISO код страны для номера без '+' или None."""
+        codes = self._codes
+        size = len(digits)
+        for length in self._lengths:
+            if length <= size:
+                country = codes.get(digits[:length])
+                if country is not None:
+                    return country
+        return None
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+def load_phone_country_codes(path: str) -> Dict[str, str]:
+    """
+    Прочитать таблицу телефонных кодов из JSON-файла.
+
+    Формат: {"prefix": "ISO", ...}, например {"1684": "AS", "77": "KZ"}.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("expected JSON object {prefix: country}")
+    return data
+
+
+# Глобальная таблица (строится при первом обращении)
+_phone_prefixes: Optional[PhonePrefixTable] = None
+
+
+def get_phone_prefix_table() -> PhonePrefixTable:
+    """
+    Таблица префиксов: PHONE_COUNTRY_CODES, дополненная файлом
+    PHONE_COUNTRY_CODES_FILE (полная таблица E.164), если он задан.
+    """
+    global _phone_prefixes
+    if _phone_prefixes is None:
+        table = PhonePrefixTable(PHONE_COUNTRY_CODES)
+        path = settings.phone_country_codes_file
+        if path:
+            try:
+                table.update(load_phone_country_codes(path))
+                logger.info(f"[proxy] Loaded phone country codes from {path}: {len(table)} prefixes")
+            except (OSError, ValueError) as e:
+                logger.warning(f"[proxy] Failed to load phone country codes from {path}: {e}")
+        _phone_prefixes = table
+    return _phone_prefixes
+
+
 def get_country_by_phone(phone: Optional[str]) -> Optional[str]:
     """
     Определить страну по номеру телефона.
@@ -171,12 +252,7 @@ def get_country_by_phone(phone: Optional[str]) -> Optional[str]:
     # Убираем + и пробелы
     phone = phone.lstrip("+").replace(" ", "").replace("-", "")
 
-    # Проверяем от длинных кодов к коротким (чтобы 77 проверить раньше 7)
-    for prefix in sorted(PHONE_COUNTRY_CODES.keys(), key=len, reverse=True):
-        if phone.startswith(prefix):
-            return PHONE_COUNTRY_CODES[prefix]
-
-    return None
+    return get_phone_prefix_table().lookup(phone)
 
 
 def get_country_flag(country_code: Optional[str]) -> str:
@@ -259,10 +335,221 @@ def _parse_host_port(host_port: str) -> Tuple[Optional[str], Optional[int]]:
         return None, None
 
 
+# Тип прокси, указанный последним словом строки ("host:port socks5")
+_TYPE_SUFFIXES = {
+    "socks5": ProxyType.SOCKS5,
+    "http": ProxyType.HTTP,
+    "https": ProxyType.HTTPS,
+}
+
+_URL_SCHEMES = {
+    "socks5": ProxyType.SOCKS5,
+    "socks5h": ProxyType.SOCKS5,
+    "http": ProxyType.HTTP,
+    "https": ProxyType.HTTPS,
+}
+
+_WHITESPACE_RE = re.compile(r"\s")
+
+# Быстрые пути разбора: якорные регулярки с классами символов уже, чем у
+# общего разбора. Совпадение даёт тот же результат, что и
+# _parse_proxy_line_general; всё остальное (IPv6, пробелы и "/" внутри,
+# "@" в имени пользователя, порт 0, ошибки) уходит в общий разбор.
+
+# scheme://[user:pass@]host:port — хост и схема нормализуются как в urlparse
+_URL_RE = re.compile(
+    r"([A-Za-z0-9]+)://(?:([^:@/?#\[\]\s]+):([^@/?#\[\]\s]*)@)?([A-Za-z0-9.-]+):([0-9]{1,5})"
+)
+
+
+_FAST_HOST_PORT = r"([A-Za-z0-9._-]+):([0-9]{1,5})"
+# Тип последним словом ("host:port socks5"); проверяется по _TYPE_SUFFIXES
+_FAST_TYPE_SUFFIX = r"(?:[^\S\n]+([A-Za-z0-9]+))?"
+
+# Форматы без схемы. Группы: host_port — (host, port, type);
+# host_port_auth — (host, port, user, pass, type);
+# auth_host_port — (user, ":pass", host, port, type), пароль вместе с ":"
+# (пустая группа — пароля нет), последний "@" отделяет хост, как rsplit
+_FAST_FORMATS = {
+    "host_port": _FAST_HOST_PORT,
+    "host_port_auth": _FAST_HOST_PORT + r":([^\s:@/]*):([^\s:@/]*)",
+    "auth_host_port": (
+        r"([^\s:@/]*+)(:[^\s/@]*+(?:@[^\s/@]*+)*?)?@" + _FAST_HOST_PORT
+    ),
+}
+
+# Одна строка (без пробелов по краям)
+_FAST_LINE_RES = {
+    name: re.compile(body + _FAST_TYPE_SUFFIX) for name, body in _FAST_FORMATS.items()
+}
+
+# Весь список в одном формате: каждая строка — прокси, пустая или комментарий
+_FAST_LIST_RES = {
+    name: re.compile(
+        rf"^[^\S\n]*(?:{body}{_FAST_TYPE_SUFFIX}|#.*|)[^\S\n]*$", re.MULTILINE
+    )
+    for name, body in _FAST_FORMATS.items()
+}
+
+# Первая строка списка, не пустая и не комментарий
+_FIRST_PROXY_LINE_RE = re.compile(r"^[^\S\n]*([^#\s].*)$", re.MULTILINE)
+
+
+def _fast_format(line: str) -> Optional[str]:
+    """Формат без схемы, которым стоит пробовать строку (None — только общий разбор)."""
+    if "://" in line:
+        return None
+    if "@" in line:
+        return "auth_host_port"
+    colons = line.count(":")
+    if colons == 1:
+        return "host_port"
+    if colons == 3:
+        return "host_port_auth"
+    return None
+
+
+def _fast_result(fmt: str, groups: tuple) -> Optional[ProxyParseResult]:
+    """
+    ProxyParseResult из групп регулярки формата fmt.
+
+    Returns:
+        None — порт вне диапазона или неизвестный тип: разбирает общий путь
+    """
+    if fmt == "host_port":
+        host, port, suffix = groups
+        username = password = None
+    elif fmt == "host_port_auth":
+        host, port, username, password, suffix = groups
+    else:
+        username, password, host, port, suffix = groups
+        password = password[1:] if password else None
+
+    port = int(port)
+    proxy_type = _TYPE_SUFFIXES.get(suffix.lower()) if suffix else ProxyType.HTTP
+    if proxy_type is None or not 1 <= port <= 65535:
+        return None
+    return ProxyParseResult(host, port, proxy_type, username, password)
+
+
+def _parse_uniform_proxy_list(text: str) -> Optional[List[ProxyParseResult]]:
+    """
+    Разбор списка, все строки которого в одном формате без схемы.
+
+    Обычный экспорт провайдера однороден, поэтому весь текст разбирается
+    одним findall, а поля обрабатываются столбцами (map/min/max), без
+    разбора строк по одной.
+
+    Returns:
+        Прокси по порядку или None — формат смешанный либо есть строки
+        для общего разбора (тогда список разбирается построчно)
+    """
+    first = _FIRST_PROXY_LINE_RE.search(text)
+    fmt = _fast_format(first.group(1).strip()) if first else None
+    if fmt is None:
+        return None
+
+    rows = _FAST_LIST_RES[fmt].findall(text)
+    if len(rows) != text.count("\n") + 1:
+        return None
+
+    # Пустые строки и комментарии дают строку без хоста
+    host_index = 2 if fmt == "auth_host_port" else 0
+    rows = [row for row in rows if row[host_index]]
+    if not rows:
+        return []
+
+    columns = list(zip(*rows))
+    if fmt == "host_port":
+        hosts, ports, suffixes = columns
+        usernames = passwords = repeat(None)
+    elif fmt == "host_port_auth":
+        hosts, ports, usernames, passwords, suffixes = columns
+    else:
+        usernames, passwords, hosts, ports, suffixes = columns
+        passwords = [password[1:] if password else None for password in passwords]
+
+    ports = list(map(int, ports))
+    if min(ports) < 1 or max(ports) > 65535:
+        return None
+
+    if set(suffixes) == {""}:
+        types = repeat(ProxyType.HTTP)
+    else:
+        types = [
+            _TYPE_SUFFIXES.get(suffix.lower()) if suffix else ProxyType.HTTP
+            for suffix in suffixes
+        ]
+        if None in types:
+            return None
+
+    return list(map(ProxyParseResult, hosts, ports, types, usernames, passwords))
+
+
+def _parse_proxy_url_fast(line: str) -> Optional[ProxyParseResult]:
+    """
+    Разбор scheme://[user:pass@]host:port[ TYPE] одной регуляркой.
+
+    Returns:
+        ProxyParseResult или None — строку нужно разобрать общим путём
+    """
+    if _WHITESPACE_RE.search(line):
+        body, suffix = line.rsplit(None, 1)
+        if suffix.lower() not in _TYPE_SUFFIXES or _WHITESPACE_RE.search(body):
+            return None
+        line = body
+
+    match = _URL_RE.fullmatch(line)
+    if match is None:
+        return None
+    scheme, username, password, host, port = match.groups()
+    proxy_type = _URL_SCHEMES.get(scheme.lower())
+    port = int(port)
+    if proxy_type is None or not 1 <= port <= 65535:
+        return None
+
+    return ProxyParseResult(
+        host=host.lower(),
+        port=port,
+        proxy_type=proxy_type,
+        username=username,
+        password=password,
+    )
+
+
 def parse_proxy_line(line: str) -> ProxyParseResult:
     """
     Парсинг строки прокси в различных форматах.
 
+    URL-формат, host:port, host:port:user:pass и user:pass@host:port
+    сначала пробуются якорными регулярками; то, что в них не попало, —
+    общим путём (_parse_proxy_line_general) с тем же результатом.
+
+    Returns:
+        ProxyParseResult с данными или ошибкой
+    """
+    line = line.strip()
+    if not line:
+        return ProxyParseResult("", 0, error="Пустая строка")
+
+    if "://" in line:
+        result = _parse_proxy_url_fast(line)
+        if result is not None:
+            return result
+    else:
+        fmt = _fast_format(line)
+        match = _FAST_LINE_RES[fmt].fullmatch(line) if fmt else None
+        if match is not None:
+            result = _fast_result(fmt, match.groups())
+            if result is not None:
+                return result
+    return _parse_proxy_line_general(line)
+
+
+def _parse_proxy_line_general(line: str) -> ProxyParseResult:
+    """
+    Парсинг строки прокси в различных форматах (общий путь, без регулярок).
+
     Поддерживаемые форматы:
     - host:port (IPv4)
     - host:port:user:pass (новый формат)
@@ -278,10 +565,6 @@ def parse_proxy_line(line: str) -> ProxyParseResult:
     Returns:
         ProxyParseResult с данными или ошибкой
     """
-    line = line.strip()
-    if not line:
-        return ProxyParseResult("", 0, error="Пустая строка")
-
     proxy_type = ProxyType.HTTP  # default
     username = None
     password = None
@@ -289,17 +572,11 @@ def parse_proxy_line(line: str) -> ProxyParseResult:
     port = None
 
     # Проверяем тип прокси в конце строки (формат: host:port TYPE или user:pass@host:port TYPE)
-    type_suffix_map = {
-        "socks5": ProxyType.SOCKS5,
-        "http": ProxyType.HTTP,
-        "https": ProxyType.HTTPS,
-    }
-
     parts = line.rsplit(None, 1)  # Разделяем по последнему пробелу
     if len(parts) == 2:
         potential_type = parts[1].lower()
-        if potential_type in type_suffix_map:
-            proxy_type = type_suffix_map[potential_type]
+        if potential_type in _TYPE_SUFFIXES:
+            proxy_type = _TYPE_SUFFIXES[potential_type]
             line = parts[0]  # Убираем тип из строки
 
     # Пробуем распарсить как URL
@@ -390,13 +667,21 @@ def parse_proxy_list(text: str) -> Tuple[List[ProxyParseResult], List[str]]:
     """
     Парсинг списка прокси из текста (каждая строка = один прокси).
 
+    Однородный список разбирается целиком одной регуляркой, остальные —
+    построчно через parse_proxy_line; прокси и ошибки собираются за один проход.
+
     Returns:
         (valid_proxies, errors)
     """
+    text = text.strip()
+    valid = _parse_uniform_proxy_list(text)
+    if valid is not None:
+        return valid, []
+
     valid = []
     errors = []
 
-    for i, line in enumerate(text.strip().split("\n"), 1):
+    for i, line in enumerate(text.split("\n"), 1):
         line = line.strip()
         if not line or line.startswith("#"):
             continue
@@ -591,6 +876,105 @@ async def create_or_update_proxy(
     return proxy, True
 
 
+# Ключ прокси для дедупликации: (host, port, proxy_type, username) — как в find_proxy
+ProxyKey = Tuple[str, int, ProxyType, Optional[str]]
+
+
+def _proxy_key(
+    host: str, port: int, proxy_type: ProxyType, username: Optional[str]
+) -> ProxyKey:
+    return host, port, proxy_type, username or None
+
+
+async def _find_existing_proxies(
+    session: AsyncSession, hosts: List[str]
+) -> Dict[ProxyKey, Tuple[int, Optional[str]]]:
+    """
+    Существующие прокси по хостам: ключ -> (id, password).
+
+    Один IN-запрос на пачку хостов; точное совпадение ключа проверяется в памяти
+    (username IS NULL не сравнивается через IN). При дублях в БД берётся
+    прокси с меньшим id.
+    """
+    existing: Dict[ProxyKey, Tuple[int, Optional[str]]] = {}
+    for i in range(0, len(hosts), _IMPORT_CHUNK):
+        chunk = hosts[i : i + _IMPORT_CHUNK]
+        result = await session.execute(
+            select(
+                Proxy.id,
+                Proxy.host,
+                Proxy.port,
+                Proxy.proxy_type,
+                Proxy.username,
+                Proxy.password,
+            )
+            .where(Proxy.host.in_(chunk))
+            .order_by(Proxy.id)
+        )
+        for row in result.all():
+            key = _proxy_key(row.host, row.port, row.proxy_type, row.username)
+            existing.setdefault(key, (row.id, row.password))
+    return existing
+
+
+async def bulk_upsert_proxies(
+    session: AsyncSession, parsed_list: List[ProxyParseResult]
+) -> Tuple[int, int]:
+    """
+    Пакетный upsert прокси (без commit).
+
+    Результат тот же, что у create_or_update_proxy по каждой строке:
+    повторы ключа склеиваются в памяти (побеждает последний непустой пароль),
+    существующие ищутся IN-запросами, вставки и обновления пароля идут
+    executemany пачками по _IMPORT_CHUNK.
+
+    Returns:
+        (new_count, updated_count) — повторы и существующие считаются обновлёнными
+    """
+    passwords: Dict[ProxyKey, Optional[str]] = {}
+    for parsed in parsed_list:
+        key = _proxy_key(parsed.host, parsed.port, parsed.proxy_type, parsed.username)
+        if key not in passwords or parsed.password:
+            passwords[key] = parsed.password
+
+    existing = await _find_existing_proxies(
+        session, list({key[0] for key in passwords})
+    )
+
+    now = datetime.utcnow()
+    inserts = []
+    updates = []
+    for key, password in passwords.items():
+        found = existing.get(key)
+        if found is None:
+            host, port, proxy_type, username = key
+            inserts.append(
+                {
+                    "host": host,
+                    "port": port,
+                    "proxy_type": proxy_type,
+                    "username": username,
+                    "password": password,
+                    "is_active": True,
+                }
+            )
+        elif password and found[1] != password:
+            updates.append({"id": found[0], "password": password, "updated_at": now})
+
+    # Core INSERT по таблице: ORM-вставка дробит пачку на отдельные запросы,
+    # когда у соседних строк разный набор NULL-полей (username/password)
+    for i in range(0, len(inserts), _IMPORT_CHUNK):
+        await session.execute(insert(Proxy.__table__), inserts[i : i + _IMPORT_CHUNK])
+    for i in range(0, len(updates), _IMPORT_CHUNK):
+        await session.execute(update(Proxy), updates[i : i + _IMPORT_CHUNK])
+
+    logger.info(
+        f"[proxy_import] {len(parsed_list)} lines, {len(passwords)} unique: "
+        f"{len(inserts)} new, {len(updates)} password updates"
+    )
+    return len(inserts), len(parsed_list) - len(inserts)
+
+
 async def import_proxies(
     session: AsyncSession, text: str, default_type: Optional[ProxyType] = None
 ) -> Tuple[int, int, List[str]]:
@@ -607,19 +991,12 @@ async def import_proxies(
     """
     parsed_list, parse_errors = parse_proxy_list(text)
 
-    new_count = 0
-    updated_count = 0
-
-    for parsed in parsed_list:
-        # Применяем default_type если тип не был явно указан (остался SOCKS5 по умолчанию)
-        if default_type is not None:
+    # Применяем default_type если тип не был явно указан (остался SOCKS5 по умолчанию)
+    if default_type is not None:
+        for parsed in parsed_list:
             parsed.proxy_type = default_type
 
-        proxy, is_new = await create_or_update_proxy(session, parsed)
-        if is_new:
-            new_count += 1
-        else:
-            updated_count += 1
+    new_count, updated_count = await bulk_upsert_proxies(session, parsed_list)
 
     await session.commit()
 
@@ -803,6 +1180,12 @@ async def get_best_proxy_for_account(
     1. Если указана страна аккаунта — ищем прокси из этой страны (приоритет)
     2. Если нет прокси для страны — берём любой доступный прокси из БД
     3. Лимит: 1 прокси на 5-6 аккаунтов (max_accounts)
+    4. Среди подходящих — наименее загруженный, затем с меньшей задержкой
+
+    Выбор выполняется одним агрегирующим запросом
+    (LEFT JOIN accounts + GROUP BY + HAVING), без подсчёта по каждому прокси.
+    Запрос читает только колонки покрывающего индекса ix_proxies_selection,
+    строка выбранного прокси загружается отдельно по первичному ключу.
 
     Args:
         session: AsyncSession
@@ -811,35 +1194,49 @@ async def get_best_proxy_for_account(
     Returns:
         Прокси или None если нет доступных вообще
     """
-    proxies = await get_active_proxies(session)
+    accounts_count = func.count(Account.id)
 
-    # Если указана страна — сначала ищем прокси из этой страны
+    stmt = (
+        select(Proxy.id, accounts_count)
+        .outerjoin(Account, Account.proxy_id == Proxy.id)
+        .where(Proxy.is_active.is_(True))
+        .group_by(Proxy.id)
+        .having(
+            or_(Proxy.max_accounts == 0, accounts_count < Proxy.max_accounts)
+        )
+    )
+
+    country_match = None
     if account_country:
-        for proxy in proxies:
-            if proxy.country and proxy.country.upper() == account_country.upper():
-                if proxy.max_accounts == 0:
-                    return proxy
-                count = await get_accounts_on_proxy(session, proxy.id)
-                if count < proxy.max_accounts:
-                    logger.info(
-                        f"Found matching country proxy: {proxy} for {account_country}"
-                    )
-                    return proxy
-        # Нет прокси для этой страны — используем fallback (любой доступный)
-        logger.warning(
-            f"No proxy found for country {account_country}, using any available proxy"
+        country_match = case(
+            (func.upper(Proxy.country) == account_country.upper(), 0), else_=1
         )
+        stmt = stmt.order_by(country_match)
 
-    # Берём любой доступный прокси (fallback или если страна не определена)
-    for proxy in proxies:
-        if proxy.max_accounts == 0:
-            return proxy
+    stmt = stmt.order_by(accounts_count, Proxy.latency_ms.nullslast(), Proxy.id)
+    if country_match is not None:
+        stmt = stmt.add_columns(country_match)
 
-        count = await get_accounts_on_proxy(session, proxy.id)
-        if count < proxy.max_accounts:
-            return proxy
+    result = await session.execute(stmt.limit(1))
+    row = result.first()
+    if not row:
+        return None
 
-    return None
+    proxy_id, load = row[0], row[1]
+    proxy = await session.get(Proxy, proxy_id)
+
+    if account_country:
+        if row[2] == 0:
+            logger.info(
+                f"Found matching country proxy: {proxy} for {account_country} (load={load})"
+            )
+        else:
+            # Нет прокси для этой страны — используем fallback (любой доступный)
+            logger.warning(
+                f"No proxy found for country {account_country}, using any available proxy"
+            )
+
+    return proxy
 
 
 async def assign_proxy_to_account(
@@ -887,6 +1284,64 @@ async def assign_proxy_to_account(
     return proxy
 
 
+async def assign_proxies_to_accounts(
+    session: AsyncSession, accounts: List[Account]
+) -> int:
+    """
+    Назначить прокси сразу нескольким новым аккаунтам (без commit).
+
+    Правила те же, что в get_best_proxy_for_account, но загрузка прокси
+    читается одним запросом, а распределение ведётся в памяти —
+    без запроса и commit на каждый аккаунт.
+
+    Returns:
+        Количество аккаунтов, получивших прокси
+    """
+    if not accounts:
+        return 0
+
+    accounts_count = func.count(Account.id)
+    result = await session.execute(
+        select(Proxy, accounts_count)
+        .outerjoin(Account, Account.proxy_id == Proxy.id)
+        .where(Proxy.is_active.is_(True))
+        .group_by(Proxy.id)
+    )
+    rows = result.all()
+    if not rows:
+        return 0
+    proxies = [proxy for proxy, _ in rows]
+    loads = {proxy.id: load for proxy, load in rows}
+
+    assigned = 0
+    for account in accounts:
+        available = [
+            p for p in proxies if p.max_accounts == 0 or loads[p.id] < p.max_accounts
+        ]
+        if not available:
+            break
+
+        account_country = get_country_by_phone(account.phone)
+        country = account_country.upper() if account_country else None
+
+        proxy = min(
+            available,
+            key=lambda p: (
+                0 if country and (p.country or "").upper() == country else 1,
+                loads[p.id],
+                p.latency_ms is None,
+                p.latency_ms or 0,
+                p.id,
+            ),
+        )
+        account.proxy_id = proxy.id
+        loads[proxy.id] += 1
+        assigned += 1
+
+    logger.info(f"Bulk-assigned proxies to {assigned}/{len(accounts)} accounts")
+    return assigned
+
+
 async def unassign_proxy_from_account(session: AsyncSession, account_id: int) -> bool:
     """Отвязать прокси от аккаунта."""
     # Получаем аккаунт
@@ -901,22 +1356,29 @@ async def unassign_proxy_from_account(session: AsyncSession, account_id: int) ->
 
 
 async def get_proxy_stats(session: AsyncSession) -> dict:
-    """Получить статистику по прокси."""
-    proxies = await get_all_proxies(session)
-
-    total = len(proxies)
-    active = sum(1 for p in proxies if p.is_active)
-    inactive = total - active
-
-    # Считаем аккаунты с прокси одним запросом
+    """Получить статистику по прокси (одним агрегирующим запросом)."""
+    accounts_with_proxy = (
+        select(func.count(Account.id))
+        .where(Account.proxy_id.isnot(None))
+        .scalar_subquery()
+    )
     result = await session.execute(
-        select(func.count(Account.id)).where(Account.proxy_id.isnot(None))
+        select(
+            func.count(Proxy.id),
+            func.coalesce(
+                func.sum(case((Proxy.is_active.is_(True), 1), else_=0)), 0
+            ),
+            accounts_with_proxy,
+        )
     )
-    total_accounts = result.scalar() or 0
+    total, active, total_accounts = result.one()
+
+    total = total or 0
+    active = active or 0
 
     return {
         "total": total,
         "active": active,
-        "inactive": inactive,
-        "accounts_with_proxy": total_accounts,
+        "inactive": total - active,
+        "accounts_with_proxy": total_accounts or 0,
     }
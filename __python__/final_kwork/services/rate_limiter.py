@@ -0,0 +1,372 @@
+"""
+Хранилище лимитов запросов (rate limiting).
+
+Бэкенды:
+- memory: словари в памяти процесса с истечением записей (по умолчанию)
+- sqlite: отдельный SQLite-файл — переживает рестарт и общий для
+  нескольких процессов бота на одной машине
+
+Примитивы:
+- acquire: атомарно проверить cooldown и лимит скользящего окна и
+  зарегистрировать событие
+- счётчики с TTL (get/seed/add) — для O(1) проверок вместо COUNT-запросов.
+  Счётчик засевается только если его нет и с момента чтения версии
+  (counter_version) не было add_counter — иначе засев по устаревшему
+  COUNT затёр бы параллельное изменение
+
+API синхронный: операции короткие (dict или локальный SQLite с WAL),
+а атомарность проверки и записи не требует блокировок между await.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import closing
+from typing import Deque, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Причины отказа acquire()
+REASON_COOLDOWN = "cooldown"
+REASON_LIMIT = "limit"
+
+# Сколько хранится версия счётчика после последнего add_counter (секунды);
+# засев длится миллисекунды, так что хватает с большим запасом
+VERSION_TTL = 3600.0
+
+
+class RateLimitBackend(ABC):
+    """Интерфейс хранилища лимитов."""
+
+    @abstractmethod
+    def acquire(
+        self, key: str, cooldown: float, limit: int, window: float
+    ) -> Tuple[bool, float, Optional[str]]:
+        """
+        Зарегистрировать событие, если это разрешено лимитами.
+
+        Событие разрешено, если с предыдущего прошло не меньше cooldown секунд
+        и за последние window секунд было меньше limit событий (limit <= 0 —
+        без лимита окна).
+
+        Returns:
+            (allowed, retry_after_seconds, reason) — reason: REASON_COOLDOWN | REASON_LIMIT
+        """
+
+    @abstractmethod
+    def get_counter(self, key: str) -> Optional[int]:
+        """Значение счётчика (None — нет или истёк)."""
+
+    @abstractmethod
+    def counter_version(self, key: str) -> int:
+        """Версия счётчика: меняется при каждом add_counter, даже по отсутствующему."""
+
+    @abstractmethod
+    def seed_counter(self, key: str, value: int, ttl: float, version: int) -> int:
+        """
+        Засеять счётчик на ttl секунд, если его нет и версия всё ещё равна version.
+
+        Returns:
+            Значение, которым стоит пользоваться: уже существующий счётчик
+            или value (сохранённое или нет — если версия успела смениться).
+        """
+
+    @abstractmethod
+    def add_counter(self, key: str, delta: int) -> None:
+        """Изменить существующий счётчик (отсутствующий не создаётся) и сменить версию."""
+
+    def close(self) -> None:
+        """Освободить ресурсы."""
+
+
+def _decide(
+    events: Deque[float], now: float, cooldown: float, limit: int, window: float
+) -> Tuple[bool, float, Optional[str]]:
+    """Общее правило acquire для отсортированного списка времён событий."""
+    if events and cooldown > 0:
+        remaining = cooldown - (now - events[-1])
+        if remaining > 0:
+            return False, remaining, REASON_COOLDOWN
+
+    if limit > 0 and len(events) >= limit:
+        # Освободится, когда самое старое из последних limit событий выйдет из окна
+        return False, max(0.0, events[-limit] + window - now), REASON_LIMIT
+
+    return True, 0.0, None
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Хранилище в памяти процесса с истечением записей."""
+
+    # Раз в сколько операций удалять истёкшие ключи
+    PRUNE_EVERY = 256
+
+    def __init__(self):
+        self._events: Dict[str, Deque[float]] = {}
+        # key -> время, после которого события ключа можно забыть
+        self._events_expire: Dict[str, float] = {}
+        self._counters: Dict[str, Tuple[int, float]] = {}
+        # key -> (версия, время истечения)
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._ops = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, exp in self._events_expire.items() if exp <= now]:
+            self._events.pop(key, None)
+            self._events_expire.pop(key, None)
+        for key in [k for k, (_, exp) in self._counters.items() if exp <= now]:
+            self._counters.pop(key, None)
+        for key in [k for k, (_, exp) in self._versions.items() if exp <= now]:
+            self._versions.pop(key, None)
+
+    def _tick(self, now: float) -> None:
+        self._ops += 1
+        if self._ops % self.PRUNE_EVERY == 0:
+            self._prune(now)
+
+    def acquire(
+        self, key: str, cooldown: float, limit: int, window: float
+    ) -> Tuple[bool, float, Optional[str]]:
+        now = time.time()
+        horizon = max(cooldown, window if limit > 0 else 0)
+
+        with self._lock:
+            self._tick(now)
+            events = self._events.get(key)
+            if events is None:
+                events = self._events[key] = deque()
+
+            while events and events[0] <= now - horizon:
+                events.popleft()
+
+            allowed, retry_after, reason = _decide(events, now, cooldown, limit, window)
+            if allowed:
+                events.append(now)
+                if limit > 0 and len(events) > limit:
+                    events.popleft()
+                self._events_expire[key] = now + horizon
+            elif not events:
+                self._events.pop(key, None)
+
+            return allowed, retry_after, reason
+
+    def get_counter(self, key: str) -> Optional[int]:
+        now = time.time()
+        with self._lock:
+            self._tick(now)
+            item = self._counters.get(key)
+            if item is None:
+                return None
+            if item[1] <= now:
+                del self._counters[key]
+                return None
+            return item[0]
+
+    def _version(self, key: str, now: float) -> int:
+        item = self._versions.get(key)
+        return item[0] if item is not None and item[1] > now else 0
+
+    def counter_version(self, key: str) -> int:
+        with self._lock:
+            return self._version(key, time.time())
+
+    def seed_counter(self, key: str, value: int, ttl: float, version: int) -> int:
+        now = time.time()
+        with self._lock:
+            item = self._counters.get(key)
+            if item is not None and item[1] > now:
+                return item[0]
+            if self._version(key, now) == version:
+                self._counters[key] = (value, now + ttl)
+            return value
+
+    def add_counter(self, key: str, delta: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._versions[key] = (self._version(key, now) + 1, now + VERSION_TTL)
+            item = self._counters.get(key)
+            if item is not None and item[1] > now:
+                self._counters[key] = (max(0, item[0] + delta), item[1])
+
+
+class SqliteRateLimitBackend(RateLimitBackend):
+    """
+    Хранилище в отдельном SQLite-файле.
+
+    Каждая операция — короткая транзакция; acquire, seed_counter и
+    add_counter выполняются под BEGIN IMMEDIATE, поэтому атомарны и между
+    процессами. Раз в PRUNE_EVERY операций acquire удаляются истёкшие
+    счётчики и события всех ключей, в том числе давно не запрашивавшихся.
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=1.0, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._ops = 0
+        # Наибольший горизонт acquire: события старше него не нужны ни одному ключу
+        self._max_horizon = 0.0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_events (key TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rl_events_key_ts ON rl_events (key, ts)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_rl_events_ts ON rl_events (ts)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_counters ("
+                "key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rl_counter_versions ("
+                "key TEXT PRIMARY KEY, version INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+        logger.info(f"[rate_limit] SQLite backend at {path}")
+
+    def _tick(self, now: float) -> None:
+        self._ops += 1
+        if self._ops % self.PRUNE_EVERY == 0:
+            self._conn.execute("DELETE FROM rl_counters WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM rl_counter_versions WHERE expires_at <= ?", (now,)
+            )
+            self._conn.execute(
+                "DELETE FROM rl_events WHERE ts <= ?", (now - self._max_horizon,)
+            )
+
+    def _transaction(self):
+        """Контекст BEGIN IMMEDIATE ... COMMIT/ROLLBACK (вызывать под self._lock)."""
+        return _ImmediateTransaction(self._conn)
+
+    def acquire(
+        self, key: str, cooldown: float, limit: int, window: float
+    ) -> Tuple[bool, float, Optional[str]]:
+        now = time.time()
+        horizon = max(cooldown, window if limit > 0 else 0)
+
+        with self._lock, self._transaction():
+            self._max_horizon = max(self._max_horizon, horizon)
+            self._tick(now)
+            self._conn.execute(
+                "DELETE FROM rl_events WHERE key = ? AND ts <= ?", (key, now - horizon)
+            )
+            events = deque(
+                ts
+                for (ts,) in self._conn.execute(
+                    "SELECT ts FROM rl_events WHERE key = ? ORDER BY ts", (key,)
+                )
+            )
+            allowed, retry_after, reason = _decide(events, now, cooldown, limit, window)
+            if allowed:
+                self._conn.execute(
+                    "INSERT INTO rl_events (key, ts) VALUES (?, ?)", (key, now)
+                )
+
+        return allowed, retry_after, reason
+
+    def get_counter(self, key: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM rl_counters WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _version(self, key: str, now: float) -> int:
+        row = self._conn.execute(
+            "SELECT version FROM rl_counter_versions WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def counter_version(self, key: str) -> int:
+        with self._lock:
+            return self._version(key, time.time())
+
+    def seed_counter(self, key: str, value: int, ttl: float, version: int) -> int:
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._conn.execute(
+                "SELECT value FROM rl_counters WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                return row[0]
+            if self._version(key, now) == version:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rl_counters (key, value, expires_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, value, now + ttl),
+                )
+            return value
+
+    def add_counter(self, key: str, delta: int) -> None:
+        now = time.time()
+        with self._lock, self._transaction():
+            self._conn.execute(
+                "INSERT INTO rl_counter_versions (key, version, expires_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET "
+                "version = CASE WHEN expires_at > ? THEN version + 1 ELSE 1 END, "
+                "expires_at = excluded.expires_at",
+                (key, now + VERSION_TTL, now),
+            )
+            self._conn.execute(
+                "UPDATE rl_counters SET value = MAX(0, value + ?) "
+                "WHERE key = ? AND expires_at > ?",
+                (delta, key, now),
+            )
+
+    def close(self) -> None:
+        with self._lock, closing(self._conn):
+            pass
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE на входе, COMMIT или ROLLBACK (при исключении) на выходе."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# Глобальный экземпляр
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    """Получить хранилище лимитов (выбирается RATE_LIMIT_BACKEND)."""
+    global _backend
+    if _backend is None:
+        if settings.rate_limit_backend == "sqlite":
+            _backend = SqliteRateLimitBackend(settings.rate_limit_sqlite_path)
+        else:
+            _backend = MemoryRateLimitBackend()
+    return _backend
+
+
+def set_rate_limit_backend(backend: Optional[RateLimitBackend]) -> None:
+    """Заменить хранилище (None — пересоздать по настройкам при следующем обращении)."""
+    global _backend
+    if _backend is not None and _backend is not backend:
+        _backend.close()
+    _backend = backend
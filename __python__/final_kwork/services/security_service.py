@@ -1,103 +1,162 @@
 """
 Сервис безопасности: проверка лимитов и валидация запросов.
+
+Лимиты хранятся в services.rate_limiter (память или SQLite):
+- cooldown и дневной лимит — одно атомарное acquire по скользящему окну
+- число активных аккаунтов менеджера — счётчик с TTL, который засевается
+  одним COUNT-запросом (только если его нет и он не менялся во время COUNT)
+  и далее обновляется на переходах заявок
 """
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, Tuple
+from typing import Tuple
 
-from sqlalchemy import select, func
+from sqlalchemy import event, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from db.models import Issue, IssueStatus, User
+from db.models import Issue, IssueStatus
 from config import settings
+from services.rate_limiter import REASON_COOLDOWN, get_rate_limit_backend
 
 logger = logging.getLogger(__name__)
 
-# In-memory кэш для cooldown (простое решение)
-_last_request_cache: dict[int, datetime] = {}
+# Окно дневного лимита запросов
+DAILY_WINDOW_SECONDS = 24 * 60 * 60
+
+# Ключ в session.info для изменений активных выдач, ожидающих commit
+_PENDING_KEY = "active_limit_deltas"
+
+
+def _active_key(user_id: int) -> str:
+    return f"active:{user_id}"
+
+
+def _requests_key(user_id: int) -> str:
+    return f"requests:{user_id}"
+
+
+def record_active_change(session: AsyncSession, user_id: int, delta: int) -> None:
+    """
+    Зарегистрировать изменение числа активных выдач менеджера.
+
+    Применяется к счётчику только после успешного commit.
+    """
+    session.info.setdefault(_PENDING_KEY, []).append((user_id, delta))
+
+
+@event.listens_for(Session, "after_commit")
+def _on_after_commit(session: Session) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if not deltas:
+        return
+    backend = get_rate_limit_backend()
+    for user_id, delta in deltas:
+        try:
+            backend.add_counter(_active_key(user_id), delta)
+        except Exception as e:
+            logger.warning(f"[security] failed to update active counter for {user_id}: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
 
 
 async def check_manager_limit(session: AsyncSession, user_id: int) -> Tuple[bool, int]:
     """
     Проверка лимита активных аккаунтов на менеджера.
-    
+
     Args:
         session: Сессия БД
         user_id: ID пользователя
-    
+
     Returns:
         (is_allowed, current_count): Разрешено ли, текущее количество
     """
-    # ВАЖНО: считаем «выданным» только тогда, когда менеджеру реально отправили код
-    # (confirmation_code заполнен). Это защищает от ситуации, когда админ нажал
-    # «Подтвердить», но менеджер ещё не успел войти и код не перехвачен.
-    stmt = select(func.count(Issue.id)).where(
-        Issue.user_id == user_id,
-        Issue.status == IssueStatus.APPROVED,
-        Issue.confirmation_code.is_not(None),
-    )
-    result = await session.execute(stmt)
-    count = result.scalar() or 0
-    
+    backend = get_rate_limit_backend()
+    count = backend.get_counter(_active_key(user_id))
+
+    if count is None:
+        # Версия читается до COUNT: если переход заявки закоммитится между
+        # ними, засев не сохранится и не затрёт его дельту
+        version = backend.counter_version(_active_key(user_id))
+        # ВАЖНО: считаем «выданным» только тогда, когда менеджеру реально отправили код
+        # (confirmation_code заполнен). Это защищает от ситуации, когда админ нажал
+        # «Подтвердить», но менеджер ещё не успел войти и код не перехвачен.
+        stmt = select(func.count(Issue.id)).where(
+            Issue.user_id == user_id,
+            Issue.status == IssueStatus.APPROVED,
+            Issue.confirmation_code.is_not(None),
+        )
+        result = await session.execute(stmt)
+        count = backend.seed_counter(
+            _active_key(user_id),
+            result.scalar() or 0,
+            settings.active_limit_cache_ttl,
+            version,
+        )
+
     allowed = count < settings.max_accounts_per_manager
     if not allowed:
         logger.warning(
             f"Manager limit exceeded: user_id={user_id}, "
             f"current={count}, max={settings.max_accounts_per_manager}"
         )
-    
+
     return allowed, count
 
 
-async def check_cooldown(user_id: int) -> Tuple[bool, int]:
+def check_request_rate(user_id: int) -> Tuple[bool, str]:
     """
-    Проверка cooldown между запросами.
-    
+    Проверить cooldown и дневной лимит запросов и, если можно, учесть запрос.
+
     Args:
         user_id: ID пользователя (внутренний, не tg_id)
-    
+
     Returns:
-        (is_allowed, remaining_seconds): Разрешено ли, сколько секунд осталось ждать
+        (is_allowed, error_message)
     """
-    if settings.request_cooldown_seconds <= 0:
-        return True, 0
-    
-    last_request = _last_request_cache.get(user_id)
-    if not last_request:
-        return True, 0
-    
-    elapsed = (datetime.utcnow() - last_request).total_seconds()
-    remaining = settings.request_cooldown_seconds - int(elapsed)
-    
-    if remaining <= 0:
-        return True, 0
-    
-    logger.debug(f"Cooldown active: user_id={user_id}, remaining={remaining}s")
-    return False, remaining
-
-
-def update_last_request(user_id: int) -> None:
-    """Обновить время последнего запроса."""
-    _last_request_cache[user_id] = datetime.utcnow()
+    allowed, retry_after, reason = get_rate_limit_backend().acquire(
+        _requests_key(user_id),
+        cooldown=settings.request_cooldown_seconds,
+        limit=settings.max_requests_per_day,
+        window=DAILY_WINDOW_SECONDS,
+    )
+    if allowed:
+        return True, ""
+
+    remaining = int(retry_after) + 1
+    if reason == REASON_COOLDOWN:
+        logger.debug(f"Cooldown active: user_id={user_id}, remaining={remaining}s")
+        return False, f"Подождите {remaining} сек. перед следующим запросом"
+
+    logger.warning(f"Daily request limit reached: user_id={user_id}")
+    hours, rest = divmod(remaining, 3600)
+    wait = f"{hours} ч. {rest // 60} мин." if hours else f"{max(1, rest // 60)} мин."
+    return False, (
+        f"Достигнут дневной лимит запросов ({settings.max_requests_per_day}). "
+        f"Следующий запрос через {wait}"
+    )
 
 
 async def validate_request(
-    session: AsyncSession, 
+    session: AsyncSession,
     user_id: int
 ) -> Tuple[bool, str]:
     """
     Комплексная проверка запроса на выдачу аккаунта.
-    
+
     Проверяет:
     1. Лимит активных аккаунтов на менеджера
     2. Cooldown между запросами (60 сек по умолчанию)
-    
+    3. Дневной лимит запросов (MAX_REQUESTS_PER_DAY)
+
     НЕ блокирует за неудачные попытки!
-    
+
     Args:
         session: Сессия БД
         user_id: ID пользователя (внутренний)
-    
+
     Returns:
         (is_valid, error_message): Валиден ли запрос, сообщение об ошибке
     """
@@ -107,15 +166,6 @@ async def validate_request(
         return False, (
             f"Достигнут лимит аккаунтов ({current_count}/{settings.max_accounts_per_manager})"
         )
-    
-    # 2. Проверяем cooldown между запросами (анти-спам)
-    cooldown_ok, remaining = await check_cooldown(user_id)
-    if not cooldown_ok:
-        return False, (
-            f"Подождите {remaining} сек. перед следующим запросом"
-        )
-    
-    # Обновляем время последнего запроса
-    update_last_request(user_id)
-    
-    return True, ""
+
+    # 2-3. Cooldown и дневной лимит (анти-спам); запрос учитывается при успехе
+    return check_request_rate(user_id)
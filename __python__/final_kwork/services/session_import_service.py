@@ -9,9 +9,16 @@ import logging
 import os
 import shutil
 import sqlite3
+import threading
 import uuid
-from dataclasses import dataclass
-from typing import Optional, Tuple
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import dataclass, replace
+from io import BytesIO
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+from urllib.request import pathname2url
 
 from services.telethon_adapter import (
     TelegramClient,
@@ -109,64 +116,69 @@ class SessionFileData:
         return self.user_id is not None and self.user_id > 0
 
 
-def read_session_file(session_path: str) -> Optional[SessionFileData]:
-    """
-    Прочитать данные из .session файла (SQLite).
+# Кэш разобранных .session файлов: path -> ((mtime_ns, size), SessionFileData | None)
+_SESSION_FILE_CACHE_SIZE = 4096
+_session_file_cache: "OrderedDict[str, Tuple[Tuple[int, int], Optional[SessionFileData]]]" = (
+    OrderedDict()
+)
+_session_file_cache_lock = threading.Lock()
+
+# sessions + entities одним запросом: строка entities с id=0 хранит user_id
+# в поле hash, телефон берём из строки самого пользователя
+_SESSION_FILE_QUERY = """
+    SELECT s.dc_id, s.auth_key, me.hash, usr.phone
+    FROM (SELECT dc_id, auth_key FROM sessions LIMIT 1) AS s
+    LEFT JOIN entities AS me ON me.id = 0
+    LEFT JOIN entities AS usr ON usr.id = me.hash
+"""
 
-    Telethon хранит в SQLite:
-    - sessions: dc_id, server_address, port, auth_key (256 байт)
-    - entities: id, hash, username, phone, name, date
-      - Строка с id=0 содержит user_id в поле hash
 
-    Returns:
-        SessionFileData или None при ошибке
+def _open_session_db(session_path: str) -> sqlite3.Connection:
     """
-    try:
-        conn = sqlite3.connect(session_path)
-        cursor = conn.cursor()
+    Открыть .session файл только на чтение.
 
-        result = SessionFileData()
+    immutable=1 отключает блокировки и проверку журнала — файл не должен
+    изменяться во время чтения (кэш всё равно привязан к mtime/size).
+    """
+    uri = f"file:{pathname2url(os.path.abspath(session_path))}?mode=ro&immutable=1"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False)
 
-        # Получаем dc_id и auth_key из sessions
-        try:
-            cursor.execute("SELECT dc_id, auth_key FROM sessions LIMIT 1")
-            row = cursor.fetchone()
-            if row:
-                result.dc_id = row[0]
-                result.auth_key = row[1]
-        except sqlite3.OperationalError:
-            pass
 
-        # Получаем user_id из entities где id=0 (специальная строка)
-        # В Telethon: строка с id=0 хранит user_id в поле hash
+def _query_session_file(session_path: str) -> SessionFileData:
+    """Прочитать dc_id, auth_key, user_id и phone из SQLite."""
+    result = SessionFileData()
+
+    with closing(_open_session_db(session_path)) as conn:
         try:
-            cursor.execute("SELECT hash FROM entities WHERE id = 0")
-            row = cursor.fetchone()
-            if row and row[0]:
-                result.user_id = row[0]
-                logger.debug(f"Found user_id={result.user_id} in entities (id=0)")
+            row = conn.execute(_SESSION_FILE_QUERY).fetchone()
         except sqlite3.OperationalError:
-            pass
+            # Нет таблицы entities — берём только sessions
+            try:
+                row = conn.execute("SELECT dc_id, auth_key FROM sessions LIMIT 1").fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            row = (row[0], row[1], None, None) if row else None
 
+    if row:
+        result.dc_id, result.auth_key = row[0], row[1]
         # ВАЖНО:
         # Не пытаемся "угадывать" user_id по первой сущности.
         # В entities лежат и чаты/каналы/контакты, и выбор "первого" ID часто даёт неверный tg_user_id.
         # Если user_id не найден через id=0, лучше оставить None и получить его через connect() один раз.
+        if row[2]:
+            result.user_id = row[2]
+            logger.debug(f"Found user_id={result.user_id} in entities (id=0)")
+            if row[3]:
+                result.phone = str(row[3])
+                logger.debug(f"Found phone={result.phone} in entities")
 
-        # Пробуем получить phone из entities (если есть user_id)
-        if result.user_id and not result.phone:
-            try:
-                cursor.execute(
-                    "SELECT phone FROM entities WHERE id = ?", (result.user_id,)
-                )
-                row = cursor.fetchone()
-                if row and row[0]:
-                    result.phone = str(row[0])
-                    logger.debug(f"Found phone={result.phone} in entities")
-            except sqlite3.OperationalError:
-                pass
+    return result
 
-        conn.close()
+
+def _parse_session_file(session_path: str) -> Optional[SessionFileData]:
+    """Разобрать .session файл (без кэша)."""
+    try:
+        result = _query_session_file(session_path)
 
         # Fallback 2: извлекаем phone из имени файла (user_id из имени НЕ используем)
         filename = os.path.basename(session_path).replace(".session", "")
@@ -178,16 +190,11 @@ def read_session_file(session_path: str) -> Optional[SessionFileData]:
         try:
             # Убираем + в начале для телефонов
             clean_name = filename.lstrip("+")
-            parsed_id = int(clean_name)
-
-            # Различаем user_id и телефон:
-            # - User_id: обычно 6-10 цифр
-            # - Телефон: обычно 10-15 цифр
-            num_digits = len(clean_name)
+            int(clean_name)
 
             # Телефон: обычно 10-15 цифр. Для 9-10 цифр слишком много пересечений с user_id,
             # поэтому здесь сохраняем только phone, а user_id получаем через connect().
-            if num_digits >= 10:
+            if len(clean_name) >= 10:
                 if not result.phone:
                     result.phone = clean_name
                     logger.info(f"Extracted phone={result.phone} from filename")
@@ -208,6 +215,57 @@ def read_session_file(session_path: str) -> Optional[SessionFileData]:
         return None
 
 
+def read_session_file(session_path: str) -> Optional[SessionFileData]:
+    """
+    Прочитать данные из .session файла (SQLite).
+
+    Telethon хранит в SQLite:
+    - sessions: dc_id, server_address, port, auth_key (256 байт)
+    - entities: id, hash, username, phone, name, date
+      - Строка с id=0 содержит user_id в поле hash
+
+    Файл открывается только на чтение, результат кэшируется по
+    (path, mtime, size). Потокобезопасна — подходит для пула потоков.
+
+    Returns:
+        SessionFileData или None при ошибке
+    """
+    try:
+        st = os.stat(session_path)
+    except OSError as e:
+        logger.error(f"Failed to read session file {session_path}: {e}")
+        return None
+
+    key = (st.st_mtime_ns, st.st_size)
+    with _session_file_cache_lock:
+        cached = _session_file_cache.get(session_path)
+        if cached and cached[0] == key:
+            _session_file_cache.move_to_end(session_path)
+            return replace(cached[1]) if cached[1] else None
+
+    result = _parse_session_file(session_path)
+
+    with _session_file_cache_lock:
+        _session_file_cache[session_path] = (key, result)
+        _session_file_cache.move_to_end(session_path)
+        while len(_session_file_cache) > _SESSION_FILE_CACHE_SIZE:
+            _session_file_cache.popitem(last=False)
+
+    return replace(result) if result else None
+
+
+def read_session_files(
+    session_paths: List[str], max_workers: int = 4
+) -> Dict[str, Optional[SessionFileData]]:
+    """Прочитать много .session файлов пулом потоков: {path: SessionFileData | None}."""
+    if not session_paths:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="session_reader"
+    ) as executor:
+        return dict(zip(session_paths, executor.map(read_session_file, session_paths)))
+
+
 def extract_fingerprint_from_dict(data: dict) -> Optional[DeviceFingerprint]:
     """
     Извлечь device fingerprint из JSON словаря.
@@ -450,86 +508,273 @@ def extract_api_credentials(path: str) -> Optional[Tuple[int, str]]:
         return None
 
 
-def find_api_json(directory: str) -> Optional[ApiCredentials]:
-    """
-    Найти и прочитать JSON файл с api_id/api_hash в директории или её родительских папках.
+_SESSION_NAME_SUFFIXES = ("_telethon", "_pyrogram", "_tdata", "_session")
 
-    Стратегия поиска:
-    1. Сначала ищет файлы из ACCOUNT_JSON_FILENAMES (api.json, config.json, etc.)
-    2. Затем ищет любой .json файл в директории
-    3. Поднимается на 3 уровня вверх по директориям
 
-    Returns:
-        ApiCredentials или None если не найден
+class JsonMetadataIndex:
+    """
+    Индекс JSON метаданных сессий (api_id/api_hash, fingerprint, phone).
+
+    Каждая директория сканируется один раз, каждый JSON разбирается один раз —
+    запросы о credentials, fingerprint и телефоне отвечаются из памяти.
+    Создаётся на одну операцию импорта (содержимое директорий не отслеживается).
+    Можно использовать из нескольких потоков (пакетный импорт): заполнение
+    кэшей идёт под блокировкой. Имена JSON сравниваются без учёта регистра
+    (+7999.JSON подходит к +7999.session, как на Windows).
+
+    Использование:
+        index = JsonMetadataIndex()
+        creds = index.find_api_credentials(session_dir)
+        fp = index.get_fingerprint(session_path)
     """
-    search_names = settings.account_json_filenames_list
 
-    # Поиск в текущей директории и родительских (до 3 уровней)
-    current_dir = directory
-    for depth in range(4):  # 0, 1, 2, 3 — текущая + 3 уровня вверх
-        if not os.path.isdir(current_dir):
-            parent = os.path.dirname(current_dir)
-            if parent == current_dir:
-                break
-            current_dir = parent
-            continue
+    def __init__(self):
+        # директория -> {имя файла в нижнем регистре: путь} (в порядке os.scandir)
+        self._dirs: Dict[str, Dict[str, str]] = {}
+        # путь -> разобранный JSON (None при ошибке)
+        self._data: Dict[str, Optional[object]] = {}
+        self._lock = threading.Lock()
+
+    def list_json(self, directory: str) -> Dict[str, str]:
+        """
+        JSON файлы директории: {имя в нижнем регистре: путь}
+        (пустой dict, если директории нет).
+        """
+        files = self._dirs.get(directory)
+        if files is not None:
+            return files
+
+        with self._lock:
+            files = self._dirs.get(directory)
+            if files is None:
+                files = {}
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            name = entry.name.lower()
+                            if name.endswith(".json") and entry.is_file():
+                                files.setdefault(name, entry.path)
+                except OSError:
+                    pass
+                self._dirs[directory] = files
+        return files
+
+    def load(self, json_path: str) -> Optional[object]:
+        """Разобранный JSON (кэшируется, ошибки логируются один раз)."""
+        if json_path in self._data:
+            return self._data[json_path]
+
+        with self._lock:
+            if json_path not in self._data:
+                data = None
+                try:
+                    with open(json_path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except json.JSONDecodeError as e:
+                    logger.error(f"Invalid JSON in {json_path}: {e}")
+                except Exception as e:
+                    logger.warning(f"Failed to read {json_path}: {e}")
+                self._data[json_path] = data
+        return self._data[json_path]
+
+    def credentials(self, json_path: str) -> Optional[Tuple[int, str]]:
+        """api_id/api_hash из JSON файла."""
+        data = self.load(json_path)
+        if data is None:
+            return None
+        try:
+            return extract_api_credentials_from_dict(data)
+        except Exception:
+            return None
+
+    def fingerprint(self, json_path: str) -> Optional[DeviceFingerprint]:
+        """Device fingerprint из JSON файла."""
+        data = self.load(json_path)
+        if data is None:
+            return None
+        try:
+            return extract_fingerprint_from_dict(data)
+        except Exception as e:
+            logger.debug(f"Failed to extract fingerprint from {json_path}: {e}")
+            return None
+
+    def phone(self, json_path: str) -> Optional[str]:
+        """Номер телефона из JSON файла."""
+        data = self.load(json_path)
+        if data is None:
+            return None
+        try:
+            return extract_phone_from_dict(data)
+        except Exception:
+            return None
+
+    def find_json_in_directory(self, directory: str) -> Optional[str]:
+        """Первый JSON в директории: сначала приоритетные имена, затем любой."""
+        if not os.path.isdir(directory):
+            directory = os.path.dirname(directory)
+
+        files = self.list_json(directory)
+        if not files:
+            return None
+
+        for name in settings.account_json_filenames_list:
+            json_path = files.get(name.lower())
+            if json_path:
+                return json_path
+
+        return next(iter(files.values()))
+
+    def find_api_credentials(self, directory: str) -> Optional[ApiCredentials]:
+        """
+        Найти api_id/api_hash в директории или её родительских папках.
+
+        Стратегия поиска:
+        1. Сначала ищет файлы из ACCOUNT_JSON_FILENAMES (api.json, config.json, etc.)
+        2. Затем ищет любой .json файл в директории
+        3. Поднимается на 3 уровня вверх по директориям
+        """
+        search_names = [name.lower() for name in settings.account_json_filenames_list]
 
-        # 1. Сначала ищем приоритетные файлы
-        for name in search_names:
-            json_path = os.path.join(current_dir, name)
-            if os.path.exists(json_path):
-                result = extract_api_credentials(json_path)
+        current_dir = directory
+        for depth in range(4):  # 0, 1, 2, 3 — текущая + 3 уровня вверх
+            files = self.list_json(current_dir)
+
+            # 1. Сначала ищем приоритетные файлы
+            for name in search_names:
+                json_path = files.get(name)
+                if not json_path:
+                    continue
+                result = self.credentials(json_path)
                 if result:
                     api_id, api_hash = result
-                    logger.info(
-                        f"Found API credentials in {json_path}: api_id={api_id}"
-                    )
+                    logger.info(f"Found API credentials in {json_path}: api_id={api_id}")
                     return ApiCredentials(
-                        api_id=api_id,
-                        api_hash=api_hash,
-                        source="json",
-                        json_path=json_path,
-                    )
-                else:
-                    logger.warning(
-                        f"JSON found but no valid api_id/api_hash: {json_path}"
+                        api_id=api_id, api_hash=api_hash, source="json", json_path=json_path
                     )
+                logger.warning(f"JSON found but no valid api_id/api_hash: {json_path}")
+
+            # 2. Ищем любой .json файл (только в текущей директории)
+            if depth == 0:
+                for filename, json_path in files.items():
+                    if filename in search_names:
+                        continue
+                    result = self.credentials(json_path)
+                    if result:
+                        api_id, api_hash = result
+                        logger.info(
+                            f"Found API credentials in {json_path}: api_id={api_id}"
+                        )
+                        return ApiCredentials(
+                            api_id=api_id,
+                            api_hash=api_hash,
+                            source="json",
+                            json_path=json_path,
+                        )
 
-        # 2. Ищем любой .json файл
-        if depth == 0:  # Только в текущей директории
-            try:
-                for filename in os.listdir(current_dir):
-                    if (
-                        filename.lower().endswith(".json")
-                        and filename not in search_names
-                    ):
-                        json_path = os.path.join(current_dir, filename)
-                        if os.path.isfile(json_path):
-                            result = extract_api_credentials(json_path)
-                            if result:
-                                api_id, api_hash = result
-                                logger.info(
-                                    f"Found API credentials in {json_path}: api_id={api_id}"
-                                )
-                                return ApiCredentials(
-                                    api_id=api_id,
-                                    api_hash=api_hash,
-                                    source="json",
-                                    json_path=json_path,
-                                )
-            except OSError:
-                pass
+            parent = os.path.dirname(current_dir)
+            if parent == current_dir:
+                break
+            current_dir = parent
 
-        parent = os.path.dirname(current_dir)
-        if parent == current_dir:
-            break
-        current_dir = parent
+        return None
 
-    return None
+    @staticmethod
+    def _session_names(session_path: str) -> Tuple[str, str, str]:
+        """(директория, имя сессии, имя без суффиксов _telethon и т.д.)."""
+        session_dir = os.path.dirname(session_path)
+        session_name = os.path.basename(session_path).replace(".session", "")
+        clean_name = session_name
+        for suffix in _SESSION_NAME_SUFFIXES:
+            clean_name = clean_name.replace(suffix, "")
+        return session_dir, session_name, clean_name
+
+    def _named_json(self, session_path: str) -> Tuple[str, ...]:
+        """JSON с именем сессии: точное совпадение, затем имя без суффиксов."""
+        session_dir, session_name, clean_name = self._session_names(session_path)
+        files = self.list_json(session_dir)
+        names = [f"{session_name}.json".lower()]
+        if clean_name != session_name:
+            names.append(f"{clean_name}.json".lower())
+        return tuple(files[name] for name in names if name in files)
+
+    def get_fingerprint(self, session_path: str) -> DeviceFingerprint:
+        """
+        Fingerprint для сессии: JSON с именем сессии, затем общий JSON
+        директории, иначе дефолтный Android.
+        """
+        fp = None
+        source = "default"
+
+        candidates = list(self._named_json(session_path))
+        common = self.find_json_in_directory(os.path.dirname(session_path))
+        if common:
+            candidates.append(common)
+
+        for json_path in candidates:
+            fp = self.fingerprint(json_path)
+            if fp:
+                if fp.is_valid():
+                    source = json_path
+                break
+
+        if not fp:
+            fp = DeviceFingerprint.default_android()
+            source = "default"
+
+        # Логируем fingerprint КАК ЕСТЬ (без изменений!)
+        logger.info(
+            f"Fingerprint from {source}: device='{fp.device_model}', system='{fp.system_version}'"
+        )
+        return fp
+
+    def get_phone(self, session_path: str) -> Optional[str]:
+        """
+        Телефон для сессии: JSON с именем сессии, имя файла (10+ цифр),
+        затем общий JSON директории.
+        """
+        for json_path in self._named_json(session_path):
+            phone = self.phone(json_path)
+            if phone:
+                logger.info(f"Found phone in {json_path}: {phone}")
+                return phone
+
+        _, _, clean_name = self._session_names(session_path)
+        clean_name_digits = clean_name.lstrip("+")
+        if clean_name_digits.isdigit() and len(clean_name_digits) >= 10:
+            logger.info(f"Using filename as phone: {clean_name_digits}")
+            return clean_name_digits
+
+        json_path = self.find_json_in_directory(os.path.dirname(session_path))
+        if json_path:
+            phone = self.phone(json_path)
+            if phone:
+                logger.info(f"Found phone in {json_path}: {phone}")
+                return phone
+
+        return None
+
+
+def find_api_json(
+    directory: str, json_index: Optional[JsonMetadataIndex] = None
+) -> Optional[ApiCredentials]:
+    """
+    Найти и прочитать JSON файл с api_id/api_hash в директории или её родительских папках.
+
+    Стратегия поиска:
+    1. Сначала ищет файлы из ACCOUNT_JSON_FILENAMES (api.json, config.json, etc.)
+    2. Затем ищет любой .json файл в директории
+    3. Поднимается на 3 уровня вверх по директориям
+
+    Returns:
+        ApiCredentials или None если не найден
+    """
+    return (json_index or JsonMetadataIndex()).find_api_credentials(directory)
 
 
 def get_api_credentials(
-    directory: Optional[str] = None, require_json: bool = False
+    directory: Optional[str] = None,
+    require_json: bool = False,
+    json_index: Optional[JsonMetadataIndex] = None,
 ) -> Tuple[Optional[int], Optional[str], str]:
     """
     Получить API credentials: сначала из JSON файла, иначе из настроек (если разрешён fallback).
@@ -537,12 +782,13 @@ def get_api_credentials(
     Args:
         directory: Директория для поиска JSON
         require_json: Если True и JSON не найден — вернёт (None, None, error)
+        json_index: Индекс JSON текущего импорта (если None — создаётся новый)
 
     Returns:
         (api_id, api_hash, source) где source = "json" | "env" | "error:..."
     """
     if directory:
-        creds = find_api_json(directory)
+        creds = find_api_json(directory, json_index)
         if creds:
             return creds.api_id, creds.api_hash, "json"
 
@@ -575,36 +821,16 @@ class SessionValidationResult:
     fingerprint: Optional[DeviceFingerprint] = None
 
 
-def find_json_in_directory(directory: str) -> Optional[str]:
+def find_json_in_directory(
+    directory: str, json_index: Optional[JsonMetadataIndex] = None
+) -> Optional[str]:
     """
     Найти первый JSON файл в директории.
 
     Returns:
         Путь к JSON файлу или None
     """
-    search_names = settings.account_json_filenames_list
-
-    if not os.path.isdir(directory):
-        directory = os.path.dirname(directory)
-
-    if not os.path.isdir(directory):
-        return None
-
-    # 1. Приоритетные файлы
-    for name in search_names:
-        json_path = os.path.join(directory, name)
-        if os.path.exists(json_path):
-            return json_path
-
-    # 2. Любой .json
-    try:
-        for filename in os.listdir(directory):
-            if filename.lower().endswith(".json"):
-                return os.path.join(directory, filename)
-    except OSError:
-        pass
-
-    return None
+    return (json_index or JsonMetadataIndex()).find_json_in_directory(directory)
 
 
 def get_fingerprint_from_json(json_path: str) -> Optional[DeviceFingerprint]:
@@ -626,7 +852,9 @@ def get_fingerprint_from_json(json_path: str) -> Optional[DeviceFingerprint]:
         return None
 
 
-def get_fingerprint_for_session(session_path: str) -> DeviceFingerprint:
+def get_fingerprint_for_session(
+    session_path: str, json_index: Optional[JsonMetadataIndex] = None
+) -> DeviceFingerprint:
     """
     Получить fingerprint для сессии.
 
@@ -640,59 +868,17 @@ def get_fingerprint_for_session(session_path: str) -> DeviceFingerprint:
 
     Args:
         session_path: Путь к .session файлу
+        json_index: Индекс JSON текущего импорта (если None — создаётся новый)
 
     Returns:
         DeviceFingerprint (всегда возвращает значение)
     """
-    session_dir = os.path.dirname(session_path)
-    session_basename = os.path.basename(session_path)
-    session_name = session_basename.replace(".session", "")
-
-    # Убираем суффиксы для альтернативного поиска
-    clean_name = session_name
-    for suffix in ["_telethon", "_pyrogram", "_tdata", "_session"]:
-        clean_name = clean_name.replace(suffix, "")
-
-    fp = None
-    source = "default"
-
-    # 1. Ищем JSON с точным именем сессии
-    matching_json = os.path.join(session_dir, f"{session_name}.json")
-    if os.path.exists(matching_json):
-        fp = get_fingerprint_from_json(matching_json)
-        if fp and fp.is_valid():
-            source = matching_json
-
-    # 2. Ищем JSON без суффиксов (205318444.json для 205318444_telethon.session)
-    if not fp and clean_name != session_name:
-        clean_json = os.path.join(session_dir, f"{clean_name}.json")
-        if os.path.exists(clean_json):
-            fp = get_fingerprint_from_json(clean_json)
-            if fp and fp.is_valid():
-                source = clean_json
-
-    # 3. Fallback: ищем любой JSON в директории
-    if not fp:
-        json_path = find_json_in_directory(session_dir)
-        if json_path:
-            fp = get_fingerprint_from_json(json_path)
-            if fp and fp.is_valid():
-                source = json_path
+    return (json_index or JsonMetadataIndex()).get_fingerprint(session_path)
 
-    # 4. Дефолт если ничего не найдено
-    if not fp:
-        fp = DeviceFingerprint.default_android()
-        source = "default"
-
-    # Логируем fingerprint КАК ЕСТЬ (без изменений!)
-    logger.info(
-        f"Fingerprint from {source}: device='{fp.device_model}', system='{fp.system_version}'"
-    )
 
-    return fp
-
-
-def get_phone_for_session(session_path: str) -> Optional[str]:
+def get_phone_for_session(
+    session_path: str, json_index: Optional[JsonMetadataIndex] = None
+) -> Optional[str]:
     """
     Получить номер телефона для сессии.
 
@@ -705,47 +891,7 @@ def get_phone_for_session(session_path: str) -> Optional[str]:
     Returns:
         Номер телефона или None
     """
-    session_dir = os.path.dirname(session_path)
-    session_basename = os.path.basename(session_path)
-    session_name = session_basename.replace(".session", "")
-
-    # Убираем суффиксы
-    clean_name = session_name
-    for suffix in ["_telethon", "_pyrogram", "_tdata", "_session"]:
-        clean_name = clean_name.replace(suffix, "")
-    clean_name_digits = clean_name.lstrip("+")
-
-    # 1. JSON с точным именем сессии
-    matching_json = os.path.join(session_dir, f"{session_name}.json")
-    if os.path.exists(matching_json):
-        phone = extract_phone_from_json(matching_json)
-        if phone:
-            logger.info(f"Found phone in {matching_json}: {phone}")
-            return phone
-
-    # 2. JSON с именем без суффиксов (205318444.json для 205318444_telethon.session)
-    if clean_name != session_name:
-        clean_json = os.path.join(session_dir, f"{clean_name}.json")
-        if os.path.exists(clean_json):
-            phone = extract_phone_from_json(clean_json)
-            if phone:
-                logger.info(f"Found phone in {clean_json}: {phone}")
-                return phone
-
-    # 3. Имя файла как телефон (если 10+ цифр)
-    if clean_name_digits.isdigit() and len(clean_name_digits) >= 10:
-        logger.info(f"Using filename as phone: {clean_name_digits}")
-        return clean_name_digits
-
-    # 4. Любой JSON в директории
-    json_path = find_json_in_directory(session_dir)
-    if json_path:
-        phone = extract_phone_from_json(json_path)
-        if phone:
-            logger.info(f"Found phone in {json_path}: {phone}")
-            return phone
-
-    return None
+    return (json_index or JsonMetadataIndex()).get_phone(session_path)
 
 
 def ensure_directories() -> None:
@@ -754,6 +900,172 @@ def ensure_directories() -> None:
         os.makedirs(dir_path, exist_ok=True)
 
 
+# Размер блока при потоковой распаковке
+_ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+class ZipExtractError(Exception):
+    """Ошибка распаковки архива (сообщение пригодно для показа пользователю)."""
+
+
+def extract_zip_members(
+    archive: Union[bytes, BinaryIO],
+    dst_dir: str,
+    member_filter: Callable[[str], bool],
+    max_total_size: int,
+) -> int:
+    """
+    Распаковать из ZIP только нужные файлы.
+
+    Архив читается из памяти (bytes/BytesIO) без промежуточного файла.
+    Размер распакованных данных считается по фактически записанным байтам,
+    а не по заголовкам, поэтому защита от ZIP-бомб точная.
+
+    Args:
+        archive: Содержимое архива или file-like объект
+        dst_dir: Целевая директория
+        member_filter: Принимает имя члена архива (через '/'), True — распаковать
+        max_total_size: Лимит суммарного распакованного размера (байт)
+
+    Returns:
+        Количество распакованных файлов
+
+    Raises:
+        ZipExtractError: лимит превышен, небезопасный путь или битый архив
+    """
+    if isinstance(archive, (bytes, bytearray)):
+        archive = BytesIO(archive)
+
+    root = os.path.realpath(dst_dir)
+    os.makedirs(root, exist_ok=True)
+
+    total = 0
+    extracted = 0
+
+    try:
+        with zipfile.ZipFile(archive, "r") as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not member_filter(info.filename):
+                    continue
+
+                # Защита от zip-slip: путь не должен выходить за dst_dir
+                target = os.path.realpath(os.path.join(root, info.filename))
+                if os.path.commonpath([root, target]) != root:
+                    raise ZipExtractError(f"Недопустимый путь в архиве: {info.filename}")
+
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with zf.open(info) as src, open(target, "wb") as dst:
+                    while True:
+                        chunk = src.read(_ZIP_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        total += len(chunk)
+                        if total > max_total_size:
+                            raise ZipExtractError(
+                                f"Архив слишком большой после распаковки "
+                                f"(более {max_total_size // 1024 // 1024} MB)"
+                            )
+                        dst.write(chunk)
+                extracted += 1
+
+    except zipfile.BadZipFile:
+        raise ZipExtractError("Повреждённый ZIP-архив")
+
+    logger.info(
+        f"Extracted {extracted} members ({total // 1024} KB) to {dst_dir}"
+    )
+    return extracted
+
+
+def _resolve_api_credentials(
+    session_path: str,
+    api_id: Optional[int],
+    api_hash: Optional[str],
+    json_index: JsonMetadataIndex,
+) -> Tuple[Optional[int], Optional[str], str, Optional[str]]:
+    """
+    Определить API credentials для сессии.
+
+    Returns:
+        (api_id, api_hash, source, error) — error не None, если credentials не найдены
+    """
+    if api_id is not None and api_hash is not None:
+        return api_id, api_hash, "provided", None
+
+    found_api_id, found_api_hash, source = get_api_credentials(
+        os.path.dirname(session_path), json_index=json_index
+    )
+    if source.startswith("error:"):
+        return None, None, source, source.replace("error:", "")
+
+    return api_id or found_api_id, api_hash or found_api_hash, source, None
+
+
+def validate_session_offline(
+    session_path: str,
+    api_id: Optional[int] = None,
+    api_hash: Optional[str] = None,
+    json_index: Optional[JsonMetadataIndex] = None,
+) -> SessionValidationResult:
+    """
+    Валидация .session файла без подключения к Telegram.
+
+    Только читает файлы (SQLite сессии и JSON рядом с ней), поэтому
+    синхронная — её можно вызывать из пула потоков.
+    """
+    json_index = json_index or JsonMetadataIndex()
+    api_id, api_hash, api_source, error = _resolve_api_credentials(
+        session_path, api_id, api_hash, json_index
+    )
+    if error:
+        return SessionValidationResult(success=False, error=error)
+
+    # Получаем fingerprint
+    fingerprint = json_index.get_fingerprint(session_path)
+
+    # Получаем phone из JSON или имени файла
+    phone_from_json = json_index.get_phone(session_path)
+
+    logger.info(f"Skipping connection for session: {session_path}")
+
+    # Читаем user_id напрямую из .session файла (SQLite)
+    session_data = read_session_file(session_path)
+
+    # Определяем phone: из JSON > из SQLite > из имени файла
+    final_phone = phone_from_json or (session_data.phone if session_data else None)
+
+    if session_data and session_data.is_valid():
+        logger.info(
+            f"Read from session file: user_id={session_data.user_id}, phone={final_phone}"
+        )
+        return SessionValidationResult(
+            success=True,
+            tg_user_id=session_data.user_id,
+            phone=final_phone,
+            api_id=api_id,
+            api_hash=api_hash,
+            api_source=api_source,
+            fingerprint=fingerprint,
+        )
+    elif session_data:
+        # auth_key есть, но user_id не найден — всё равно валидная сессия
+        logger.info(f"Session valid, user_id pending, phone={final_phone}")
+        return SessionValidationResult(
+            success=True,
+            phone=final_phone,
+            api_id=api_id,
+            api_hash=api_hash,
+            api_source=api_source,
+            fingerprint=fingerprint,
+        )
+    else:
+        return SessionValidationResult(
+            success=False,
+            error="Invalid or corrupted session file",
+            fingerprint=fingerprint,
+        )
+
+
 async def validate_session(
     session_path: str,
     timeout: int = 30,
@@ -777,68 +1089,20 @@ async def validate_session(
     Returns:
         SessionValidationResult с данными аккаунта или ошибкой.
     """
-    # Определяем API credentials
-    session_dir = os.path.dirname(session_path)
-    api_source = "provided"
-
-    if api_id is None or api_hash is None:
-        found_api_id, found_api_hash, source = get_api_credentials(session_dir)
-
-        # Проверяем на ошибку
-        if source.startswith("error:"):
-            error_msg = source.replace("error:", "")
-            return SessionValidationResult(success=False, error=error_msg)
-
-        api_id = api_id or found_api_id
-        api_hash = api_hash or found_api_hash
-        api_source = source
-
-    # Получаем fingerprint
-    fingerprint = get_fingerprint_for_session(session_path)
-
-    # Получаем phone из JSON или имени файла
-    phone_from_json = get_phone_for_session(session_path)
-
     # Если skip_connect — читаем данные из SQLite файла без подключения к Telegram
     if skip_connect:
-        logger.info(f"Skipping connection for session: {session_path}")
+        return validate_session_offline(session_path, api_id=api_id, api_hash=api_hash)
 
-        # Читаем user_id напрямую из .session файла (SQLite)
-        session_data = read_session_file(session_path)
-
-        # Определяем phone: из JSON > из SQLite > из имени файла
-        final_phone = phone_from_json or (session_data.phone if session_data else None)
+    # Определяем API credentials
+    json_index = JsonMetadataIndex()
+    api_id, api_hash, api_source, error = _resolve_api_credentials(
+        session_path, api_id, api_hash, json_index
+    )
+    if error:
+        return SessionValidationResult(success=False, error=error)
 
-        if session_data and session_data.is_valid():
-            logger.info(
-                f"Read from session file: user_id={session_data.user_id}, phone={final_phone}"
-            )
-            return SessionValidationResult(
-                success=True,
-                tg_user_id=session_data.user_id,
-                phone=final_phone,
-                api_id=api_id,
-                api_hash=api_hash,
-                api_source=api_source,
-                fingerprint=fingerprint,
-            )
-        elif session_data:
-            # auth_key есть, но user_id не найден — всё равно валидная сессия
-            logger.info(f"Session valid, user_id pending, phone={final_phone}")
-            return SessionValidationResult(
-                success=True,
-                phone=final_phone,
-                api_id=api_id,
-                api_hash=api_hash,
-                api_source=api_source,
-                fingerprint=fingerprint,
-            )
-        else:
-            return SessionValidationResult(
-                success=False,
-                error="Invalid or corrupted session file",
-                fingerprint=fingerprint,
-            )
+    # Получаем fingerprint
+    fingerprint = json_index.get_fingerprint(session_path)
 
     client = None
     try:
@@ -1,15 +1,28 @@
 """
 Сервис статистики системы.
+
+Статистика хранится в памяти как снимок (snapshot) и поддерживается
+инкрементально: переходы статусов аккаунтов и заявок в accounts_service /
+issues_service регистрируют дельты, которые применяются после commit.
+Снимок периодически сверяется с БД (reconcile) — это подхватывает изменения
+из мест, которые не публикуют дельты (импорт, конвертация и т.п.).
 """
+import asyncio
 import logging
-from dataclasses import dataclass
-from typing import Dict
+from dataclasses import astuple, dataclass
+from datetime import datetime
+from typing import Dict, Optional
 
-from sqlalchemy import func, select
+from sqlalchemy import event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from config import settings
 from db.models import Account, AccountStatus, Issue, IssueStatus, User
-from services import telethon_workers
+from db.session import get_session
+from services.conversion_pool import get_conversion_pool
+from services.worker_supervisor import get_worker_supervisor
+from utils.instrumentation import WORKER_RUN_METRIC, percentiles
 
 logger = logging.getLogger(__name__)
 
@@ -34,49 +47,250 @@ class SystemStats:
     users_total: int = 0
     active_workers: int = 0
 
+    # Слушатели кодов (services/worker_supervisor.py)
+    workers_queued: int = 0
+    workers_completed: int = 0
+    workers_failed: int = 0
+    workers_expired: int = 0
+    workers_rejected: int = 0
+    worker_run_p95_sec: Optional[float] = None
+
+    # Пул конвертации tdata
+    conversions_running: int = 0
+    conversions_queued: int = 0
+
+    # Момент последней сверки с БД
+    reconciled_at: Optional[datetime] = None
+
+
+# =============================================================================
+# Снимок статистики
+# =============================================================================
+
+# Ключ в session.info для дельт, ожидающих commit
+_PENDING_KEY = "stats_deltas"
+
+_account_counts: Dict[AccountStatus, int] = {}
+_issue_counts: Dict[IssueStatus, int] = {}
+_users_total: int = 0
+_reconciled_at: Optional[datetime] = None
+_snapshot_ready = False
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+# Кэш отформатированного сообщения
+_message_cache: Optional[tuple] = None
+
+
+def record_account_transition(
+    session: AsyncSession,
+    old_status: Optional[AccountStatus],
+    new_status: Optional[AccountStatus],
+) -> None:
+    """
+    Зарегистрировать переход статуса аккаунта.
+
+    None в old_status — аккаунт создан, в new_status — удалён.
+    Дельта применяется к снимку только после успешного commit.
+    """
+    if old_status == new_status:
+        return
+    session.info.setdefault(_PENDING_KEY, []).append(
+        ("account", old_status, new_status)
+    )
+
+
+def record_issue_transition(
+    session: AsyncSession,
+    old_status: Optional[IssueStatus],
+    new_status: Optional[IssueStatus],
+) -> None:
+    """Зарегистрировать переход статуса заявки (None — создание)."""
+    if old_status == new_status:
+        return
+    session.info.setdefault(_PENDING_KEY, []).append(
+        ("issue", old_status, new_status)
+    )
+
+
+def record_user_created(session: AsyncSession) -> None:
+    """Зарегистрировать создание пользователя."""
+    session.info.setdefault(_PENDING_KEY, []).append(("user", None, None))
+
+
+def _apply_delta(kind: str, old_status, new_status) -> None:
+    global _users_total
+
+    if kind == "user":
+        _users_total += 1
+        return
+
+    counts = _account_counts if kind == "account" else _issue_counts
+    if old_status is not None:
+        counts[old_status] = max(0, counts.get(old_status, 0) - 1)
+    if new_status is not None:
+        counts[new_status] = counts.get(new_status, 0) + 1
+
+
+@event.listens_for(Session, "after_commit")
+def _on_after_commit(session: Session) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if not deltas or not _snapshot_ready:
+        # Снимка ещё нет — он будет построен из БД при первом обращении
+        return
+    for delta in deltas:
+        _apply_delta(*delta)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+async def reconcile_stats(session: AsyncSession) -> None:
+    """Пересчитать снимок из БД (три агрегирующих запроса)."""
+    global _account_counts, _issue_counts, _users_total, _reconciled_at, _snapshot_ready
 
-async def get_system_stats(session: AsyncSession) -> SystemStats:
-    """Получить статистику системы."""
-    stats = SystemStats()
-    
     # Аккаунты по статусам
     accounts_query = await session.execute(
         select(Account.status, func.count(Account.id)).group_by(Account.status)
     )
     acc_by_status: Dict = dict(accounts_query.all())
-    
-    stats.accounts_free = acc_by_status.get(AccountStatus.FREE, 0)
-    stats.accounts_assigned = acc_by_status.get(AccountStatus.ASSIGNED, 0)
-    stats.accounts_disabled = acc_by_status.get(AccountStatus.DISABLED, 0)
-    stats.accounts_needs_conversion = acc_by_status.get(AccountStatus.NEEDS_CONVERSION, 0)
-    stats.accounts_total = sum(acc_by_status.values())
-    
+
     # Заявки по статусам
     issues_query = await session.execute(
         select(Issue.status, func.count(Issue.id)).group_by(Issue.status)
     )
     iss_by_status: Dict = dict(issues_query.all())
-    
-    stats.issues_pending = iss_by_status.get(IssueStatus.PENDING, 0)
-    stats.issues_approved = iss_by_status.get(IssueStatus.APPROVED, 0)
-    stats.issues_rejected = iss_by_status.get(IssueStatus.REJECTED, 0)
-    stats.issues_revoked = iss_by_status.get(IssueStatus.REVOKED, 0)
-    
+
     # Пользователи
     users_query = await session.execute(select(func.count(User.id)))
-    stats.users_total = users_query.scalar() or 0
-    
-    # Воркеры
-    stats.active_workers = telethon_workers.get_active_workers_count()
+    users_total = users_query.scalar() or 0
+
+    if _snapshot_ready and (
+        acc_by_status != {k: v for k, v in _account_counts.items() if v}
+        or iss_by_status != {k: v for k, v in _issue_counts.items() if v}
+        or users_total != _users_total
+    ):
+        logger.debug("[stats] snapshot drift corrected by reconcile")
+
+    _account_counts = acc_by_status
+    _issue_counts = iss_by_status
+    _users_total = users_total
+    _reconciled_at = datetime.now()
+    _snapshot_ready = True
+
+
+def get_cached_stats() -> Optional[SystemStats]:
+    """Текущий снимок без обращения к БД (None, если снимок ещё не построен)."""
+    if not _snapshot_ready:
+        return None
+
+    acc = _account_counts
+    iss = _issue_counts
+    conversions = get_conversion_pool().get_stats()
+    workers = get_worker_supervisor().get_stats()
+    worker_run = percentiles(WORKER_RUN_METRIC)
+    return SystemStats(
+        accounts_total=sum(acc.values()),
+        accounts_free=acc.get(AccountStatus.FREE, 0),
+        accounts_assigned=acc.get(AccountStatus.ASSIGNED, 0),
+        accounts_disabled=acc.get(AccountStatus.DISABLED, 0),
+        accounts_needs_conversion=acc.get(AccountStatus.NEEDS_CONVERSION, 0),
+        issues_pending=iss.get(IssueStatus.PENDING, 0),
+        issues_approved=iss.get(IssueStatus.APPROVED, 0),
+        issues_rejected=iss.get(IssueStatus.REJECTED, 0),
+        issues_revoked=iss.get(IssueStatus.REVOKED, 0),
+        users_total=_users_total,
+        active_workers=workers.running,
+        workers_queued=workers.queued,
+        workers_completed=workers.completed,
+        workers_failed=workers.failed,
+        workers_expired=workers.expired,
+        workers_rejected=workers.rejected,
+        worker_run_p95_sec=round(worker_run["p95"] / 1000, 1) if worker_run else None,
+        conversions_running=conversions.running,
+        conversions_queued=conversions.queued,
+        reconciled_at=_reconciled_at,
+    )
+
+
+async def get_system_stats(
+    session: AsyncSession, force_refresh: bool = False
+) -> SystemStats:
+    """
+    Получить статистику системы.
+
+    Обычно отдаётся снимок из памяти; к БД обращаемся только при первом
+    вызове или при force_refresh.
+    """
+    if force_refresh or not _snapshot_ready:
+        await reconcile_stats(session)
+
+    stats = get_cached_stats()
     
     logger.debug(f"[stats] collected: accounts={stats.accounts_total}, workers={stats.active_workers}")
     
     return stats
 
 
+async def start_stats_reconciler(interval: int = None) -> None:
+    """Запустить фоновую сверку снимка с БД."""
+    global _reconcile_task
+
+    if _reconcile_task and not _reconcile_task.done():
+        return
+
+    interval = interval or settings.stats_reconcile_interval
+
+    async def reconciler():
+        while True:
+            try:
+                async with get_session() as session:
+                    await reconcile_stats(session)
+            except Exception as e:
+                logger.warning(f"[stats] reconcile failed: {e}")
+            await asyncio.sleep(interval)
+
+    _reconcile_task = asyncio.create_task(
+        reconciler(), name="background:stats_reconciler"
+    )
+    logger.info(f"[stats] Reconciler started (interval={interval}s)")
+
+
+async def stop_stats_reconciler() -> None:
+    """Остановить фоновую сверку."""
+    global _reconcile_task
+
+    if _reconcile_task:
+        _reconcile_task.cancel()
+        try:
+            await _reconcile_task
+        except asyncio.CancelledError:
+            pass
+        _reconcile_task = None
+        logger.info("[stats] Reconciler stopped")
+
+
 def format_stats_message(stats: SystemStats) -> str:
-    """Форматировать статистику для отправки."""
-    return (
+    """Форматировать статистику для отправки (кэшируется по значениям)."""
+    global _message_cache
+
+    key = astuple(stats)
+    if _message_cache and _message_cache[0] == key:
+        return _message_cache[1]
+
+    updated = (
+        f"\n\n🕒 Сверено с БД: {stats.reconciled_at:%H:%M:%S}"
+        if stats.reconciled_at
+        else ""
+    )
+    run_p95 = (
+        f", p95 работы {stats.worker_run_p95_sec} сек."
+        if stats.worker_run_p95_sec is not None
+        else ""
+    )
+    text = (
         f"📊 **Статистика системы**\n\n"
         f"**Аккаунты ({stats.accounts_total}):**\n"
         f"  🟢 Свободных: {stats.accounts_free}\n"
@@ -91,4 +305,13 @@ def format_stats_message(stats: SystemStats) -> str:
         f"**Прочее:**\n"
         f"  👥 Пользователей: {stats.users_total}\n"
         f"  ⚙️ Активных воркеров: {stats.active_workers}"
+        f" (в очереди: {stats.workers_queued})\n"
+        f"  📋 Воркеры: завершено {stats.workers_completed}, ошибок {stats.workers_failed}, "
+        f"истекло {stats.workers_expired}, отклонено {stats.workers_rejected}"
+        f"{run_p95}\n"
+        f"  🔄 Конвертаций tdata: {stats.conversions_running}"
+        f" (в очереди: {stats.conversions_queued})"
+        f"{updated}"
     )
+    _message_cache = (key, text)
+    return text
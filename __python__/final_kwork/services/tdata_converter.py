@@ -10,12 +10,13 @@ import asyncio
 import hashlib
 import logging
 import os
+import re
 import shutil
 import sqlite3
 import struct
 import uuid
-import zipfile
-from typing import Optional, Tuple, List
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple, List
 from io import BytesIO
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
@@ -29,15 +30,35 @@ from services.session_import_service import (
     TDATA_DIR,
     SESSIONS_DIR,
     MAX_FILE_SIZE,
+    ZipExtractError,
     ensure_directories,
+    extract_zip_members,
     validate_session,
     check_duplicate,
     get_api_credentials,
     find_api_json,
 )
 from services import proxy_service
+from services.conversion_pool import ConversionTimeoutError, get_conversion_pool
 from config import settings
 
+# Нативный AES-IGE (опционально, на порядки быстрее чистого Python)
+try:
+    import tgcrypto
+
+    TGCRYPTO_AVAILABLE = True
+except ImportError:
+    tgcrypto = None
+    TGCRYPTO_AVAILABLE = False
+
+try:
+    import cryptg
+
+    CRYPTG_AVAILABLE = True
+except ImportError:
+    cryptg = None
+    CRYPTG_AVAILABLE = False
+
 # opentele несовместим с Python 3.13
 OPENTELE_AVAILABLE = False
 
@@ -47,6 +68,34 @@ logger = logging.getLogger(__name__)
 SUPPORTED_ARCHIVES = (".zip",)
 
 
+# Кэши Telegram Desktop внутри tdata, не нужные ни для конвертации, ни для выдачи
+_TDATA_CACHE_DIRS = frozenset({"user_data", "emoji", "dumps", "tdummy", "temp", "webview"})
+# Кэш дополнительных аккаунтов: user_data#2, user_data#3, ...
+_TDATA_USER_DATA_RE = re.compile(r"user_data#\d+")
+
+
+def _is_tdata_cache_dir(part: str) -> bool:
+    part = part.lower()
+    return part in _TDATA_CACHE_DIRS or _TDATA_USER_DATA_RE.fullmatch(part) is not None
+
+
+def _is_tdata_member(name: str) -> bool:
+    """
+    Нужен ли член архива при импорте tdata.
+
+    Распаковывается всё, кроме кэшей медиа/эмодзи/дампов — они составляют
+    основной объём архива и не участвуют ни в конвертации, ни в выдаче tdata.
+    Кэшем считаются только каталоги с точным именем внутри папки tdata
+    (или в корне архива, если tdata упакована без папки), поэтому обёртки
+    вроде temp_acc/tdata/... распаковываются.
+    """
+    parts = name.split("/")[:-1]
+    lowered = [part.lower() for part in parts]
+    if "tdata" in lowered:
+        parts = parts[len(lowered) - lowered[::-1].index("tdata"):]
+    return not any(_is_tdata_cache_dir(part) for part in parts)
+
+
 def _find_tdata_folder(extract_dir: str) -> Optional[str]:
     """Найти папку tdata в распакованном архиве."""
     # Ищем папку tdata внутри
@@ -116,27 +165,40 @@ def _prepare_aes_oldmtp(
 def _aes_ige_decrypt(data: bytes, key: bytes, iv: bytes) -> bytes:
     """
     Расшифровка AES-256-IGE.
+
+    Использует tgcrypto/cryptg, если установлены. Иначе — ECB из cryptography
+    поблочно: IGE по своей природе последовательный (вход каждого блока зависит
+    от предыдущего открытого текста), поэтому XOR делается над 128-битными int,
+    а результат пишется в заранее выделенный bytearray — без квадратичного
+    копирования.
     """
     if len(data) % 16 != 0:
         raise ValueError("Data length must be multiple of 16")
 
+    if TGCRYPTO_AVAILABLE:
+        return tgcrypto.ige256_decrypt(data, key, iv)
+    if CRYPTG_AVAILABLE:
+        return cryptg.decrypt_ige(data, key, iv)
+
     cipher = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend())
     decryptor = cipher.decryptor()
 
-    result = b""
-    iv1 = iv[:16]
-    iv2 = iv[16:]
+    src = memoryview(data)
+    result = bytearray(len(data))
+    from_bytes = int.from_bytes
+
+    iv1 = from_bytes(iv[:16], "big")
+    iv2 = from_bytes(iv[16:32], "big")
 
     for i in range(0, len(data), 16):
-        block = data[i : i + 16]
-        xored = bytes(a ^ b for a, b in zip(block, iv2))
-        decrypted_block = decryptor.update(xored)
-        plain = bytes(a ^ b for a, b in zip(decrypted_block, iv1))
-        result += plain
+        block = from_bytes(src[i : i + 16], "big")
+        decrypted_block = decryptor.update((block ^ iv2).to_bytes(16, "big"))
+        plain = from_bytes(decrypted_block, "big") ^ iv1
+        result[i : i + 16] = plain.to_bytes(16, "big")
         iv1 = block
         iv2 = plain
 
-    return result
+    return bytes(result)
 
 
 def _decrypt_local(encrypted_data: bytes, local_key: bytes) -> Optional[bytes]:
@@ -176,7 +238,76 @@ def _decrypt_local(encrypted_data: bytes, local_key: bytes) -> Optional[bytes]:
         return None
 
 
-def _read_key_datas(tdata_path: str) -> Optional[Tuple[bytes, bytes, bytes]]:
+# Маркер "ещё не вычислено" (None — валидный результат)
+_UNSET = object()
+
+
+class TdataReader:
+    """
+    Разобранная папка tdata.
+
+    Каждый файл читается с диска не более одного раза, key_datas парсится
+    и local_key выводится (PBKDF2) тоже один раз — все стратегии
+    конвертации в _sync_convert_tdata работают с одним экземпляром.
+    Пути внутри — относительные от корня tdata.
+    """
+
+    def __init__(self, tdata_path: str):
+        self.path = tdata_path
+        self._entries: Dict[str, List[Tuple[str, bool]]] = {}
+        self._files: Dict[str, Optional[bytes]] = {}
+        self._key_datas = _UNSET
+        self._local_key = _UNSET
+
+    def _scan(self, rel: str) -> List[Tuple[str, bool]]:
+        if rel not in self._entries:
+            try:
+                with os.scandir(os.path.join(self.path, rel)) as it:
+                    self._entries[rel] = [(e.name, e.is_dir()) for e in it]
+            except OSError as e:
+                logger.debug(f"Cannot list {rel or self.path}: {e}")
+                self._entries[rel] = []
+        return self._entries[rel]
+
+    def listdir(self, rel: str = "") -> List[str]:
+        """Имена в папке (кэшируется)."""
+        return [name for name, _ in self._scan(rel)]
+
+    def subdirs(self, rel: str = "") -> List[str]:
+        """Подпапки (относительные пути)."""
+        return [os.path.join(rel, name) for name, is_dir in self._scan(rel) if is_dir]
+
+    def files(self, rel: str = "") -> List[str]:
+        """Имена файлов в папке."""
+        return [name for name, is_dir in self._scan(rel) if not is_dir]
+
+    def read(self, rel: str) -> Optional[bytes]:
+        """Содержимое файла (читается один раз)."""
+        if rel not in self._files:
+            try:
+                with open(os.path.join(self.path, rel), "rb") as f:
+                    self._files[rel] = f.read()
+            except OSError as e:
+                logger.debug(f"Error reading {rel}: {e}")
+                self._files[rel] = None
+        return self._files[rel]
+
+    @property
+    def key_datas(self) -> Optional[Tuple[bytes, bytes, bytes]]:
+        """(salt, encrypted, passcode_key) из key_datas или None."""
+        if self._key_datas is _UNSET:
+            self._key_datas = _read_key_datas(self)
+        return self._key_datas
+
+    @property
+    def local_key(self) -> Optional[bytes]:
+        """Расшифрованный local_key (256 bytes) или None."""
+        if self._local_key is _UNSET:
+            self._local_key = _extract_local_key(self)
+        return self._local_key
+
+
+def _read_key_datas(reader: TdataReader) -> Optional[Tuple[bytes, bytes, bytes]]:
     """
     Читает и парсит файл key_datas.
 
@@ -189,15 +320,14 @@ def _read_key_datas(tdata_path: str) -> Optional[Tuple[bytes, bytes, bytes]]:
     Returns:
         (salt, encrypted_data, passcode_key) или None
     """
-    key_datas_path = os.path.join(tdata_path, "key_datas")
+    if "key_datas" not in reader.files():
+        return None
 
-    if not os.path.exists(key_datas_path):
+    data = reader.read("key_datas")
+    if not data:
         return None
 
     try:
-        with open(key_datas_path, "rb") as f:
-            data = f.read()
-
         if len(data) < 16:
             return None
 
@@ -230,14 +360,14 @@ def _read_key_datas(tdata_path: str) -> Optional[Tuple[bytes, bytes, bytes]]:
         return None
 
 
-def _extract_local_key(tdata_path: str) -> Optional[bytes]:
+def _extract_local_key(reader: TdataReader) -> Optional[bytes]:
     """
     Извлекает local_key из key_datas.
 
     Returns:
         local_key (256 bytes) или None
     """
-    result = _read_key_datas(tdata_path)
+    result = reader.key_datas
     if not result:
         return None
 
@@ -254,34 +384,27 @@ def _extract_local_key(tdata_path: str) -> Optional[bytes]:
     return local_key
 
 
-def _find_account_file(tdata_path: str) -> Optional[str]:
+def _find_account_file(reader: TdataReader) -> Optional[str]:
     """
     Находит файл аккаунта (D877F783D5D3EF8Cs или подобный).
     """
-    for item in os.listdir(tdata_path):
+    for item in reader.files():
         # Файл аккаунта заканчивается на 's' и начинается с D877F783
-        if (
-            item.startswith("D877F783")
-            and item.endswith("s")
-            and not os.path.isdir(os.path.join(tdata_path, item))
-        ):
-            return os.path.join(tdata_path, item)
+        if item.startswith("D877F783") and item.endswith("s"):
+            return item
     return None
 
 
 def _extract_auth_key_from_account(
-    account_file: str, local_key: bytes
+    data: bytes, local_key: bytes
 ) -> Optional[Tuple[bytes, int, int]]:
     """
-    Извлекает auth_key из файла аккаунта.
+    Извлекает auth_key из содержимого файла аккаунта.
 
     Returns:
         (auth_key, dc_id, user_id) или None
     """
     try:
-        with open(account_file, "rb") as f:
-            data = f.read()
-
         if len(data) < 16 or data[:4] != b"TDF$":
             logger.debug(f"Invalid account file format")
             return None
@@ -356,19 +479,12 @@ def _extract_auth_key_from_account(
         return None
 
 
-def _find_account_folders(tdata_path: str) -> List[str]:
-    """Находит папки аккаунтов в tdata."""
-    accounts = []
+def _find_account_folders(reader: TdataReader) -> List[str]:
+    """Находит папки аккаунтов в tdata (относительные пути)."""
+    return [d for d in reader.subdirs() if os.path.basename(d).startswith("D877F783")]
 
-    for item in os.listdir(tdata_path):
-        item_path = os.path.join(tdata_path, item)
-        if os.path.isdir(item_path) and item.startswith("D877F783"):
-            accounts.append(item_path)
 
-    return accounts
-
-
-def _read_auth_key_from_key_datas(tdata_path: str) -> Optional[Tuple[bytes, int]]:
+def _read_auth_key_from_key_datas(reader: TdataReader) -> Optional[Tuple[bytes, int]]:
     """
     Читает auth_key из современного формата TDesktop с расшифровкой.
 
@@ -383,24 +499,28 @@ def _read_auth_key_from_key_datas(tdata_path: str) -> Optional[Tuple[bytes, int]
     Returns:
         (auth_key, dc_id) или None
     """
-    logger.info(f"Decrypting tdata from: {tdata_path}")
+    logger.info(f"Decrypting tdata from: {reader.path}")
 
     # 1. Извлекаем local_key из key_datas
-    local_key = _extract_local_key(tdata_path)
+    local_key = reader.local_key
     if not local_key:
         logger.warning("Could not extract local_key from key_datas")
         return None
 
     # 2. Находим файл аккаунта
-    account_file = _find_account_file(tdata_path)
+    account_file = _find_account_file(reader)
     if not account_file:
         logger.warning("Account file not found in tdata")
         return None
 
     logger.info(f"Found account file: {account_file}")
 
+    data = reader.read(account_file)
+    if not data:
+        return None
+
     # 3. Извлекаем auth_key
-    result = _extract_auth_key_from_account(account_file, local_key)
+    result = _extract_auth_key_from_account(data, local_key)
     if not result:
         logger.warning("Could not extract auth_key from account file")
         return None
@@ -411,7 +531,9 @@ def _read_auth_key_from_key_datas(tdata_path: str) -> Optional[Tuple[bytes, int]
     return (auth_key, dc_id)
 
 
-def _read_auth_key_from_folder(account_folder: str) -> Optional[Tuple[bytes, int]]:
+def _read_auth_key_from_folder(
+    reader: TdataReader, account_folder: str = ""
+) -> Optional[Tuple[bytes, int]]:
     """
     Читает auth_key из папки аккаунта.
 
@@ -420,28 +542,25 @@ def _read_auth_key_from_folder(account_folder: str) -> Optional[Tuple[bytes, int
     Returns:
         (auth_key, dc_id) или None
     """
-    logger.info(f"Searching auth_key in: {account_folder}")
+    logger.info(f"Searching auth_key in: {account_folder or reader.path}")
 
-    for f in os.listdir(account_folder):
+    for f in reader.files(account_folder):
         # Файлы DC1, DC2 и т.д. (без s на конце - это ключи)
         if f.startswith("DC") and len(f) <= 4 and not f.endswith("s"):
-            dc_file = os.path.join(account_folder, f)
-            try:
-                with open(dc_file, "rb") as file:
-                    data = file.read()
-                    logger.debug(f"Reading {dc_file}, size: {len(data)}")
+            data = reader.read(os.path.join(account_folder, f))
+            if data is None:
+                continue
+            logger.debug(f"Reading {f}, size: {len(data)}")
 
-                    if len(data) >= 260:
-                        # auth_key = 256 байт, первые 4 байта - заголовок/версия
-                        auth_key = data[4:260]
-                        dc_id = int(f[2:]) if f[2:].isdigit() else 2
+            if len(data) >= 260:
+                # auth_key = 256 байт, первые 4 байта - заголовок/версия
+                auth_key = data[4:260]
+                dc_id = int(f[2:]) if f[2:].isdigit() else 2
 
-                        logger.info(
-                            f"Found auth_key in {f}, DC: {dc_id}, key_len: {len(auth_key)}"
-                        )
-                        return (auth_key, dc_id)
-            except Exception as e:
-                logger.debug(f"Error reading {dc_file}: {e}")
+                logger.info(
+                    f"Found auth_key in {f}, DC: {dc_id}, key_len: {len(auth_key)}"
+                )
+                return (auth_key, dc_id)
 
     return None
 
@@ -600,6 +719,8 @@ def _sync_convert_tdata(tdata_path: str, output_session_path: str) -> Tuple[bool
     Синхронная конвертация tdata в session.
 
     Сначала пробует opentele, затем ручной парсинг.
+    Ручные стратегии используют общий TdataReader: файлы и local_key
+    не читаются/не выводятся повторно при переходе к следующей стратегии.
     """
     logger.info(f"Converting tdata: {tdata_path}")
 
@@ -610,28 +731,29 @@ def _sync_convert_tdata(tdata_path: str, output_session_path: str) -> Tuple[bool
             return True, msg
         logger.warning(f"opentele failed: {msg}, trying manual parsing...")
 
+    reader = TdataReader(tdata_path)
+
     # 2. Fallback: пробуем современный формат key_datas
-    result = _read_auth_key_from_key_datas(tdata_path)
+    result = _read_auth_key_from_key_datas(reader)
     if result:
         auth_key, dc_id = result
         if _create_telethon_session(output_session_path, auth_key, dc_id):
             return True, "Конвертация успешна (из key_datas)"
 
     # 3. Ищем папки аккаунтов
-    account_folders = _find_account_folders(tdata_path)
+    account_folders = _find_account_folders(reader)
 
     if not account_folders:
         logger.warning(f"No account folders (D877F783*) found in {tdata_path}")
 
         # Может быть в root есть файлы DC*?
-        for f in os.listdir(tdata_path):
-            if f.startswith("DC") and len(f) <= 4:
-                # Пробуем как root-level аккаунт
-                result = _read_auth_key_from_folder(tdata_path)
-                if result:
-                    auth_key, dc_id = result
-                    if _create_telethon_session(output_session_path, auth_key, dc_id):
-                        return True, "Конвертация успешна"
+        if any(f.startswith("DC") and len(f) <= 4 for f in reader.files()):
+            # Пробуем как root-level аккаунт
+            result = _read_auth_key_from_folder(reader)
+            if result:
+                auth_key, dc_id = result
+                if _create_telethon_session(output_session_path, auth_key, dc_id):
+                    return True, "Конвертация успешна"
 
         return False, "Не найдены папки аккаунтов (D877F783*) или файлы DC*"
 
@@ -640,16 +762,14 @@ def _sync_convert_tdata(tdata_path: str, output_session_path: str) -> Tuple[bool
     logger.info(f"Processing account folder: {account_folder}")
 
     # Читаем auth_key
-    result = _read_auth_key_from_folder(account_folder)
+    result = _read_auth_key_from_folder(reader, account_folder)
 
     if not result:
         # Пробуем в подпапках (D877F783D5D3EF8C0 и т.д.)
-        for subfolder in os.listdir(account_folder):
-            subfolder_path = os.path.join(account_folder, subfolder)
-            if os.path.isdir(subfolder_path):
-                result = _read_auth_key_from_folder(subfolder_path)
-                if result:
-                    break
+        for subfolder in reader.subdirs(account_folder):
+            result = _read_auth_key_from_folder(reader, subfolder)
+            if result:
+                break
 
     if not result:
         return False, (
@@ -698,11 +818,17 @@ async def convert_tdata_to_session(
 
     temp_session_path = os.path.join(output_dir, "converted.session")
 
-    # Запускаем синхронную конвертацию в executor
-    loop = asyncio.get_event_loop()
-    success, message = await loop.run_in_executor(
-        None, _sync_convert_tdata, tdata_path, temp_session_path
-    )
+    # Запускаем синхронную конвертацию в отдельном процессе
+    try:
+        success, message = await get_conversion_pool().run(
+            _sync_convert_tdata, tdata_path, temp_session_path
+        )
+    except ConversionTimeoutError as e:
+        logger.warning(f"tdata conversion timed out: {tdata_path}")
+        success, message = False, str(e)
+    except BrokenProcessPool:
+        logger.warning(f"tdata conversion process crashed: {tdata_path}")
+        success, message = False, "Процесс конвертации аварийно завершился"
 
     if success and os.path.exists(temp_session_path):
         return True, message, temp_session_path
@@ -748,28 +874,26 @@ async def import_tdata_archive(
         )
 
     temp_id = str(uuid.uuid4())
-    archive_path = os.path.join(INBOX_DIR, f"{temp_id}{ext}")
     extract_dir = os.path.join(TDATA_DIR, temp_id)
 
     try:
-        # Сохраняем архив
-        with open(archive_path, "wb") as f:
-            f.write(file_data)
-
-        logger.info(f"Archive saved: {archive_path}")
-
-        # Распаковываем
-        os.makedirs(extract_dir, exist_ok=True)
-
-        with zipfile.ZipFile(archive_path, "r") as zf:
-            zf.extractall(extract_dir)
+        logger.info(f"Archive received: {original_filename}, size: {len(file_data)} bytes")
+
+        # Распаковываем только файлы, нужные для конвертации (без кэшей медиа),
+        # архив целиком на диск не пишется
+        await asyncio.to_thread(
+            extract_zip_members,
+            file_data,
+            extract_dir,
+            _is_tdata_member,
+            MAX_FILE_SIZE * 10,
+        )
 
         # Ищем папку tdata
         tdata_path = _find_tdata_folder(extract_dir)
 
         if not tdata_path:
             shutil.rmtree(extract_dir, ignore_errors=True)
-            os.remove(archive_path)
             return (
                 False,
                 (
@@ -783,9 +907,6 @@ async def import_tdata_archive(
 
         logger.info(f"tdata found: {tdata_path}")
 
-        # Удаляем архив
-        os.remove(archive_path)
-
         # Пробуем конвертировать
         convert_success, convert_msg, session_path = await convert_tdata_to_session(
             tdata_path
@@ -1033,14 +1154,13 @@ async def import_tdata_archive(
                 account,
             )
 
-    except zipfile.BadZipFile:
-        return False, "❌ Повреждённый ZIP архив", None
+    except ZipExtractError as e:
+        shutil.rmtree(extract_dir, ignore_errors=True)
+        return False, f"❌ {e}", None
 
     except Exception as e:
         logger.exception(f"Import tdata error: {e}")
         # Очистка при ошибке
-        if os.path.exists(archive_path):
-            os.remove(archive_path)
         if os.path.exists(extract_dir):
             shutil.rmtree(extract_dir, ignore_errors=True)
         return False, f"❌ Ошибка импорта: {e}", None
@@ -6,12 +6,14 @@
 - Graceful retry при сетевых ошибках
 - Автоматическую смену прокси при неудачах
 - Backoff-алгоритм для повторных попыток
+- Ограничение числа одновременных воркеров и общий дедлайн
+  (services/worker_supervisor.py)
 """
 import asyncio
 import logging
 import re
 from dataclasses import dataclass
-from typing import Awaitable, Callable, Dict, Optional
+from typing import Awaitable, Callable, Optional
 
 from services.telethon_adapter import TelegramClient, events
 from telethon.tl.functions.auth import ResetAuthorizationsRequest
@@ -25,6 +27,8 @@ from telethon.errors import (
 )
 
 from config import settings
+from services.notification_service import get_notification_dispatcher
+from services.worker_supervisor import get_worker_supervisor
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +39,6 @@ ErrorCallback = Callable[[int, int, str], Awaitable[None]]
 # on_connected(account_id, manager_tg_id, phone, username, is_premium)
 ConnectedCallback = Callable[[int, int, Optional[str], Optional[str], bool], Awaitable[None]]
 
-# Активные воркеры: account_id -> task
-_active_workers: Dict[int, asyncio.Task] = {}
-
 # Regex для поиска кода (5-6 цифр)
 CODE_PATTERN = re.compile(r"\b(\d{5,6})\b")
 
@@ -80,13 +81,13 @@ class WorkerStatus:
 
 
 def get_active_workers_count() -> int:
-    """Количество активных воркеров."""
-    return len(_active_workers)
+    """Количество активных воркеров (в работе и в очереди)."""
+    return get_worker_supervisor().active_count()
 
 
 def get_active_worker_ids() -> list[int]:
     """ID аккаунтов с активными воркерами."""
-    return list(_active_workers.keys())
+    return get_worker_supervisor().active_keys()
 
 
 async def stop_code_listener(account_id: int) -> bool:
@@ -96,20 +97,11 @@ async def stop_code_listener(account_id: int) -> bool:
     Returns:
         True если воркер был остановлен, False если не найден.
     """
-    task = _active_workers.pop(account_id, None)
-    if not task:
+    # Ошибки воркера наружу не пробрасываются (иначе могут откатиться
+    # транзакции revoke/approve) — их глотает супервизор
+    if not await get_worker_supervisor().cancel(account_id):
         return False
 
-    task.cancel()
-
-    try:
-        await task
-    except asyncio.CancelledError:
-        pass
-    except Exception as e:
-        # Важно: не пробрасываем ошибки воркера наружу (иначе могут откатиться транзакции revoke/approve)
-        logger.warning(f"[worker] stop_code_listener got exception for account_id={account_id}: {e}")
-
     logger.info(f"[worker] stopped for account_id={account_id}")
     return True
 
@@ -245,10 +237,7 @@ async def stop_all_workers() -> int:
     Returns:
         Количество остановленных воркеров.
     """
-    count = len(_active_workers)
-    
-    for account_id in list(_active_workers.keys()):
-        await stop_code_listener(account_id)
+    count = await get_worker_supervisor().stop_all()
     
     logger.info(f"[worker] stopped all {count} workers")
     return count
@@ -278,6 +267,10 @@ async def start_code_listener(
     """
     Запустить слушатель для перехвата кода подтверждения.
     
+    Слушатель ставится в очередь супервизора: запускается, когда есть
+    свободный слот (WORKER_MAX_CONCURRENCY), и должен уложиться в общий
+    дедлайн WORKER_DEADLINE с момента постановки (иначе — on_timeout).
+    
     Включает:
     - Retry при сетевых ошибках с backoff
     - Автоматическую смену прокси при неудачах
@@ -304,7 +297,7 @@ async def start_code_listener(
         system_lang_code: System language code
     
     Returns:
-        True если воркер запущен успешно.
+        True если воркер поставлен в очередь.
     """
     import os
     
@@ -348,10 +341,11 @@ async def start_code_listener(
         return False
     
     # Отменяем предыдущий воркер если есть
-    if account_id in _active_workers:
+    supervisor = get_worker_supervisor()
+    if supervisor.is_active(account_id):
         await stop_code_listener(account_id)
     
-    async def worker():
+    async def worker(deadline: float):
         client: Optional[TelegramClient] = None
         code_found = asyncio.Event()
         found_code: Optional[str] = None
@@ -495,12 +489,16 @@ async def start_code_listener(
                     from db.session import get_session
                     from db.models import Account, AccountStatus
                     from sqlalchemy import select
+                    from services import stats_service
                     
                     async with get_session() as db_session:
                         stmt = select(Account).where(Account.id == account_id)
                         result = await db_session.execute(stmt)
                         account = result.scalar_one_or_none()
                         if account:
+                            stats_service.record_account_transition(
+                                db_session, account.status, AccountStatus.DISABLED
+                            )
                             account.status = AccountStatus.DISABLED
                             account.error_text = error_text
                             await db_session.commit()
@@ -629,22 +627,24 @@ async def start_code_listener(
             except Exception as e:
                 logger.warning(f"[worker] failed to get/update user info: {e}")
             
+            # Ожидание кода — не дольше CODE_WAIT_TIMEOUT и общего дедлайна воркера.
+            # Супервизор отменяет воркер только через CLEANUP_GRACE после дедлайна,
+            # так что on_timeout и disconnect ниже успевают отработать (и один раз)
+            loop = asyncio.get_running_loop()
+            deadline = min(deadline, loop.time() + settings.code_wait_timeout)
+
             # Уведомляем менеджера
-            try:
-                await bot_client.send_message(
-                    manager_tg_id,
-                    f"⏳ Ожидаю код подтверждения...\n"
-                    f"Таймаут: {settings.code_wait_timeout} сек.\n\n"
-                    f"💡 Если код придёт по SMS, сообщите администратору."
-                )
-            except Exception as e:
-                logger.warning(f"[worker] failed to notify manager: {e}")
+            # Через очередь уведомлений — после «Аккаунт выдан», в порядке отправки
+            get_notification_dispatcher().notify(
+                manager_tg_id,
+                f"⏳ Ожидаю код подтверждения...\n"
+                f"Таймаут: {max(0, int(deadline - loop.time()))} сек.\n\n"
+                f"💡 Если код придёт по SMS, сообщите администратору."
+            )
             
             # Ждём коды с таймаутом. В отличие от «одного кода», тут можем поймать
             # несколько кодов подряд (если менеджер повторно инициирует вход).
             # Это убирает необходимость «отзывать и выдавать заново».
-            loop = asyncio.get_running_loop()
-            deadline = loop.time() + settings.code_wait_timeout
             last_sent: Optional[str] = None
 
             try:
@@ -722,14 +722,13 @@ async def start_code_listener(
                 except Exception as e:
                     logger.debug(f"[worker] disconnect error (ignored): {e}")
             
-            _active_workers.pop(account_id, None)
             logger.info(f"[worker] finished for account_id={account_id}")
     
-    # Создаём задачу с обработкой исключений
-    async def safe_worker():
+    # Обёртка: менеджер узнаёт о необработанной ошибке, супервизор учитывает её как failed
+    async def safe_worker(deadline: float):
         """Обёртка для перехвата необработанных исключений."""
         try:
-            await worker()
+            await worker(deadline)
         except asyncio.CancelledError:
             raise
         except Exception as e:
@@ -738,21 +737,15 @@ async def start_code_listener(
                 await on_error(account_id, manager_tg_id, f"Критическая ошибка: {e}")
             except Exception:
                 pass
+            raise
     
-    task = asyncio.create_task(safe_worker())
-    
-    # Добавляем callback для логирования необработанных исключений
-    def task_done_callback(t: asyncio.Task):
-        try:
-            exc = t.exception()
-            if exc and not isinstance(exc, asyncio.CancelledError):
-                logger.error(f"[worker] task exception for account_id={account_id}: {exc}")
-        except asyncio.CancelledError:
-            pass
-        except asyncio.InvalidStateError:
-            pass
+    async def on_expired():
+        await on_timeout(account_id, manager_tg_id)
     
-    task.add_done_callback(task_done_callback)
-    _active_workers[account_id] = task
+    if not supervisor.submit(account_id, safe_worker, on_expired=on_expired):
+        await on_error(
+            account_id, manager_tg_id, "Слишком много активных подключений, попробуйте позже"
+        )
+        return False
     
     return True
@@ -0,0 +1,225 @@
+"""
+Кэш пользователей бота по tg_id (в памяти процесса).
+
+Хранит неизменяемые снимки User (id, tg_id, username, full_name, role),
+чтобы handlers, которым нужны только идентичность и роль, не ходили в БД.
+
+- LRU с ограничением размера (USER_CACHE_SIZE) и TTL записи (USER_CACHE_TTL)
+- Write-through: любые INSERT/UPDATE/DELETE User через ORM после commit
+  обновляют кэш (хуки сессии), после rollback — ничего не меняется
+- Счётчики hit/miss/evictions (команда /perf)
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import chain
+from typing import Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from config import settings
+from db.models import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# Ключи в session.info: изменённые User и tg_id, которые нужно забыть
+_CHANGED_KEY = "user_cache_changed"
+_FORGET_KEY = "user_cache_forget"
+
+_SNAPSHOT_FIELDS = ("id", "tg_id", "username", "full_name", "role")
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Снимок пользователя."""
+
+    id: int
+    tg_id: int
+    username: Optional[str]
+    full_name: Optional[str]
+    role: UserRole
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == UserRole.ADMIN
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(
+            id=user.id,
+            tg_id=user.tg_id,
+            username=user.username,
+            full_name=user.full_name,
+            role=user.role,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "tg_id": self.tg_id,
+            "username": self.username,
+            "full_name": self.full_name,
+            "role": self.role.value,
+        }
+
+
+@dataclass
+class UserCacheStats:
+    """Счётчики кэша."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": self.size,
+        }
+
+
+class UserCache:
+    """LRU/TTL кэш CachedUser по tg_id."""
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_size = max_size or settings.user_cache_size
+        self.ttl = settings.user_cache_ttl if ttl is None else ttl
+        # tg_id -> (время записи, снимок)
+        self._items: "OrderedDict[int, Tuple[float, CachedUser]]" = OrderedDict()
+        self._stats = UserCacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, tg_id: int) -> Optional[CachedUser]:
+        """Снимок пользователя или None (нет, истёк или кэш выключен)."""
+        with self._lock:
+            item = self._items.get(tg_id)
+            if item is None or time.monotonic() - item[0] >= self.ttl:
+                if item is not None:
+                    del self._items[tg_id]
+                self._stats.misses += 1
+                return None
+            self._items.move_to_end(tg_id)
+            self._stats.hits += 1
+            return item[1]
+
+    def put(self, user: CachedUser) -> None:
+        """Записать снимок (вытесняет самые давно использованные)."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._items[user.tg_id] = (time.monotonic(), user)
+            self._items.move_to_end(user.tg_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self._stats.evictions += 1
+
+    def invalidate(self, tg_id: int) -> None:
+        """Забыть пользователя."""
+        with self._lock:
+            if self._items.pop(tg_id, None) is not None:
+                self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def get_stats(self) -> UserCacheStats:
+        with self._lock:
+            self._stats.size = len(self._items)
+            return UserCacheStats(**self._stats.__dict__)
+
+
+# Глобальный экземпляр
+_cache: Optional[UserCache] = None
+
+
+def get_user_cache() -> UserCache:
+    """Получить кэш пользователей."""
+    global _cache
+    if _cache is None:
+        _cache = UserCache()
+    return _cache
+
+
+def remember(session: Session, user: User) -> CachedUser:
+    """
+    Запомнить пользователя, прочитанного из БД в session.
+
+    Если он создан или изменён в текущей транзакции, в кэш он попадёт
+    только после commit (хуки ниже); иначе — сразу.
+    """
+    snapshot = CachedUser.from_user(user)
+    if not any(obj is user for obj in session.info.get(_CHANGED_KEY, ())):
+        get_user_cache().put(snapshot)
+    return snapshot
+
+
+def format_user_cache_stats() -> str:
+    """Строка со счётчиками кэша (для /perf)."""
+    stats = get_user_cache().get_stats()
+    return (
+        f"**Кэш пользователей:** hit {stats.hits} / miss {stats.misses} "
+        f"({stats.hit_rate:.0%}), записей {stats.size}, вытеснено {stats.evictions}"
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _on_before_flush(session: Session, flush_context, instances) -> None:
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, User):
+            session.info.setdefault(_CHANGED_KEY, []).append(obj)
+            # tg_id изменился — старый ключ больше не валиден
+            for old in inspect(obj).attrs.tg_id.history.deleted:
+                if old is not None:
+                    session.info.setdefault(_FORGET_KEY, []).append(old)
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            tg_id = inspect(obj).dict.get("tg_id")
+            if tg_id is not None:
+                session.info.setdefault(_FORGET_KEY, []).append(tg_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _on_after_commit(session: Session) -> None:
+    changed = session.info.pop(_CHANGED_KEY, None)
+    forget = session.info.pop(_FORGET_KEY, None)
+    if not changed and not forget:
+        return
+
+    cache = get_user_cache()
+    for tg_id in forget or ():
+        cache.invalidate(tg_id)
+    for user in changed or ():
+        # Только из уже загруженных атрибутов: истёкшие не грузим из БД
+        state = inspect(user)
+        values = state.dict
+        tg_id = values.get("tg_id")
+        if tg_id is None:
+            continue
+        if state.was_deleted or any(values.get(f) is None for f in ("id", "role")):
+            cache.invalidate(tg_id)
+            continue
+        if all(f in values for f in _SNAPSHOT_FIELDS):
+            cache.put(CachedUser.from_user(user))
+        else:
+            cache.invalidate(tg_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_FORGET_KEY, None)
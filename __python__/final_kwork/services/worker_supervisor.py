@@ -0,0 +1,323 @@
+"""
+Супервизор фоновых воркеров (перехват кодов Telethon).
+
+Особенности:
+- Не больше WORKER_MAX_CONCURRENCY одновременно работающих воркеров
+  (каждый держит подключение Telegram и сессии БД)
+- Остальные ждут в FIFO-очереди (не длиннее WORKER_QUEUE_SIZE)
+- Общий дедлайн на ожидание в очереди и работу (WORKER_DEADLINE секунд
+  от постановки); воркер получает его и сам укладывает в него свои таймауты,
+  а принудительно супервизор отменяет его только через CLEANUP_GRACE после
+  дедлайна — чтобы не прервать собственную обработку таймаута воркером
+- Счётчики исходов и замеры ожидания/работы для статистики и /perf
+- Отмена одного воркера по ключу и массовая остановка при завершении бота
+"""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from config import settings
+from utils.instrumentation import WORKER_RUN_METRIC, WORKER_WAIT_METRIC, percentiles, record
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд после дедлайна воркер может завершаться сам
+# (свой on_timeout, disconnect), прежде чем супервизор его отменит
+CLEANUP_GRACE = 10.0
+
+# Воркер получает дедлайн (время event loop, loop.time())
+WorkerFactory = Callable[[float], Awaitable[None]]
+# Вызывается, если воркер не уложился в дедлайн (в очереди или во время работы)
+ExpiredCallback = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class WorkerSupervisorStats:
+    """Статистика супервизора."""
+
+    max_workers: int = 0
+    running: int = 0
+    queued: int = 0
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    expired: int = 0
+    rejected: int = 0  # Очередь переполнена или идёт остановка
+
+    def to_dict(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "running": self.running,
+            "queued": self.queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+            "rejected": self.rejected,
+            "wait_ms": percentiles(WORKER_WAIT_METRIC),
+            "run_ms": percentiles(WORKER_RUN_METRIC),
+        }
+
+
+class WorkerSupervisor:
+    """
+    Ограниченный пул воркеров с очередью допуска.
+
+    Использование:
+        supervisor = get_worker_supervisor()
+        supervisor.submit(account_id, lambda deadline: worker(deadline))
+        await supervisor.cancel(account_id)
+        await supervisor.stop_all()
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or settings.worker_max_concurrency
+        self.queue_size = settings.worker_queue_size if queue_size is None else queue_size
+        self.deadline = deadline or settings.worker_deadline
+
+        self._stats = WorkerSupervisorStats(max_workers=self.max_workers)
+        self._free = self.max_workers
+        # Ожидающие допуска, в порядке постановки
+        self._waiters: Deque[asyncio.Future] = deque()
+        # key -> задача воркера (в очереди или работает)
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._stopping = False
+
+    # === Слоты ===
+
+    async def _admit(self, deadline: float) -> bool:
+        """
+        Дождаться слота (FIFO).
+
+        Returns:
+            False, если дедлайн истёк раньше, чем подошла очередь
+        """
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return True
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=max(0.0, deadline - loop.time()))
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+        if waiter.done():
+            return True
+        self._abandon(waiter)
+        return False
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        """Уйти из очереди (если слот уже передан — отдать его следующему)."""
+        if waiter.done() and not waiter.cancelled():
+            self._release()
+            return
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self) -> None:
+        """Освободить слот (передать первому в очереди)."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+    # === Воркеры ===
+
+    def submit(
+        self,
+        key: int,
+        factory: WorkerFactory,
+        on_expired: Optional[ExpiredCallback] = None,
+    ) -> bool:
+        """
+        Поставить воркер в очередь.
+
+        Предыдущий воркер с тем же key должен быть остановлен заранее
+        (cancel); если он ещё есть, он отменяется без ожидания.
+
+        Returns:
+            False, если очередь переполнена или идёт остановка
+        """
+        stats = self._stats
+        if self._stopping or stats.running + stats.queued >= self.max_workers + self.queue_size:
+            stats.rejected += 1
+            logger.warning(
+                f"[supervisor] rejected worker {key}: "
+                f"running={stats.running}, queued={stats.queued}"
+            )
+            return False
+
+        previous = self._tasks.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        stats.submitted += 1
+        stats.queued += 1
+        self._tasks[key] = asyncio.create_task(
+            self._run(key, factory, deadline, on_expired), name=f"supervisor:{key}"
+        )
+        return True
+
+    async def _run(
+        self,
+        key: int,
+        factory: WorkerFactory,
+        deadline: float,
+        on_expired: Optional[ExpiredCallback],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        stats = self._stats
+        submitted_at = loop.time()
+        started_at: Optional[float] = None
+        try:
+            try:
+                admitted = await self._admit(deadline)
+            finally:
+                stats.queued -= 1
+
+            if not admitted:
+                stats.expired += 1
+                logger.warning(f"[supervisor] worker {key} missed its deadline in queue")
+                await self._expired(key, on_expired)
+                return
+
+            started_at = loop.time()
+            stats.running += 1
+            record(WORKER_WAIT_METRIC, (started_at - submitted_at) * 1000)
+
+            work = asyncio.create_task(factory(deadline), name=f"worker:{key}")
+            try:
+                await asyncio.wait(
+                    (work,), timeout=max(0.0, deadline + CLEANUP_GRACE - loop.time())
+                )
+            finally:
+                missed = not work.done()
+                if missed:
+                    work.cancel()
+                    await asyncio.gather(work, return_exceptions=True)
+
+            if missed:
+                stats.expired += 1
+                logger.warning(f"[supervisor] worker {key} missed its deadline while running")
+                await self._expired(key, on_expired)
+                return
+
+            work.result()
+            stats.completed += 1
+
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            raise
+
+        except Exception as e:
+            stats.failed += 1
+            logger.error(f"[supervisor] worker {key} failed: {e}")
+
+        finally:
+            if started_at is not None:
+                stats.running -= 1
+                record(WORKER_RUN_METRIC, (loop.time() - started_at) * 1000)
+                self._release()
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+
+    async def _expired(self, key: int, on_expired: Optional[ExpiredCallback]) -> None:
+        if on_expired is None:
+            return
+        try:
+            await on_expired()
+        except Exception as e:
+            logger.warning(f"[supervisor] on_expired for worker {key} failed: {e}")
+
+    async def cancel(self, key: int) -> bool:
+        """
+        Отменить воркер (в очереди или работающий) и дождаться завершения.
+
+        Returns:
+            False, если воркера с таким key нет
+        """
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return False
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"[supervisor] worker {key} raised on cancel: {e}")
+        return True
+
+    async def stop_all(self, timeout: float = 10.0) -> int:
+        """
+        Отменить все воркеры и дождаться их завершения (не дольше timeout).
+
+        Новые воркеры на время остановки не принимаются.
+
+        Returns:
+            Количество отменённых воркеров
+        """
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        if not tasks:
+            return 0
+
+        self._stopping = True
+        try:
+            for task in tasks:
+                task.cancel()
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                logger.warning(f"[supervisor] {len(pending)} workers did not stop in {timeout}s")
+        finally:
+            self._stopping = False
+
+        logger.info(f"[supervisor] stopped {len(tasks)} workers: {self._stats.to_dict()}")
+        return len(tasks)
+
+    def is_active(self, key: int) -> bool:
+        return key in self._tasks
+
+    def active_count(self) -> int:
+        """Воркеров в очереди и в работе."""
+        return len(self._tasks)
+
+    def active_keys(self) -> List[int]:
+        return list(self._tasks.keys())
+
+    def get_stats(self) -> WorkerSupervisorStats:
+        """Снимок статистики."""
+        return replace(self._stats)
+
+
+# Глобальный экземпляр
+_supervisor: Optional[WorkerSupervisor] = None
+
+
+def get_worker_supervisor() -> WorkerSupervisor:
+    """Получить супервизор воркеров."""
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = WorkerSupervisor()
+    return _supervisor
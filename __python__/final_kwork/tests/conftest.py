@@ -0,0 +1,61 @@
+"""
+Общие фикстуры тестов.
+
+Тесты запускаются из корня проекта:
+    python -m pytest -q tests
+
+Бенчмарки (@pytest.mark.benchmark) по умолчанию пропускаются,
+включаются переменной окружения RUN_BENCHMARKS=1.
+"""
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+
+# Добавляем корень проекта в путь (модули импортируются как в main.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from db.base import Base  # noqa: E402
+import db.models  # noqa: E402,F401  (регистрирует таблицы в Base.metadata)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: замер производительности (только с RUN_BENCHMARKS=1)"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.environ.get("RUN_BENCHMARKS") == "1":
+        return
+    skip = pytest.mark.skip(reason="бенчмарк: включается RUN_BENCHMARKS=1")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Фабрика временной SQLite-БД со схемой из моделей.
+
+    Использование (внутри asyncio.run):
+        async with database() as Session:
+            async with Session() as session:
+                ...
+    """
+
+    @asynccontextmanager
+    async def factory(name: str = "test.db"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            yield async_sessionmaker(engine, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    return factory
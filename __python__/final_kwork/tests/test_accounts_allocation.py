@@ -0,0 +1,65 @@
+"""
+Выдача свободных аккаунтов под конкурентной нагрузкой.
+
+50 одновременных одобрений, каждое в своей сессии и транзакции (как в
+handlers_admin), не должны получить один и тот же аккаунт дважды.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from db.models import Account, AccountStatus
+from services.accounts_service import get_free_account_with_lock
+
+APPROVALS = 50
+
+
+async def _seed(Session, eligible: int) -> None:
+    async with Session() as session:
+        session.add_all(
+            Account(session_path=f"./sessions/{i}.session", status=AccountStatus.FREE)
+            for i in range(eligible)
+        )
+        # Не должны выдаваться: без сессии и не свободные
+        session.add(Account(session_path=None, status=AccountStatus.FREE))
+        session.add(Account(session_path="./sessions/x.session", status=AccountStatus.DISABLED))
+        await session.commit()
+
+
+async def _approve(Session):
+    async with Session() as session:
+        account = await get_free_account_with_lock(session)
+        # Даём другим одобрениям вклиниться до commit
+        await asyncio.sleep(0)
+        await session.commit()
+        return account.id if account else None
+
+
+@pytest.mark.parametrize("eligible", [30, APPROVALS, 80])
+def test_concurrent_approvals_never_share_an_account(database, eligible):
+    async def main():
+        async with database() as Session:
+            await _seed(Session, eligible)
+
+            results = await asyncio.gather(*(_approve(Session) for _ in range(APPROVALS)))
+            issued = [account_id for account_id in results if account_id is not None]
+
+            assert len(issued) == len(set(issued))
+            assert len(issued) == min(eligible, APPROVALS)
+
+            async with Session() as session:
+                assigned = await session.execute(
+                    select(Account.id).where(Account.status == AccountStatus.ASSIGNED)
+                )
+                assert sorted(assigned.scalars()) == sorted(issued)
+
+                ineligible = await session.execute(
+                    select(func.count(Account.id)).where(
+                        Account.id.in_(issued),
+                        Account.session_path.is_(None),
+                    )
+                )
+                assert ineligible.scalar() == 0
+
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+AES-IGE расшифровка tdata (services.tdata_converter._aes_ige_decrypt).
+
+Проверяется реализация на чистом Python (tgcrypto/cryptg отключаются);
+нативные бэкенды, если установлены, сверяются с ней.
+"""
+import os
+import time
+
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from services import tdata_converter
+from services.tdata_converter import _aes_ige_decrypt
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    monkeypatch.setattr(tdata_converter, "TGCRYPTO_AVAILABLE", False)
+    monkeypatch.setattr(tdata_converter, "CRYPTG_AVAILABLE", False)
+
+
+def _ige_encrypt(data: bytes, key: bytes, iv: bytes) -> bytes:
+    """Эталонное IGE-шифрование (независимо от проверяемого кода)."""
+    encryptor = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend()).encryptor()
+    prev_cipher, prev_plain = iv[:16], iv[16:32]
+    out = b""
+    for i in range(0, len(data), 16):
+        block = data[i : i + 16]
+        x = bytes(a ^ b for a, b in zip(block, prev_cipher))
+        c = bytes(a ^ b for a, b in zip(encryptor.update(x), prev_plain))
+        out += c
+        prev_cipher, prev_plain = c, block
+    return out
+
+
+def _ige_decrypt_bytewise(data: bytes, key: bytes, iv: bytes) -> bytes:
+    """
+    Побайтовый XOR, как в прежней реализации — эталон для бенчмарка.
+
+    Результат собирается в bytearray: квадратичное копирование прежнего
+    'result += plain' на многомегабайтных данных не дождаться.
+    """
+    decryptor = Cipher(algorithms.AES(key), modes.ECB(), backend=default_backend()).decryptor()
+    result = bytearray()
+    iv1, iv2 = iv[:16], iv[16:]
+    for i in range(0, len(data), 16):
+        block = data[i : i + 16]
+        xored = bytes(a ^ b for a, b in zip(block, iv2))
+        plain = bytes(a ^ b for a, b in zip(decryptor.update(xored), iv1))
+        result += plain
+        iv1, iv2 = block, plain
+    return bytes(result)
+
+
+# Тестовый вектор OpenSSL (test/igetest.c), AES-128-IGE
+_OPENSSL_KEY = bytes(range(16))
+_OPENSSL_IV = bytes(range(32))
+_OPENSSL_PLAIN = bytes(32)
+_OPENSSL_CIPHER = bytes.fromhex(
+    "1a8519a6557be652e9da8e43da4ef445" "3cf456b4ca488aa383c79c98b34797cb"
+)
+
+
+def test_openssl_known_answer(pure_python):
+    assert _aes_ige_decrypt(_OPENSSL_CIPHER, _OPENSSL_KEY, _OPENSSL_IV) == _OPENSSL_PLAIN
+    assert _ige_encrypt(_OPENSSL_PLAIN, _OPENSSL_KEY, _OPENSSL_IV) == _OPENSSL_CIPHER
+
+
+@pytest.mark.parametrize("size", [16, 32, 1024, 16 * 1000 + 16])
+def test_aes256_round_trip(pure_python, size):
+    key, iv, plain = os.urandom(32), os.urandom(32), os.urandom(size)
+    encrypted = _ige_encrypt(plain, key, iv)
+    assert _aes_ige_decrypt(encrypted, key, iv) == plain
+    assert _ige_decrypt_bytewise(encrypted, key, iv) == plain
+
+
+def test_rejects_partial_block(pure_python):
+    with pytest.raises(ValueError):
+        _aes_ige_decrypt(b"\x00" * 17, bytes(32), bytes(32))
+
+
+@pytest.mark.skipif(
+    not (tdata_converter.TGCRYPTO_AVAILABLE or tdata_converter.CRYPTG_AVAILABLE),
+    reason="нативный AES-IGE не установлен",
+)
+def test_native_backend_matches_pure_python():
+    key, iv, plain = os.urandom(32), os.urandom(32), os.urandom(4096)
+    encrypted = _ige_encrypt(plain, key, iv)
+    assert _aes_ige_decrypt(encrypted, key, iv) == plain
+
+
+@pytest.mark.benchmark
+def test_decrypt_throughput(pure_python):
+    """Бенчмарк: 4 MiB против побайтового XOR."""
+    key, iv = os.urandom(32), os.urandom(32)
+    data = os.urandom(4 * 1024 * 1024)
+
+    def best_of(func, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    current = best_of(lambda: _aes_ige_decrypt(data, key, iv))
+    bytewise = best_of(lambda: _ige_decrypt_bytewise(data, key, iv), repeat=1)
+
+    assert current * 2 <= bytewise
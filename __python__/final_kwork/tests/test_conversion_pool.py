@@ -0,0 +1,67 @@
+"""
+Пул процессов конвертации: spawn, таймаут с завершением зависшего процесса.
+"""
+import asyncio
+import os
+import time
+
+from services import conversion_pool
+from services.conversion_pool import ConversionPool, ConversionTimeoutError
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def test_uses_spawn_start_method():
+    # fork копировал бы потоки и соединения бот-процесса
+    assert conversion_pool._MP_CONTEXT.get_start_method() == "spawn"
+
+
+def test_runs_in_separate_process():
+    async def main():
+        pool = ConversionPool(workers=1)
+        try:
+            assert pool._executor is None
+            pid = await pool.run(os.getpid, timeout=60)
+            assert pid != os.getpid()
+            assert pool.get_stats().completed == 1
+        finally:
+            pool.shutdown(wait=True)
+
+    asyncio.run(main())
+
+
+def test_timeout_kills_worker_and_restarts_pool():
+    async def main():
+        pool = ConversionPool(workers=1)
+        try:
+            pid = await pool.run(os.getpid, timeout=60)
+
+            started = time.monotonic()
+            try:
+                await pool.run(time.sleep, 60, timeout=0.5)
+            except ConversionTimeoutError:
+                pass
+            else:
+                raise AssertionError("expected ConversionTimeoutError")
+            assert time.monotonic() - started < 30
+
+            for _ in range(100):
+                if not _pid_alive(pid):
+                    break
+                await asyncio.sleep(0.05)
+            assert not _pid_alive(pid)
+
+            # Пул пересоздан и снова работает
+            assert await pool.run(os.getpid, timeout=60) != pid
+            stats = pool.get_stats()
+            assert (stats.timed_out, stats.completed, stats.running) == (1, 2, 0)
+        finally:
+            pool.shutdown(wait=True)
+
+    asyncio.run(main())
@@ -0,0 +1,22 @@
+"""
+Курсор keyset-пагинации заявок (utils.cursors.IssueCursor).
+"""
+from datetime import datetime
+
+import pytest
+
+from utils.cursors import IssueCursor
+
+
+def test_round_trip_keeps_microseconds():
+    cursor = IssueCursor(at=datetime(2024, 5, 17, 12, 30, 1, 123456), id=42)
+
+    encoded = cursor.encode()
+
+    assert encoded == "1715949001123456.42"
+    assert IssueCursor.decode(encoded) == cursor
+
+
+@pytest.mark.parametrize("value", ["", "42", "x.1", "1.y", "9" * 40 + ".1"])
+def test_malformed_cursor_decodes_to_none(value):
+    assert IssueCursor.decode(value) is None
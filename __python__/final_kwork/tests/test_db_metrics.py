@@ -0,0 +1,38 @@
+"""
+Замер длительности запросов (db.base): хуки before/after_cursor_execute.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db import base
+
+
+def test_failed_statement_leaves_no_timing_state(tmp_path, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(
+        base, "_record_query", lambda duration_ms, statement: recorded.append(statement)
+    )
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'metrics.db'}")
+        event.listen(engine.sync_engine, "before_cursor_execute", base._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", base._after_cursor_execute)
+        try:
+            async with engine.connect() as conn:
+                for _ in range(3):
+                    with pytest.raises(OperationalError):
+                        await conn.exec_driver_sql("SELECT * FROM missing_table")
+                    await conn.rollback()
+                await conn.exec_driver_sql("SELECT 1")
+
+                assert not conn.sync_connection.info.get("query_start")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(main())
+
+    assert recorded == ["SELECT 1"]
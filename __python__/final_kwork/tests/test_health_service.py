@@ -0,0 +1,73 @@
+"""
+Проверки файловой системы в health_service.
+
+Снимки папки сессий кэшируются по TTL; аккаунты, добавленные в обход ORM
+(Core INSERT), не должны попадать в «session file missing» из-за устаревшего
+листинга.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import insert
+
+from config import settings
+from db.models import Account, AccountStatus
+from services import health_service
+
+
+@pytest.fixture
+def sessions_dir(tmp_path, monkeypatch):
+    path = tmp_path / "sessions"
+    path.mkdir()
+    monkeypatch.setattr(settings, "sessions_dir", str(path))
+    monkeypatch.setattr(settings, "health_fs_cache_ttl", 3600)
+    health_service.invalidate_consistency_cache()
+    yield path
+    health_service.invalidate_consistency_cache()
+
+
+def test_sessions_folder_counts_top_level_files(sessions_dir):
+    (sessions_dir / "a.session").touch()
+    (sessions_dir / "b.session").touch()
+    (sessions_dir / "notes.txt").touch()
+    nested = sessions_dir / "7"
+    nested.mkdir()
+    (nested / "account.session").touch()
+
+    result = asyncio.run(health_service.check_sessions_folder())
+
+    assert result.status
+    assert result.details == "Found 2 session files"
+
+
+def test_core_insert_after_cached_listing_is_not_missing(database, sessions_dir, monkeypatch):
+    async def scenario():
+        async with database() as Session:
+            monkeypatch.setattr(health_service, "async_session", Session)
+
+            # Листинг закэширован, пока папка аккаунта ещё не создана
+            first = await health_service.check_accounts_consistency()
+
+            account_dir = sessions_dir / "1"
+            account_dir.mkdir()
+            (account_dir / "account.session").touch()
+            async with Session() as session:
+                await session.execute(
+                    insert(Account).values(
+                        session_path=os.path.join(str(account_dir), "account"),
+                        status=AccountStatus.FREE,
+                    )
+                )
+                await session.commit()
+
+            # Сбрасываем только результат сверки — листинг остаётся старым
+            health_service._consistency_cache = None
+            second = await health_service.check_accounts_consistency()
+            return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first.details == "All 0 accounts OK"
+    assert second.status, second.details
+    assert second.details == "All 1 accounts OK"
@@ -0,0 +1,82 @@
+"""
+Индекс JSON метаданных сессий (services.session_import_service.JsonMetadataIndex).
+"""
+import json
+import os
+import threading
+
+import pytest
+
+from services.batch_import_service import _find_session_credentials
+from services.session_import_service import JsonMetadataIndex
+
+HASH = "b18441a1ff607e10a989891a5462e627"
+
+
+def _write_json(path, data) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return str(path)
+
+
+@pytest.mark.parametrize("json_name", ["+79991234567.json", "+79991234567.JSON", "+79991234567.Json"])
+def test_session_json_matches_case_insensitively(tmp_path, json_name):
+    session_path = str(tmp_path / "+79991234567.session")
+    open(session_path, "wb").close()
+    json_path = _write_json(tmp_path / json_name, {"app_id": 2040, "app_hash": HASH})
+    # Посторонний JSON с другими credentials не должен перебить совпадение по имени
+    _write_json(tmp_path / "other.json", {"app_id": 1, "app_hash": "0" * 32})
+
+    index = JsonMetadataIndex()
+    assert _find_session_credentials(index, session_path) == (json_path, (2040, HASH))
+    assert index._named_json(session_path) == (json_path,)
+
+
+def test_priority_names_match_case_insensitively(tmp_path):
+    _write_json(tmp_path / "zzz.json", {"unrelated": True})
+    api_json = _write_json(tmp_path / "API.JSON", {"api_id": 777, "api_hash": HASH})
+
+    index = JsonMetadataIndex()
+    assert index.find_json_in_directory(str(tmp_path)) == api_json
+    creds = index.find_api_credentials(str(tmp_path))
+    assert (creds.api_id, creds.json_path) == (777, api_json)
+
+
+def test_concurrent_use_scans_each_directory_once(tmp_path, monkeypatch):
+    dirs = []
+    for i in range(20):
+        directory = tmp_path / f"acc{i}"
+        directory.mkdir()
+        _write_json(directory / f"{i}.json", {"api_id": 1000 + i, "api_hash": HASH})
+        dirs.append(str(directory))
+
+    scans = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        scans.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    index = JsonMetadataIndex()
+    start = threading.Barrier(8)
+    errors = []
+
+    def worker():
+        start.wait()
+        try:
+            for i, directory in enumerate(dirs):
+                files = index.list_json(directory)
+                assert index.credentials(files[f"{i}.json"]) == (1000 + i, HASH)
+        except Exception as e:  # pragma: no cover - сообщение об ошибке в потоке
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert sorted(scans) == sorted(dirs)
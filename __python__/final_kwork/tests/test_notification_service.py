@@ -0,0 +1,121 @@
+"""
+Диспетчер уведомлений (services.notification_service) с поддельным клиентом.
+
+Проверяются темп отправки в чат (token bucket), FloodWait с повтором и
+склейка уведомлений с одним ключом (уходит последнее).
+"""
+import asyncio
+import time
+
+from services.notification_service import NotificationDispatcher
+from services.telethon_adapter import FloodWaitError
+
+
+class FakeClient:
+    """Записывает отправки; для chat_id из flood_once первая отправка — FloodWait."""
+
+    def __init__(self, flood_once=None, flood_seconds=0.2):
+        self.sent = []  # (chat_id, text, monotonic-время)
+        self.attempts = 0
+        self._flood_once = dict.fromkeys(flood_once or (), flood_seconds)
+        self._changed = asyncio.Event()
+
+    async def send_message(self, chat_id, text, buttons=None):
+        self.attempts += 1
+        seconds = self._flood_once.pop(chat_id, None)
+        if seconds is not None:
+            error = FloodWaitError(None, capture=1)
+            error.seconds = seconds
+            raise error
+        self.sent.append((chat_id, text, time.monotonic()))
+        self._changed.set()
+
+    async def wait_for(self, count, timeout=5.0):
+        async def _wait():
+            while len(self.sent) < count:
+                self._changed.clear()
+                await self._changed.wait()
+
+        await asyncio.wait_for(_wait(), timeout)
+
+    def times(self, chat_id):
+        return [at for cid, _, at in self.sent if cid == chat_id]
+
+    def texts(self, chat_id):
+        return [text for cid, text, _ in self.sent if cid == chat_id]
+
+
+def test_chat_is_paced_by_token_bucket():
+    rate, burst, total = 20.0, 2, 6
+
+    async def scenario():
+        client = FakeClient()
+        dispatcher = NotificationDispatcher(concurrency=4, chat_rate=rate, chat_burst=burst)
+        dispatcher.start(client)
+        for i in range(total):
+            dispatcher.notify(1, f"a{i}")
+        dispatcher.notify(2, "b0")
+        await client.wait_for(total + 1)
+        await dispatcher.stop()
+        return client
+
+    client = asyncio.run(scenario())
+
+    times = client.times(1)
+    assert client.texts(1) == [f"a{i}" for i in range(total)]
+    # После burst каждое следующее сообщение — не раньше чем через 1/rate
+    gaps = [b - a for a, b in zip(times[burst - 1 :], times[burst:])]
+    assert all(gap >= 0.9 / rate for gap in gaps), gaps
+    # Другой чат не ждёт очередь первого
+    assert client.times(2)[0] < times[burst]
+
+
+def test_flood_wait_blocks_only_its_chat_and_retries_in_order():
+    flood = 0.2
+
+    async def scenario():
+        client = FakeClient(flood_once=[1], flood_seconds=flood)
+        dispatcher = NotificationDispatcher(concurrency=4, chat_rate=100, chat_burst=5)
+        dispatcher.start(client)
+        started = time.monotonic()
+        dispatcher.notify(1, "a0")
+        dispatcher.notify(1, "a1")
+        dispatcher.notify(2, "b0")
+        await client.wait_for(3)
+        await dispatcher.stop()
+        return client, dispatcher, started
+
+    client, dispatcher, started = asyncio.run(scenario())
+
+    assert client.texts(1) == ["a0", "a1"]
+    assert client.times(1)[0] - started >= flood * 0.9
+    assert client.times(2)[0] < client.times(1)[0]
+    assert client.attempts == 4
+    assert dispatcher.stats.flood_waits == 1
+    assert dispatcher.stats.retries == 1
+    assert dispatcher.stats.sent == 3
+    assert dispatcher.stats.failed == 0
+
+
+def test_pending_notifications_with_same_key_keep_latest():
+    async def scenario():
+        client = FakeClient()
+        dispatcher = NotificationDispatcher(concurrency=1, chat_rate=100, chat_burst=5)
+        # Клиент ещё не запущен — всё ждёт в очереди
+        for code in ("111", "222", "333"):
+            dispatcher.notify(1, f"code {code}", coalesce_key="code")
+        dispatcher.notify(1, "other")
+        dispatcher.start(client)
+        await client.wait_for(2)
+
+        # После отправки ключ снова свободен
+        dispatcher.notify(1, "code 444", coalesce_key="code")
+        await client.wait_for(3)
+        await dispatcher.stop()
+        return client, dispatcher
+
+    client, dispatcher = asyncio.run(scenario())
+
+    assert client.texts(1) == ["code 333", "other", "code 444"]
+    assert dispatcher.stats.coalesced == 2
+    assert dispatcher.stats.enqueued == 3
@@ -0,0 +1,109 @@
+"""
+Страна по номеру телефона: самый длинный совпавший префикс.
+"""
+import json
+import random
+
+import pytest
+
+from config import settings
+from services import proxy_service
+from services.proxy_service import (
+    PHONE_COUNTRY_CODES,
+    PhonePrefixTable,
+    get_country_by_phone,
+)
+
+
+@pytest.fixture
+def fresh_table(monkeypatch):
+    """Глобальная таблица строится заново (и сбрасывается после теста)."""
+    monkeypatch.setattr(proxy_service, "_phone_prefixes", None)
+
+
+@pytest.mark.parametrize(
+    "phone, country",
+    [
+        ("77011234567", "KZ"),
+        ("79161234567", "RU"),
+        ("+7 916 123-45-67", "RU"),
+        ("+7 701 123 45 67", "KZ"),
+        ("380501234567", "UA"),
+        ("375291234567", "BY"),
+        ("37061234567", "LT"),
+        ("12025550123", "US"),
+        ("+44 20 7946 0958", "GB"),
+        ("85291234567", "HK"),
+        ("8612345678901", "CN"),
+        ("99551234567", "GE"),
+        ("+0123", None),
+        ("999", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_builtin_codes(fresh_table, phone, country):
+    assert get_country_by_phone(phone) == country
+
+
+@pytest.mark.parametrize(
+    "digits, country",
+    [
+        ("16845551234", "AS"),
+        ("1684", "AS"),
+        ("168", "US"),
+        ("15555551234", "US"),
+        ("1", "US"),
+        ("2", None),
+        ("", None),
+    ],
+)
+def test_longest_prefix_wins(digits, country):
+    table = PhonePrefixTable({"1": "US", "1684": "AS"})
+    assert table.lookup(digits) == country
+
+
+def test_update_normalizes_and_overrides():
+    table = PhonePrefixTable({"7": "RU"})
+    table.update({"+77": "kz", "7": "RU", "abc": "XX", "8": ""})
+    assert len(table) == 2
+    assert table.lookup("77011234567") == "KZ"
+    assert table.lookup("79161234567") == "RU"
+    assert table.lookup("8") is None
+
+
+def test_matches_brute_force_longest_prefix():
+    rng = random.Random(49)
+    codes = dict(PHONE_COUNTRY_CODES)
+    codes.update({"1684": "AS", "1671": "GU", "7940": "AB", "3906698": "VA"})
+    table = PhonePrefixTable(codes)
+
+    def brute_force(digits):
+        matches = [p for p in codes if digits.startswith(p)]
+        return codes[max(matches, key=len)] if matches else None
+
+    for _ in range(20_000):
+        digits = "".join(rng.choice("0123456789") for _ in range(rng.randint(0, 12)))
+        assert table.lookup(digits) == brute_force(digits), digits
+
+
+def test_loads_codes_file(fresh_table, monkeypatch, tmp_path):
+    path = tmp_path / "codes.json"
+    path.write_text(json.dumps({"1684": "AS", "7840": "ab"}), encoding="utf-8")
+    monkeypatch.setattr(settings, "phone_country_codes_file", str(path))
+
+    assert get_country_by_phone("+1 684 555 1234") == "AS"
+    assert get_country_by_phone("78401234567") == "AB"
+    # Встроенные коды остаются
+    assert get_country_by_phone("+1 555 123 4567") == "US"
+    assert get_country_by_phone("77011234567") == "KZ"
+
+
+@pytest.mark.parametrize("content", ["not json", "[1, 2, 3]"])
+def test_bad_codes_file_falls_back_to_builtin(fresh_table, monkeypatch, tmp_path, content):
+    path = tmp_path / "codes.json"
+    path.write_text(content, encoding="utf-8")
+    monkeypatch.setattr(settings, "phone_country_codes_file", str(path))
+
+    assert get_country_by_phone("16845551234") == "US"
+    assert get_country_by_phone("77011234567") == "KZ"
@@ -0,0 +1,141 @@
+"""
+Импорт списка прокси: пакетный upsert против прежнего построчного.
+
+Эталон — прежний import_proxies: create_or_update_proxy на каждую строку
+и один commit. Сравниваются строки таблицы proxies и счётчики
+(new, updated), включая повторы в списке и смену пароля. Число запросов
+пакетного импорта считается на уровне курсора (executemany — один запрос).
+"""
+import asyncio
+import random
+from typing import Optional
+
+from sqlalchemy import event, select
+
+from db.models import Proxy, ProxyType
+from services.proxy_service import (
+    _IMPORT_CHUNK,
+    _proxy_key,
+    create_or_update_proxy,
+    import_proxies,
+    parse_proxy_list,
+)
+
+
+async def _import_per_line(session, text: str, default_type: Optional[ProxyType] = None):
+    parsed_list, parse_errors = parse_proxy_list(text)
+
+    new_count = 0
+    updated_count = 0
+    for parsed in parsed_list:
+        if default_type is not None:
+            parsed.proxy_type = default_type
+        _, is_new = await create_or_update_proxy(session, parsed)
+        if is_new:
+            new_count += 1
+        else:
+            updated_count += 1
+
+    await session.commit()
+    return new_count, updated_count, parse_errors
+
+
+def _proxy_lines(count: int, seed: int) -> str:
+    """Случайный список: повторы хостов, разные форматы, смена паролей, мусор."""
+    rng = random.Random(seed)
+    hosts = [f"10.{i // 250}.{i % 250}.{rng.randint(1, 254)}" for i in range(count // 3)]
+    lines = []
+    for _ in range(count):
+        host = rng.choice(hosts)
+        port = rng.choice((1080, 3128, 8080))
+        user = rng.choice(("u1", "u2"))
+        password = rng.choice(("p1", "p2", "p3"))
+        kind = rng.randrange(10)
+        if kind < 3:
+            lines.append(f"{host}:{port}")
+        elif kind < 6:
+            lines.append(f"{host}:{port}:{user}:{password}")
+        elif kind < 8:
+            lines.append(f"socks5://{user}:{password}@{host}:{port}")
+        elif kind < 9:
+            lines.append(f"{user}:{password}@{host}:{port}")
+        else:
+            lines.append(rng.choice(("# comment", "", "bad line", f"{host}:99999")))
+    return "\n".join(lines)
+
+
+async def _rows(Session) -> list:
+    async with Session() as session:
+        result = await session.execute(
+            select(
+                Proxy.id,
+                Proxy.host,
+                Proxy.port,
+                Proxy.proxy_type,
+                Proxy.username,
+                Proxy.password,
+                Proxy.is_active,
+            ).order_by(Proxy.id)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def _run_imports(Session, importer, batches) -> tuple:
+    counts = []
+    for text, default_type in batches:
+        async with Session() as session:
+            counts.append(await importer(session, text, default_type))
+    return counts, await _rows(Session)
+
+
+def test_bulk_import_matches_per_line(database):
+    batches = [
+        (_proxy_lines(2_000, seed=1), None),
+        # Повторный импорт: существующие прокси, новые пароли
+        (_proxy_lines(2_000, seed=2), None),
+        (_proxy_lines(500, seed=1), ProxyType.HTTP),
+        ("1.1.1.1:80\n1.1.1.1:80:u:p\n1.1.1.1:80:u:q\n1.1.1.1:80:u:\n1.1.1.1:80", None),
+    ]
+
+    async def main():
+        async with database("bulk.db") as bulk, database("per_line.db") as per_line:
+            bulk_counts, bulk_rows = await _run_imports(bulk, import_proxies, batches)
+            ref_counts, ref_rows = await _run_imports(per_line, _import_per_line, batches)
+
+            assert bulk_counts == ref_counts
+            assert bulk_rows == ref_rows
+            assert any(password == "q" for *_, password, _ in bulk_rows)
+
+    asyncio.run(main())
+
+
+def test_bulk_import_query_count_does_not_grow_per_line(database):
+    """10k строк: запросов — по несколько на пачку уникальных прокси, а не на строку."""
+    text = _proxy_lines(10_000, seed=3)
+    parsed_list, _ = parse_proxy_list(text)
+    unique = {_proxy_key(p.host, p.port, p.proxy_type, p.username) for p in parsed_list}
+    chunks = -(-len(unique) // _IMPORT_CHUNK)
+
+    async def main():
+        async with database() as Session:
+            statements = []
+
+            def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+                statements.append((statement.split()[0].upper(), executemany))
+
+            engine = Session.kw["bind"].sync_engine
+            event.listen(engine, "before_cursor_execute", before_cursor_execute)
+            try:
+                async with Session() as session:
+                    await import_proxies(session, text)
+            finally:
+                event.remove(engine, "before_cursor_execute", before_cursor_execute)
+            return statements, await _rows(Session)
+
+    statements, rows = asyncio.run(main())
+
+    assert len(rows) == len(unique)
+    # SELECT по пачке хостов + INSERT пачкой (+ UPDATE паролей пачкой)
+    assert len(statements) <= 3 * chunks, statements
+    assert all(many for kind, many in statements if kind in ("INSERT", "UPDATE"))
+    assert len(statements) * 20 < len(parsed_list)
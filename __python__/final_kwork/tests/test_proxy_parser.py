@@ -0,0 +1,235 @@
+"""
+Парсер списков прокси: быстрые пути (регулярки) против общего разбора.
+
+Общий разбор (_parse_proxy_line_general) — прежняя реализация
+parse_proxy_line без изменений, поэтому служит эталоном: и для отдельных
+строк, и для parse_proxy_list, разобранного построчно.
+"""
+import random
+import time
+
+import pytest
+
+from db.models import ProxyType
+from services.proxy_service import (
+    ProxyParseResult,
+    _parse_proxy_line_general,
+    parse_proxy_line,
+    parse_proxy_list,
+)
+
+
+def _reference(line: str) -> ProxyParseResult:
+    line = line.strip()
+    if not line:
+        return ProxyParseResult("", 0, error="Пустая строка")
+    return _parse_proxy_line_general(line)
+
+
+def _fields(result: ProxyParseResult) -> tuple:
+    return (
+        result.host,
+        result.port,
+        result.proxy_type,
+        result.username,
+        result.password,
+        result.error,
+        bool(result.is_valid),
+    )
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("1.2.3.4:8080", ("1.2.3.4", 8080, ProxyType.HTTP, None, None)),
+        ("1.2.3.4:8080:user:pass", ("1.2.3.4", 8080, ProxyType.HTTP, "user", "pass")),
+        ("user:pass@host.com:1080", ("host.com", 1080, ProxyType.HTTP, "user", "pass")),
+        ("user:p@ss:w@host.com:1080", ("host.com", 1080, ProxyType.HTTP, "user", "p@ss:w")),
+        ("socks5://u:p@Host.COM:1080", ("host.com", 1080, ProxyType.SOCKS5, "u", "p")),
+        ("socks5h://host:1080", ("host", 1080, ProxyType.SOCKS5, None, None)),
+        ("HTTPS://host:443", ("host", 443, ProxyType.HTTPS, None, None)),
+        ("host:1080 socks5", ("host", 1080, ProxyType.SOCKS5, None, None)),
+        ("  u:p@host:80   HTTP ", ("host", 80, ProxyType.HTTP, "u", "p")),
+        ("[::1]:8080", ("::1", 8080, ProxyType.HTTP, None, None)),
+    ],
+)
+def test_known_formats(line, expected):
+    result = parse_proxy_line(line)
+    assert result.is_valid
+    assert (
+        result.host,
+        result.port,
+        result.proxy_type,
+        result.username,
+        result.password,
+    ) == expected
+    assert _fields(result) == _fields(_reference(line))
+
+
+@pytest.mark.parametrize(
+    "line", ["", "   ", "host", "host:0", "host:65536", "host:99999", "ftp://host:21", "a b c"]
+)
+def test_invalid_lines_match_reference(line):
+    result = parse_proxy_line(line)
+    assert not result.is_valid
+    assert _fields(result) == _fields(_reference(line))
+
+
+# Куски, из которых собираются случайные строки: валидные фрагменты
+# вперемешку с разделителями и мусором
+_TOKENS = [
+    "a", "b", "Z", "0", "1", "9", ".", ":", "@", "/", " ", "\t", "-", "#", "[", "]",
+    "%", "?", "://", "socks5", "socks5h", "http", "https", "SOCKS5", "HTTP://",
+    "socks5://", "0", "80", "1080", "65535", "65536", "99999", "1.2.3.4",
+    "host.com", "user", "p@ss:w", "::1",
+]
+
+
+# Поля форматов без схемы: обычные значения и символы на границах
+# регулярок (разделители, пробелы, скобки IPv6, \r)
+_HOSTS = ["1.2.3.4", "host.com", "a-b_c", "[::1]", "h st", "h/st", "", "HOST"]
+_PORTS = ["80", "1080", "65535", "0", "65536", "99999", "", "8o"]
+_CREDS = ["user", "", "p@ss", "p:ss", "p/ss", "p ss", "p#ss", "[x]", "p\rss", "пароль"]
+_SUFFIXES = ["", " socks5", "\tHTTP", " https", " ftp", "  socks5h", " socks5 http"]
+
+
+def _random_plain_line(rng: random.Random) -> str:
+    host, port = rng.choice(_HOSTS), rng.choice(_PORTS)
+    user, password = rng.choice(_CREDS), rng.choice(_CREDS)
+    line = rng.choice(
+        [
+            f"{host}:{port}",
+            f"{host}:{port}:{user}:{password}",
+            f"{user}:{password}@{host}:{port}",
+            f"{user}@{host}:{port}",
+        ]
+    )
+    return rng.choice(["", " ", "\t"]) + line + rng.choice(_SUFFIXES) + rng.choice(["", " ", "\r"])
+
+
+def test_fuzz_equivalence_with_reference():
+    rng = random.Random(20240601)
+    for _ in range(50_000):
+        line = "".join(rng.choice(_TOKENS) for _ in range(rng.randint(0, 10)))
+        assert _fields(parse_proxy_line(line)) == _fields(_reference(line)), repr(line)
+
+
+def test_fuzz_plain_formats_equivalence_with_reference():
+    rng = random.Random(20240602)
+    for _ in range(20_000):
+        line = _random_plain_line(rng)
+        assert _fields(parse_proxy_line(line)) == _fields(_reference(line)), repr(line)
+
+
+def _reference_list(text: str):
+    """parse_proxy_list до быстрых путей: построчно через общий разбор."""
+    valid, errors = [], []
+    for i, line in enumerate(text.strip().split("\n"), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        result = _reference(line)
+        if result.is_valid:
+            valid.append(result)
+        else:
+            errors.append(f"Строка {i}: {result.error} ({line})")
+    return valid, errors
+
+
+def _assert_list_matches_reference(text: str) -> None:
+    valid, errors = parse_proxy_list(text)
+    expected_valid, expected_errors = _reference_list(text)
+    assert [_fields(r) for r in valid] == [_fields(r) for r in expected_valid]
+    assert errors == expected_errors
+
+
+def test_parse_proxy_list_matches_per_line_reference():
+    rng = random.Random(7)
+    lines = [
+        "".join(rng.choice(_TOKENS) for _ in range(rng.randint(0, 8)))
+        for _ in range(2_000)
+    ]
+    lines += ["# comment", "", "1.2.3.4:80", "host:99999"]
+    _assert_list_matches_reference("\n".join(lines))
+
+
+# Однородные списки по форматам: разбираются одним findall
+_UNIFORM = {
+    "host_port": ["1.2.3.4:8080", "host.com:3128", "a-b_c:1"],
+    "host_port_auth": ["1.2.3.4:8080:user:pass", "host.com:1080:u:", "h:1::p"],
+    "auth_host_port": ["user:pass@host.com:1080", "u:p@ss:w@1.2.3.4:80", "user@h:1"],
+}
+_INVALID_PORT = {
+    "host_port": "host.com:99999",
+    "host_port_auth": "h:0:user:pass",
+    "auth_host_port": "user:pass@h:65536",
+}
+
+
+@pytest.mark.parametrize("fmt", sorted(_UNIFORM))
+@pytest.mark.parametrize(
+    "variant",
+    ["plain", "blank_and_comments", "crlf", "suffix", "invalid_port", "foreign_line"],
+)
+def test_uniform_list_matches_per_line_reference(fmt, variant):
+    lines = _UNIFORM[fmt] * 3
+    if variant == "blank_and_comments":
+        lines = ["", "# header", *lines[:4], "   ", "  # note", *lines[4:], ""]
+    elif variant == "crlf":
+        lines = [line + "\r" for line in lines]
+    elif variant == "suffix":
+        lines = [f"{line} {kind}" for line, kind in zip(lines, ["socks5", "HTTP", "https"] * 3)]
+    elif variant == "invalid_port":
+        # Ошибка в одной строке — весь список уходит в построчный разбор
+        lines[4] = _INVALID_PORT[fmt]
+    elif variant == "foreign_line":
+        lines.insert(3, "socks5://u:p@h.com:1080")
+    text = "\n".join(lines)
+
+    _assert_list_matches_reference(text)
+    if variant == "invalid_port":
+        assert parse_proxy_list(text)[1]
+
+
+def test_fuzz_uniform_lists_match_reference():
+    rng = random.Random(20240603)
+    for _ in range(2_000):
+        text = "\n".join(_random_plain_line(rng) for _ in range(rng.randint(1, 6)))
+        _assert_list_matches_reference(text)
+
+
+def _best_of(func, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(
+    "fmt, max_ratio",
+    [("host_port", 0.75), ("host_port_auth", 0.85), ("auth_host_port", 0.85)],
+)
+def test_uniform_list_is_faster_than_per_line_reference(fmt, max_ratio):
+    """10k строк одного формата: parse_proxy_list против построчного эталона."""
+    text = "\n".join((_UNIFORM[fmt] * 3_334)[:10_000])
+    assert parse_proxy_list(text)[0]
+
+    fast = _best_of(lambda: parse_proxy_list(text))
+    reference = _best_of(lambda: _reference_list(text))
+
+    assert fast <= reference * max_ratio, (fast, reference)
+
+
+@pytest.mark.benchmark
+def test_url_lines_are_faster_than_reference():
+    """URL-формат: регулярка вместо urlparse."""
+    lines = ["socks5://u:p@h.com:1080", "http://host.com:3128", "socks5://h:1 socks5"]
+    text = "\n".join((lines * 3_334)[:10_000])
+
+    fast = _best_of(lambda: parse_proxy_list(text))
+    reference = _best_of(lambda: _reference_list(text))
+
+    assert fast <= reference * 0.8, (fast, reference)
@@ -0,0 +1,145 @@
+"""
+Планы горячих запросов: индексы из 006 и 009 действительно используются.
+
+Запросы выполняются настоящими функциями сервисов; SQL и параметры
+перехватываются на уровне курсора и прогоняются через EXPLAIN QUERY PLAN
+с теми же значениями (частичный индекс SQLite подходит только при
+совпадении условий с WHERE индекса).
+"""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import event
+
+from db.models import Account, AccountStatus, Issue, IssueStatus, Proxy, User
+from services import accounts_service, issues_service, proxy_service, security_service
+
+
+async def _seed(Session) -> int:
+    async with Session() as session:
+        user = User(tg_id=1001, username="manager")
+        proxy = Proxy(host="10.0.0.1", port=1080, country="DE")
+        session.add_all([user, proxy])
+        await session.flush()
+        session.add_all(
+            Account(
+                session_path=f"./sessions/{i}.session",
+                status=AccountStatus.FREE,
+                proxy_id=proxy.id,
+            )
+            for i in range(3)
+        )
+        session.add(
+            Issue(
+                user_id=user.id,
+                status=IssueStatus.APPROVED,
+                approved_at=datetime.utcnow(),
+                confirmation_code="12345",
+            )
+        )
+        await session.commit()
+        return user.id
+
+
+async def _capture(Session, call) -> list:
+    """Выполнить call(session) и вернуть [(sql, params)] всех запросов."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    async with Session() as session:
+        conn = await session.connection()
+        event.listen(conn.sync_connection, "before_cursor_execute", before_cursor_execute)
+        try:
+            await call(session)
+        finally:
+            event.remove(conn.sync_connection, "before_cursor_execute", before_cursor_execute)
+        await session.rollback()
+    return statements
+
+
+async def _plan(Session, statement, parameters) -> str:
+    async with Session() as session:
+        conn = await session.connection()
+        result = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        return "\n".join(row[3] for row in result.fetchall())
+
+
+async def _plans_for(Session, call, table: str) -> list:
+    plans = []
+    for statement, parameters in await _capture(Session, call):
+        if f"FROM {table}" in statement or f"UPDATE {table}" in statement:
+            plans.append(await _plan(Session, statement, parameters))
+    assert plans, f"нет запросов к {table}"
+    return plans
+
+
+def _assert_uses(plan: str, index: str, table: str) -> None:
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+    assert f"SCAN {table}\n" not in plan + "\n", plan
+
+
+def test_active_issue_queries_use_partial_index(database):
+    async def main():
+        async with database() as Session:
+            user_id = await _seed(Session)
+
+            calls = [
+                lambda s: security_service.check_manager_limit(s, user_id),
+                lambda s: issues_service.count_active_by_user(s, user_id),
+                lambda s: issues_service.get_user_active_issues(s, user_id),
+            ]
+            for call in calls:
+                plans = await _plans_for(Session, call, "issues")
+                # Первый запрос к issues — выборка активных; остальные (selectinload)
+                # идут по первичному ключу связанных таблиц
+                _assert_uses(plans[0], "ix_issues_active_by_user", "issues")
+
+    asyncio.run(main())
+
+
+def test_free_account_allocation_uses_partial_index(database):
+    async def main():
+        async with database() as Session:
+            await _seed(Session)
+
+            plans = await _plans_for(Session, accounts_service.get_free_account_with_lock, "accounts")
+            # UPDATE ... WHERE id = (SELECT ... LIMIT 1): подзапрос идёт по частичному
+            # индексу, внешний UPDATE — по первичному ключу
+            _assert_uses(plans[0], "ix_accounts_free_ready", "accounts")
+            assert "ix_accounts_status" not in plans[0]
+
+    asyncio.run(main())
+
+
+def test_accounts_on_proxy_count_uses_proxy_id_index(database):
+    async def main():
+        async with database() as Session:
+            await _seed(Session)
+
+            plans = await _plans_for(
+                Session, lambda s: proxy_service.get_accounts_on_proxy(s, 1), "accounts"
+            )
+            _assert_uses(plans[0], "ix_accounts_proxy_id", "accounts")
+
+    asyncio.run(main())
+
+
+def test_proxy_selection_reads_covering_indexes(database):
+    async def main():
+        async with database() as Session:
+            await _seed(Session)
+
+            for country in (None, "DE"):
+                plans = await _plans_for(
+                    Session,
+                    lambda s: proxy_service.get_best_proxy_for_account(s, country),
+                    "proxies",
+                )
+                # Агрегат по прокси и числу аккаунтов не читает сами таблицы
+                assert "USING COVERING INDEX ix_proxies_selection" in plans[0], plans[0]
+                assert "USING COVERING INDEX ix_accounts_proxy_id" in plans[0], plans[0]
+                assert "SCAN accounts" not in plans[0], plans[0]
+
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Хранилища лимитов (services.rate_limiter): засев счётчиков и очистка окон.
+"""
+import pytest
+
+from services.rate_limiter import MemoryRateLimitBackend, SqliteRateLimitBackend
+
+KEY = "active:1"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        instance = MemoryRateLimitBackend()
+    else:
+        instance = SqliteRateLimitBackend(str(tmp_path / "rl.db"))
+    yield instance
+    instance.close()
+
+
+def test_seed_does_not_overwrite_existing_counter(backend):
+    # Два промаха кэша прочитали COUNT=2; первый засеял, затем пришла дельта
+    version = backend.counter_version(KEY)
+    assert backend.seed_counter(KEY, 2, 60, version) == 2
+    backend.add_counter(KEY, 1)
+
+    # Второй засев по устаревшему COUNT не должен затереть 3
+    assert backend.seed_counter(KEY, 2, 60, version) == 3
+    assert backend.get_counter(KEY) == 3
+
+
+def test_seed_is_skipped_when_delta_lands_during_count(backend):
+    version = backend.counter_version(KEY)
+    # Переход заявки закоммитился между чтением версии и засевом
+    backend.add_counter(KEY, 1)
+
+    assert backend.seed_counter(KEY, 2, 60, version) == 2
+    assert backend.get_counter(KEY) is None
+
+    # Следующий промах засевает уже с новой версией
+    assert backend.seed_counter(KEY, 3, 60, backend.counter_version(KEY)) == 3
+    assert backend.get_counter(KEY) == 3
+
+
+def test_sqlite_prunes_events_of_idle_keys(tmp_path, monkeypatch):
+    backend = SqliteRateLimitBackend(str(tmp_path / "rl.db"))
+    monkeypatch.setattr(backend, "PRUNE_EVERY", 4)
+    clock = [1000.0]
+    monkeypatch.setattr("services.rate_limiter.time.time", lambda: clock[0])
+    try:
+        for user in range(3):
+            assert backend.acquire(f"requests:{user}", cooldown=0, limit=5, window=10)[0]
+
+        # Эти ключи больше не запрашиваются; окно истекло
+        clock[0] += 11
+        backend.acquire("requests:active", cooldown=0, limit=5, window=10)
+
+        keys = {
+            key
+            for (key,) in backend._conn.execute("SELECT DISTINCT key FROM rl_events")
+        }
+        assert keys == {"requests:active"}
+    finally:
+        backend.close()
@@ -0,0 +1,64 @@
+"""
+Отбор членов ZIP-архива при импорте tdata (services.tdata_converter._is_tdata_member).
+"""
+import io
+import os
+import zipfile
+
+import pytest
+
+from services.session_import_service import extract_zip_members
+from services.tdata_converter import _find_tdata_folder, _is_tdata_member
+
+
+@pytest.mark.parametrize(
+    "name, needed",
+    [
+        # Данные аккаунта
+        ("tdata/key_datas", True),
+        ("tdata/D877F783D5D3EF8Cs", True),
+        ("tdata/D877F783D5D3EF8C/maps", True),
+        ("acc/tdata/D877F783D5D3EF8C/maps", True),
+        ("key_datas", True),
+        ("D877F783D5D3EF8C/maps", True),
+        # Обёртки с похожими именами — не кэш
+        ("temp_acc/tdata/key_datas", True),
+        ("temp/tdata/key_datas", True),
+        ("emoji_pack/tdata/D877F783D5D3EF8C/maps", True),
+        ("user_data_backup/tdata/key_datas", True),
+        ("tdata/user_data_old/file", True),
+        ("tdata/temporary/file", True),
+        # Кэши внутри tdata
+        ("tdata/user_data/cache/0/ab", False),
+        ("tdata/user_data#2/media_cache/1", False),
+        ("tdata/user_data#3/cache", False),
+        ("acc/tdata/emoji/1.webp", False),
+        ("tdata/dumps/crash.dmp", False),
+        ("tdata/tdummy/Updates", False),
+        ("tdata/temp/x", False),
+        ("tdata/webview/Default/Cookies", False),
+        ("Tdata/EMOJI/1.webp", False),
+        # tdata упакована без папки — корень архива и есть tdata
+        ("emoji/1.webp", False),
+        ("user_data/cache/0/ab", False),
+    ],
+)
+def test_is_tdata_member(name, needed):
+    assert _is_tdata_member(name) is needed
+
+
+def test_extracts_account_files_from_wrapped_archive(tmp_path):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("temp_acc/tdata/key_datas", b"key")
+        zf.writestr("temp_acc/tdata/D877F783D5D3EF8C/maps", b"maps")
+        zf.writestr("temp_acc/tdata/user_data/cache/0/ab", b"x" * 1024)
+        zf.writestr("temp_acc/tdata/emoji/1.webp", b"x" * 1024)
+
+    dst = tmp_path / "out"
+    count = extract_zip_members(buf.getvalue(), str(dst), _is_tdata_member, 10 * 2**20)
+
+    assert count == 2
+    tdata = _find_tdata_folder(str(dst))
+    assert tdata == os.path.join(str(dst), "temp_acc", "tdata")
+    assert sorted(os.listdir(tdata)) == ["D877F783D5D3EF8C", "key_datas"]
@@ -0,0 +1,259 @@
+"""
+Супервизор воркеров: FIFO-допуск, ограничение параллельности, дедлайны.
+"""
+import asyncio
+
+import pytest
+
+from services import worker_supervisor
+from services.worker_supervisor import WorkerSupervisor
+
+
+async def _drain(supervisor: WorkerSupervisor) -> None:
+    while supervisor.active_count():
+        await asyncio.sleep(0.005)
+
+
+def test_fifo_admission():
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=10, deadline=5)
+        started = []
+
+        def factory(key):
+            async def work(deadline):
+                started.append(key)
+                await asyncio.sleep(0.005)
+
+            return work
+
+        for key in range(8):
+            assert supervisor.submit(key, factory(key))
+        await _drain(supervisor)
+
+        assert started == list(range(8))
+        assert supervisor.get_stats().completed == 8
+
+    asyncio.run(main())
+
+
+def test_concurrency_cap():
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=3, queue_size=20, deadline=5)
+        current = peak = 0
+
+        async def work(deadline):
+            nonlocal current, peak
+            current += 1
+            peak = max(peak, current)
+            await asyncio.sleep(0.01)
+            current -= 1
+
+        for key in range(12):
+            assert supervisor.submit(key, work)
+        await asyncio.sleep(0)
+        stats = supervisor.get_stats()
+        assert (stats.running, stats.queued) == (3, 9)
+
+        await _drain(supervisor)
+
+        stats = supervisor.get_stats()
+        assert peak == 3
+        assert (stats.running, stats.queued, stats.completed) == (0, 0, 12)
+
+    asyncio.run(main())
+
+
+def test_rejects_when_queue_full():
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=2, deadline=5)
+        release = asyncio.Event()
+
+        async def work(deadline):
+            await release.wait()
+
+        assert all(supervisor.submit(key, work) for key in range(3))
+        assert not supervisor.submit(3, work)
+        assert supervisor.get_stats().rejected == 1
+
+        release.set()
+        await _drain(supervisor)
+        assert supervisor.get_stats().completed == 3
+
+    asyncio.run(main())
+
+
+def test_expires_in_queue():
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=5, deadline=0.05)
+        started, expired = [], []
+
+        def factory(key):
+            async def work(deadline):
+                started.append(key)
+                # Воркер сам укладывается в дедлайн
+                await asyncio.sleep(max(0.0, deadline - asyncio.get_running_loop().time()))
+
+            return work
+
+        def on_expired(key):
+            async def callback():
+                expired.append(key)
+
+            return callback
+
+        for key in range(3):
+            supervisor.submit(key, factory(key), on_expired(key))
+        await _drain(supervisor)
+
+        assert started == [0]
+        assert expired == [1, 2]
+        stats = supervisor.get_stats()
+        assert (stats.completed, stats.expired) == (1, 2)
+
+    asyncio.run(main())
+
+
+def test_expires_while_running_after_grace(monkeypatch):
+    monkeypatch.setattr(worker_supervisor, "CLEANUP_GRACE", 0.05)
+
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=5, deadline=0.05)
+        cancelled, expired = [], []
+
+        async def work(deadline):
+            try:
+                await asyncio.sleep(10)  # Дедлайн игнорируется
+            except asyncio.CancelledError:
+                cancelled.append(asyncio.get_running_loop().time() - deadline)
+                raise
+
+        async def on_expired():
+            expired.append(True)
+
+        supervisor.submit(1, work, on_expired)
+        await _drain(supervisor)
+
+        assert expired == [True]
+        # Отмена — не раньше окончания CLEANUP_GRACE
+        assert len(cancelled) == 1 and cancelled[0] >= 0.05 - 0.01
+        assert supervisor.get_stats().expired == 1
+
+    asyncio.run(main())
+
+
+def test_worker_handling_own_timeout_is_not_expired(monkeypatch):
+    """Таймаут, обработанный воркером к дедлайну, не дублируется on_expired."""
+    monkeypatch.setattr(worker_supervisor, "CLEANUP_GRACE", 0.5)
+
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=5, deadline=0.05)
+        events = []
+
+        async def work(deadline):
+            loop = asyncio.get_running_loop()
+            try:
+                await asyncio.wait_for(asyncio.Event().wait(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                # on_timeout + disconnect воркера — уже после дедлайна
+                await asyncio.sleep(0.05)
+                events.append("on_timeout")
+
+        async def on_expired():
+            events.append("on_expired")
+
+        supervisor.submit(1, work, on_expired)
+        await _drain(supervisor)
+
+        assert events == ["on_timeout"]
+        stats = supervisor.get_stats()
+        assert (stats.completed, stats.expired) == (1, 0)
+
+    asyncio.run(main())
+
+
+def test_cancel_queued_worker():
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=5, deadline=5)
+        release = asyncio.Event()
+        started = []
+
+        def factory(key):
+            async def work(deadline):
+                started.append(key)
+                await release.wait()
+
+            return work
+
+        for key in range(3):
+            supervisor.submit(key, factory(key))
+        await asyncio.sleep(0)
+
+        assert await supervisor.cancel(1)
+        assert not await supervisor.cancel(1)
+        assert supervisor.active_keys() == [0, 2]
+
+        release.set()
+        await _drain(supervisor)
+
+        assert started == [0, 2]
+        stats = supervisor.get_stats()
+        assert (stats.completed, stats.cancelled, stats.queued) == (2, 1, 0)
+
+    asyncio.run(main())
+
+
+def test_stop_all_returns_slots():
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=2, queue_size=10, deadline=5)
+
+        async def blocked(deadline):
+            await asyncio.Event().wait()
+
+        for key in range(6):
+            supervisor.submit(key, blocked)
+        await asyncio.sleep(0)
+
+        assert await supervisor.stop_all(timeout=1) == 6
+        stats = supervisor.get_stats()
+        assert (stats.running, stats.queued, stats.cancelled) == (0, 0, 6)
+        assert supervisor.active_count() == 0
+
+        # После остановки снова доступны оба слота
+        current = peak = 0
+
+        async def work(deadline):
+            nonlocal current, peak
+            current += 1
+            peak = max(peak, current)
+            await asyncio.sleep(0.01)
+            current -= 1
+
+        for key in range(4):
+            assert supervisor.submit(key, work)
+        await _drain(supervisor)
+        assert peak == 2
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("failing", [ValueError("boom"), RuntimeError("x")])
+def test_failed_worker_releases_slot(failing):
+    async def main():
+        supervisor = WorkerSupervisor(max_workers=1, queue_size=5, deadline=5)
+        done = []
+
+        async def broken(deadline):
+            raise failing
+
+        async def work(deadline):
+            done.append(True)
+
+        supervisor.submit(1, broken)
+        supervisor.submit(2, work)
+        await _drain(supervisor)
+
+        assert done == [True]
+        stats = supervisor.get_stats()
+        assert (stats.failed, stats.completed) == (1, 1)
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+"""
+Курсоры keyset-пагинации.
+
+Без зависимостей от БД: кодируются в callback data клавиатурами и
+разбираются обработчиками, а запросы строит issues_service.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class IssueCursor:
+    """
+    Позиция в ленте заявок для keyset-пагинации: (время, id) крайней строки.
+
+    В callback data кодируется как "<микросекунды>.<id>".
+    """
+
+    at: datetime
+    id: int
+
+    @classmethod
+    def from_row(cls, row: Any) -> "IssueCursor":
+        """Курсор по строке страницы (атрибуты at и id)."""
+        return cls(at=row.at, id=row.id)
+
+    def encode(self) -> str:
+        return f"{(self.at - _EPOCH) // _MICROSECOND}.{self.id}"
+
+    @classmethod
+    def decode(cls, value: str) -> Optional["IssueCursor"]:
+        try:
+            micros, issue_id = value.split(".", 1)
+            return cls(at=_EPOCH + int(micros) * _MICROSECOND, id=int(issue_id))
+        except (ValueError, OverflowError):
+            return None
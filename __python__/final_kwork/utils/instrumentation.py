@@ -0,0 +1,245 @@
+"""
+Инструментирование процесса бота.
+
+Включает:
+- Сэмплер задержки event loop (loop lag)
+- Задержки handlers (через декораторы bot/decorators.py)
+- Задержку доставки уведомлений
+- Ожидание в очереди и время работы воркеров
+- Подсчёт активных asyncio-задач по категориям
+- Сводку p50/p95/p99 (команда /perf и периодическая строка в логе)
+
+Накладные расходы: одна короткая задача раз в LOOP_LAG_INTERVAL секунд и
+два вызова perf_counter + append в deque на каждый handler.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних замеров хранить на одну метрику
+SAMPLES_PER_METRIC = 1024
+
+LOOP_LAG_METRIC = "loop_lag"
+# Задержка доставки уведомлений (services/notification_service.py)
+NOTIFY_LATENCY_METRIC = "notify_latency"
+# Ожидание в очереди и время работы воркеров (services/worker_supervisor.py)
+WORKER_WAIT_METRIC = "worker_wait"
+WORKER_RUN_METRIC = "worker_run"
+_HANDLER_PREFIX = "handler:"
+
+_samples: Dict[str, Deque[float]] = {}
+
+# Уже измеряется внешним декоратором — вложенные не пишут второй замер
+_handler_timing_active: ContextVar[bool] = ContextVar(
+    "handler_timing_active", default=False
+)
+
+_sampler_task: Optional[asyncio.Task] = None
+
+
+def record(metric: str, value_ms: float) -> None:
+    """Записать замер (мс)."""
+    samples = _samples.get(metric)
+    if samples is None:
+        samples = _samples[metric] = deque(maxlen=SAMPLES_PER_METRIC)
+    samples.append(value_ms)
+
+
+def percentiles(metric: str) -> Optional[Dict[str, float]]:
+    """p50/p95/p99/max и количество замеров по метрике (None — замеров нет)."""
+    samples = _samples.get(metric)
+    if not samples:
+        return None
+
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+
+    def pick(q: float) -> float:
+        return round(ordered[min(last, int(q * len(ordered)))], 1)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 1),
+    }
+
+
+@asynccontextmanager
+async def time_handler(name: str) -> AsyncIterator[None]:
+    """
+    Замерить время handler.
+
+    Вложенные замеры (handler обёрнут несколькими декораторами) игнорируются —
+    пишется только самый внешний.
+    """
+    if _handler_timing_active.get():
+        yield
+        return
+
+    token = _handler_timing_active.set(True)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(_HANDLER_PREFIX + name, (time.perf_counter() - start) * 1000)
+        _handler_timing_active.reset(token)
+
+
+def _task_category(task: asyncio.Task) -> str:
+    """
+    Категория задачи.
+
+    Задачи проекта именуются "<категория>:<имя>" (например "worker:42");
+    задачи Telethon, обрабатывающие апдейты, — "updates".
+    """
+    name = task.get_name()
+    if ":" in name:
+        return name.split(":", 1)[0]
+
+    coro = task.get_coro()
+    qualname = getattr(coro, "__qualname__", "")
+    if "dispatch_update" in qualname or "handle_update" in qualname:
+        return "updates"
+    return "other"
+
+
+def count_tasks() -> Dict[str, int]:
+    """Количество незавершённых asyncio-задач по категориям."""
+    return dict(
+        Counter(_task_category(task) for task in asyncio.all_tasks() if not task.done())
+    )
+
+
+def get_summary() -> dict:
+    """Сводка: loop lag, уведомления, воркеры, задачи, handlers (по убыванию p95)."""
+    handlers = {}
+    for metric in _samples:
+        if metric.startswith(_HANDLER_PREFIX):
+            handlers[metric[len(_HANDLER_PREFIX):]] = percentiles(metric)
+
+    return {
+        "loop_lag": percentiles(LOOP_LAG_METRIC),
+        "notify_latency": percentiles(NOTIFY_LATENCY_METRIC),
+        "worker_wait": percentiles(WORKER_WAIT_METRIC),
+        "worker_run": percentiles(WORKER_RUN_METRIC),
+        "tasks": count_tasks(),
+        "handlers": dict(
+            sorted(handlers.items(), key=lambda item: item[1]["p95"], reverse=True)
+        ),
+    }
+
+
+def format_summary_line() -> str:
+    """Одна строка для периодического лога."""
+    summary = get_summary()
+    lag = summary["loop_lag"]
+    lag_str = (
+        f"lag p50/p95/p99={lag['p50']}/{lag['p95']}/{lag['p99']}ms" if lag else "lag n/a"
+    )
+    tasks_str = ",".join(f"{k}={v}" for k, v in sorted(summary["tasks"].items()))
+    slowest = next(iter(summary["handlers"].items()), None)
+    slowest_str = f", slowest={slowest[0]} p95={slowest[1]['p95']}ms" if slowest else ""
+    return f"{lag_str}, tasks[{tasks_str}]{slowest_str}"
+
+
+def format_summary_message(top: int = 10) -> str:
+    """Сводка для админа (/perf)."""
+    summary = get_summary()
+    lines: List[str] = ["📈 **Производительность**", ""]
+
+    lag = summary["loop_lag"]
+    if lag:
+        lines.append(
+            f"**Event loop lag:** p50 {lag['p50']} / p95 {lag['p95']} / "
+            f"p99 {lag['p99']} / max {lag['max']} ms ({lag['count']} замеров)"
+        )
+    else:
+        lines.append("**Event loop lag:** нет данных")
+
+    notify = summary["notify_latency"]
+    if notify:
+        lines.append(
+            f"**Доставка уведомлений:** p50 {notify['p50']} / p95 {notify['p95']} / "
+            f"max {notify['max']} ms ({notify['count']} отправок)"
+        )
+
+    wait, run = summary["worker_wait"], summary["worker_run"]
+    if wait and run:
+        lines.append(
+            f"**Воркеры:** очередь p50 {wait['p50'] / 1000:.1f} / p95 {wait['p95'] / 1000:.1f} с, "
+            f"работа p50 {run['p50'] / 1000:.1f} / p95 {run['p95'] / 1000:.1f} с "
+            f"({run['count']} запусков)"
+        )
+
+    lines.append("")
+    lines.append("**Задачи:**")
+    for category, count in sorted(summary["tasks"].items()):
+        lines.append(f"  • {category}: {count}")
+
+    handlers = list(summary["handlers"].items())[:top]
+    if handlers:
+        lines.append("")
+        lines.append("**Handlers (p50 / p95 / p99 ms, вызовов):**")
+        for name, stats in handlers:
+            lines.append(
+                f"  • `{name}`: {stats['p50']} / {stats['p95']} / {stats['p99']} "
+                f"({stats['count']})"
+            )
+
+    return "\n".join(lines)
+
+
+async def start_loop_monitor(
+    interval: Optional[float] = None, log_interval: Optional[int] = None
+) -> None:
+    """
+    Запустить сэмплер задержки event loop.
+
+    Каждые interval секунд засыпает и меряет, насколько позже запланированного
+    проснулся; раз в log_interval секунд пишет сводку в лог (0 — не писать).
+    """
+    global _sampler_task
+
+    if _sampler_task and not _sampler_task.done():
+        return
+
+    interval = interval or settings.loop_lag_interval
+    log_interval = settings.perf_log_interval if log_interval is None else log_interval
+
+    async def sampler():
+        last_log = time.monotonic()
+        while True:
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            record(LOOP_LAG_METRIC, max(0.0, (time.perf_counter() - expected) * 1000))
+
+            if log_interval and time.monotonic() - last_log >= log_interval:
+                last_log = time.monotonic()
+                logger.info(f"[perf] {format_summary_line()}")
+
+    _sampler_task = asyncio.create_task(sampler(), name="background:loop_monitor")
+    logger.info(f"[perf] Loop monitor started (interval={interval}s)")
+
+
+async def stop_loop_monitor() -> None:
+    """Остановить сэмплер."""
+    global _sampler_task
+
+    if _sampler_task:
+        _sampler_task.cancel()
+        try:
+            await _sampler_task
+        except asyncio.CancelledError:
+            pass
+        _sampler_task = None
+        logger.info("[perf] Loop monitor stopped")